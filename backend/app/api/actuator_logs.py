@@ -1,25 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
+from ..core.pagination import paginate_newest_first
 from ..models import ActuatorLog as ActuatorLogModel
 from ..schemas import ActuatorLog, ActuatorLogCreate
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ActuatorLog])
-def get_actuator_logs(
-    environment_id: Optional[int] = Query(None),
-    actuator_type: Optional[str] = Query(None),
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    skip: int = 0,
-    limit: int = 1000,
-    db: Session = Depends(get_db)
+def actuator_logs_query(
+    db: Session,
+    environment_id: Optional[int] = None,
+    actuator_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get actuator logs with optional filtering"""
+    """Filtered actuator log query, before paging"""
     query = db.query(ActuatorLogModel)
     
     if environment_id:
@@ -34,8 +32,26 @@ def get_actuator_logs(
     if end_date:
         query = query.filter(ActuatorLogModel.timestamp <= end_date)
     
-    logs = query.order_by(ActuatorLogModel.timestamp.desc()).offset(skip).limit(limit).all()
-    return logs
+    return query
+
+@router.get("/", response_model=List[ActuatorLog])
+def get_actuator_logs(
+    response: Response,
+    environment_id: Optional[int] = Query(None),
+    actuator_type: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1),
+    db: Session = Depends(get_read_db)
+):
+    """Get actuator logs with optional filtering, newest first"""
+    query = actuator_logs_query(db, environment_id, actuator_type, start_date, end_date)
+    return paginate_newest_first(
+        query, ActuatorLogModel.timestamp, ActuatorLogModel.id, response,
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 @router.post("/", response_model=ActuatorLog, status_code=status.HTTP_201_CREATED)
 def create_actuator_log(actuator_log: ActuatorLogCreate, db: Session = Depends(get_db)):
@@ -1,25 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
+from ..core.pagination import paginate_newest_first
 from ..models import AlertLog as AlertLogModel
 from ..schemas import AlertLog, AlertLogCreate, AlertLogUpdate
 
 router = APIRouter()
 
-@router.get("/", response_model=List[AlertLog])
-def get_alert_logs(
-    environment_id: Optional[int] = Query(None),
-    status_filter: Optional[str] = Query(None),
-    severity: Optional[str] = Query(None),
-    active_only: bool = Query(False),
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+def alert_logs_query(
+    db: Session,
+    environment_id: Optional[int] = None,
+    status_filter: Optional[str] = None,
+    severity: Optional[str] = None,
+    active_only: bool = False
 ):
-    """Get alert logs with optional filtering"""
+    """Filtered alert log query, before paging"""
     query = db.query(AlertLogModel)
     
     if environment_id:
@@ -34,8 +32,26 @@ def get_alert_logs(
     if active_only:
         query = query.filter(AlertLogModel.status == "active")
     
-    logs = query.order_by(AlertLogModel.first_occurrence.desc()).offset(skip).limit(limit).all()
-    return logs
+    return query
+
+@router.get("/", response_model=List[AlertLog])
+def get_alert_logs(
+    response: Response,
+    environment_id: Optional[int] = Query(None),
+    status_filter: Optional[str] = Query(None),
+    severity: Optional[str] = Query(None),
+    active_only: bool = Query(False),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    db: Session = Depends(get_read_db)
+):
+    """Get alert logs with optional filtering, newest first"""
+    query = alert_logs_query(db, environment_id, status_filter, severity, active_only)
+    return paginate_newest_first(
+        query, AlertLogModel.first_occurrence, AlertLogModel.id, response,
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 @router.post("/", response_model=AlertLog, status_code=status.HTTP_201_CREATED)
 def create_alert_log(alert_log: AlertLogCreate, db: Session = Depends(get_db)):
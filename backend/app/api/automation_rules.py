@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models import AutomationRule as AutomationRuleModel, RuleCondition as RuleConditionModel, RuleAction as RuleActionModel
 from ..schemas import AutomationRule, AutomationRuleCreate, AutomationRuleUpdate
+from ..services.rule_engine import rule_engine
+from ..services.rule_scheduler import rule_scheduler
+from ..services.action_executor import action_executor
 
 router = APIRouter()
 
@@ -15,7 +18,7 @@ def get_automation_rules(
     active_only: bool = True,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get automation rules with optional filtering"""
     query = db.query(AutomationRuleModel)
@@ -32,8 +35,27 @@ def get_automation_rules(
     rules = query.order_by(AutomationRuleModel.priority).offset(skip).limit(limit).all()
     return rules
 
+@router.get("/environments/{environment_id}/matching", response_model=List[AutomationRule])
+def get_matching_rules(environment_id: int, db: Session = Depends(get_read_db)):
+    """Get the active rules that the environment's latest readings satisfy"""
+    rule_ids = [rule.id for rule in rule_engine.current_matches(environment_id)]
+    if not rule_ids:
+        return []
+    rules = db.query(AutomationRuleModel).filter(AutomationRuleModel.id.in_(rule_ids)).all()
+    return sorted(rules, key=lambda rule: rule_ids.index(rule.id))
+
+@router.get("/scheduler/status")
+def get_scheduler_status():
+    """Get rule scheduler counters and the most recent rule executions"""
+    return {
+        **rule_scheduler.stats(),
+        "compiled_rules": rule_engine.rule_count,
+        "executor": action_executor.stats(),
+        "recent_executions": list(rule_scheduler.recent_executions)[::-1]
+    }
+
 @router.get("/{rule_id}", response_model=AutomationRule)
-def get_automation_rule(rule_id: int, db: Session = Depends(get_db)):
+def get_automation_rule(rule_id: int, db: Session = Depends(get_read_db)):
     """Get a specific automation rule by ID"""
     rule = db.query(AutomationRuleModel).filter(AutomationRuleModel.id == rule_id).first()
     if not rule:
@@ -64,6 +86,7 @@ def create_automation_rule(rule: AutomationRuleCreate, db: Session = Depends(get
     
     db.commit()
     db.refresh(db_rule)
+    rule_engine.reload(db)
     return db_rule
 
 @router.put("/{rule_id}", response_model=AutomationRule)
@@ -86,8 +109,15 @@ def update_automation_rule(
     
     db.commit()
     db.refresh(rule)
+    rule_engine.reload(db)
     return rule
 
+@router.post("/{rule_id}/cancel")
+def cancel_automation_rule_runs(rule_id: int, environment_id: int = None):
+    """Cancel in-progress action runs of a rule (optionally for one environment)"""
+    cancelled = action_executor.cancel(rule_id=rule_id, environment_id=environment_id)
+    return {"message": f"Cancelled {cancelled} running action sequence(s)", "cancelled": cancelled}
+
 @router.delete("/{rule_id}")
 def delete_automation_rule(rule_id: int, db: Session = Depends(get_db)):
     """Delete an automation rule"""
@@ -100,4 +130,6 @@ def delete_automation_rule(rule_id: int, db: Session = Depends(get_db)):
     
     db.delete(rule)
     db.commit()
+    rule_engine.reload(db)
+    action_executor.cancel(rule_id=rule_id)
     return {"message": "Automation rule deleted successfully"}
@@ -3,9 +3,13 @@ from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models import Environment as EnvironmentModel, Species as SpeciesModel, GrowPhase as GrowPhaseModel
+from ..models.sensor_log import SENSOR_VALUE_COLUMNS
 from ..schemas import Environment, EnvironmentCreate, EnvironmentUpdate, EnvironmentAssignment, EnvironmentOverride
+from ..services.latest_state import latest_state_cache, ENVIRONMENT_STATE_COLUMNS
+from ..services.rule_engine import rule_engine
+from .sensors import get_latest_readings_by_type
 
 router = APIRouter()
 
@@ -14,7 +18,7 @@ def get_environments(
     skip: int = 0,
     limit: int = 100,
     status_filter: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all grow environments"""
     query = db.query(EnvironmentModel)
@@ -33,7 +37,7 @@ def get_environments(
     return environments
 
 @router.get("/{environment_id}", response_model=Environment)
-def get_environment(environment_id: int, db: Session = Depends(get_db)):
+def get_environment(environment_id: int, db: Session = Depends(get_read_db)):
     """Get a specific environment by ID"""
     environment = db.query(EnvironmentModel).filter(EnvironmentModel.id == environment_id).first()
     if not environment:
@@ -151,6 +155,7 @@ def assign_species_to_environment(
     
     db.commit()
     db.refresh(environment)
+    rule_engine.set_environment_context(environment.id, environment.species_id, phase.name)
     return environment
 
 @router.post("/{environment_id}/unassign")
@@ -172,6 +177,7 @@ def unassign_species_from_environment(environment_id: int, db: Session = Depends
     environment.override_expires_at = None
     
     db.commit()
+    rule_engine.set_environment_context(environment_id, None, None)
     return {"message": "Species unassigned successfully"}
 
 @router.post("/{environment_id}/change-phase")
@@ -210,6 +216,7 @@ def change_environment_phase(
     environment.phase_start_time = datetime.utcnow()
     
     db.commit()
+    rule_engine.set_environment_context(environment_id, environment.species_id, new_phase.name)
     return {"message": f"Phase changed to '{phase_name}' successfully"}
 
 @router.post("/{environment_id}/override", response_model=Environment)
@@ -266,7 +273,7 @@ def clear_environment_override(environment_id: int, db: Session = Depends(get_db
     return {"message": "Manual overrides cleared successfully"}
 
 @router.get("/{environment_id}/status")
-def get_environment_status(environment_id: int, db: Session = Depends(get_db)):
+def get_environment_status(environment_id: int, db: Session = Depends(get_read_db)):
     """Get detailed status information for an environment"""
     environment = db.query(EnvironmentModel).filter(EnvironmentModel.id == environment_id).first()
     if not environment:
@@ -275,6 +282,17 @@ def get_environment_status(environment_id: int, db: Session = Depends(get_db)):
             detail="Environment not found"
         )
     
+    # Prefer the in-memory latest state; on a miss read the latest logs, like
+    # the sensors summary does, rather than the periodically flushed columns
+    latest = latest_state_cache.get(environment.id)
+    if latest is None:
+        latest = dict.fromkeys(ENVIRONMENT_STATE_COLUMNS.values())
+        latest["last_sensor_reading"] = None
+        for sensor_type, log in get_latest_readings_by_type(db, [environment.id]).get(environment.id, {}).items():
+            latest[ENVIRONMENT_STATE_COLUMNS[SENSOR_VALUE_COLUMNS[sensor_type]]] = log.value
+            if latest["last_sensor_reading"] is None or log.timestamp > latest["last_sensor_reading"]:
+                latest["last_sensor_reading"] = log.timestamp
+    
     status_info = {
         "environment_id": environment.id,
         "name": environment.name,
@@ -284,12 +302,12 @@ def get_environment_status(environment_id: int, db: Session = Depends(get_db)):
         "current_phase": environment.current_phase.name if environment.current_phase else None,
         "phase_elapsed_days": environment.phase_elapsed_days if environment.phase_start_time else 0,
         "current_readings": {
-            "temperature": environment.current_temperature,
-            "humidity": environment.current_humidity,
-            "co2": environment.current_co2,
-            "light_level": environment.current_light_level,
-            "airflow": environment.current_airflow,
-            "last_reading": environment.last_sensor_reading
+            "temperature": latest["current_temperature"],
+            "humidity": latest["current_humidity"],
+            "co2": latest["current_co2"],
+            "light_level": latest["current_light_level"],
+            "airflow": latest["current_airflow"],
+            "last_reading": latest["last_sensor_reading"]
         },
         "actuator_states": {
             "fan": environment.fan_state,
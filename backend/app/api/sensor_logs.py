@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
+import csv
+import io
+import json
+import zlib
 
-from ..core.database import get_db
+from ..core.database import ReadSessionLocal, get_read_db
+from ..core.pagination import paginate_newest_first
 from ..models import SensorLog as SensorLogModel
-from ..schemas import SensorLog, SensorLogCreate
+from ..schemas import SensorLog, SensorLogCreate, SensorRollupPoint
+from ..services.ingestion_queue import ingestion_queue
+from ..services.rollups import choose_resolution, query_rollups, to_naive_utc
 
 router = APIRouter()
 
-@router.get("/", response_model=List[SensorLog])
-def get_sensor_logs(
-    environment_id: Optional[int] = Query(None),
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    skip: int = 0,
-    limit: int = 1000,
-    db: Session = Depends(get_db)
+def sensor_logs_query(
+    db: Session,
+    environment_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get sensor logs with optional filtering"""
+    """Filtered raw sensor log query, before paging"""
     query = db.query(SensorLogModel)
     
     if environment_id:
@@ -30,24 +35,67 @@ def get_sensor_logs(
     if end_date:
         query = query.filter(SensorLogModel.timestamp <= end_date)
     
-    logs = query.order_by(SensorLogModel.timestamp.desc()).offset(skip).limit(limit).all()
-    return logs
+    return query
+
+def latest_sensor_log_query(db: Session, environment_id: int):
+    return db.query(SensorLogModel).filter(
+        SensorLogModel.environment_id == environment_id
+    ).order_by(SensorLogModel.timestamp.desc()).limit(1)
+
+@router.get("/", response_model=Union[List[SensorLog], List[SensorRollupPoint]])
+def get_sensor_logs(
+    response: Response,
+    environment_id: Optional[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    resolution: str = Query("raw", regex="^(raw|auto|1m|15m|1h)$", description="raw readings, a rollup, or auto"),
+    max_points: int = Query(500, ge=1, description="Point budget used by resolution=auto"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1),
+    db: Session = Depends(get_read_db)
+):
+    """Get sensor logs with optional filtering, newest first.
+    
+    resolution=auto needs start_date and picks the finest rollup that keeps
+    the window within max_points. Raw readings are paged with the cursor
+    returned in the X-Next-Cursor header.
+    """
+    start_date, end_date = to_naive_utc(start_date), to_naive_utc(end_date)
+    if resolution == "auto":
+        resolution = choose_resolution(start_date, end_date or datetime.utcnow(), max_points) if start_date else "raw"
+    
+    if resolution != "raw":
+        return query_rollups(
+            db, resolution,
+            environment_id=environment_id,
+            start=start_date,
+            end=end_date,
+            descending=True,
+            offset=skip,
+            limit=limit
+        )
+    
+    query = sensor_logs_query(db, environment_id, start_date, end_date)
+    return paginate_newest_first(
+        query, SensorLogModel.timestamp, SensorLogModel.id, response,
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 @router.post("/", response_model=SensorLog, status_code=status.HTTP_201_CREATED)
-def create_sensor_log(sensor_log: SensorLogCreate, db: Session = Depends(get_db)):
-    """Create a new sensor log entry"""
-    db_log = SensorLogModel(**sensor_log.dict())
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    return db_log
+async def create_sensor_log(sensor_log: SensorLogCreate):
+    """Create a new sensor log entry (returns once its group commit is durable)"""
+    return await ingestion_queue.submit(sensor_log.dict())
+
+@router.post("/bulk", response_model=List[SensorLog], status_code=status.HTTP_201_CREATED)
+async def create_sensor_logs(sensor_logs: List[SensorLogCreate]):
+    """Create many sensor log entries, committed together"""
+    return await ingestion_queue.submit_many([sensor_log.dict() for sensor_log in sensor_logs])
 
 @router.get("/latest/{environment_id}", response_model=SensorLog)
-def get_latest_sensor_reading(environment_id: int, db: Session = Depends(get_db)):
+def get_latest_sensor_reading(environment_id: int, db: Session = Depends(get_read_db)):
     """Get the latest sensor reading for an environment"""
-    latest_log = db.query(SensorLogModel).filter(
-        SensorLogModel.environment_id == environment_id
-    ).order_by(SensorLogModel.timestamp.desc()).first()
+    latest_log = latest_sensor_log_query(db, environment_id).first()
     
     if not latest_log:
         raise HTTPException(
@@ -57,16 +105,16 @@ def get_latest_sensor_reading(environment_id: int, db: Session = Depends(get_db)
     
     return latest_log
 
-@router.get("/export/{environment_id}")
-def export_sensor_data(
-    environment_id: int,
-    start_date: Optional[datetime] = Query(None),
-    end_date: Optional[datetime] = Query(None),
-    format: str = Query("json", regex="^(json|csv)$"),
-    db: Session = Depends(get_db)
-):
-    """Export sensor data for an environment"""
-    query = db.query(SensorLogModel).filter(SensorLogModel.environment_id == environment_id)
+EXPORT_COLUMNS = ["timestamp", "temperature", "humidity", "co2_level", "light_level", "airflow", "sensor_type", "reading_quality"]
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "json": "application/json"}
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_YIELD_PER = 1000
+
+def export_query(db: Session, environment_id: int, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Export columns for an environment's readings, oldest first"""
+    query = db.query(*(getattr(SensorLogModel, c) for c in EXPORT_COLUMNS)).filter(
+        SensorLogModel.environment_id == environment_id
+    )
     
     if start_date:
         query = query.filter(SensorLogModel.timestamp >= start_date)
@@ -74,43 +122,110 @@ def export_sensor_data(
     if end_date:
         query = query.filter(SensorLogModel.timestamp <= end_date)
     
-    logs = query.order_by(SensorLogModel.timestamp).all()
+    return query.order_by(SensorLogModel.timestamp, SensorLogModel.id)
+
+def _export_rows(environment_id: int, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Yield export rows through a server-side cursor.
+    
+    Opens its own read session because the response body is produced after
+    the request handler (and its dependencies) may already have finished.
+    """
+    db = ReadSessionLocal()
+    try:
+        for row in export_query(db, environment_id, start_date, end_date).yield_per(EXPORT_YIELD_PER):
+            yield row
+    finally:
+        db.close()
+
+def _encode_export(rows, format: str):
+    """Serialize rows to text chunks of roughly EXPORT_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    count = 0
     
     if format == "csv":
-        # Return CSV format (simplified)
-        import csv
-        import io
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["timestamp", "temperature", "humidity", "co2_level", "light_level", "airflow"])
-        
-        for log in logs:
-            writer.writerow([
-                log.timestamp,
-                log.temperature,
-                log.humidity,
-                log.co2_level,
-                log.light_level,
-                log.airflow
-            ])
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+    elif format == "json":
+        buffer.write('{"data": [')
+    
+    for row in rows:
+        if format == "csv":
+            writer.writerow(row)
+        else:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+            if format == "json" and count:
+                buffer.write(", ")
+            buffer.write(json.dumps(record))
+            if format == "ndjson":
+                buffer.write("\n")
+        count += 1
         
-        return {"data": output.getvalue(), "format": "csv"}
-    
-    # Return JSON format
-    return {
-        "data": [
-            {
-                "timestamp": log.timestamp,
-                "temperature": log.temperature,
-                "humidity": log.humidity,
-                "co2_level": log.co2_level,
-                "light_level": log.light_level,
-                "airflow": log.airflow,
-                "sensor_type": log.sensor_type,
-                "reading_quality": log.reading_quality
-            }
-            for log in logs
-        ],
-        "format": "json",
-        "count": len(logs)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if format == "json":
+        buffer.write(f'], "format": "json", "count": {count}}}')
+    yield buffer.getvalue()
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (``gzip;q=0`` refuses it)"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    for coding in ("gzip", "x-gzip"):
+        if coding in weights:
+            return weights[coding] > 0
+    return weights.get("*", 0) > 0
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export/{environment_id}")
+def export_sensor_data(
+    request: Request,
+    environment_id: int,
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("json", regex="^(json|csv|ndjson)$"),
+    compress: Optional[str] = Query(None, regex="^(gzip|none)$", description="Defaults to gzip when the client accepts it")
+):
+    """Stream sensor data for an environment as JSON, CSV or NDJSON.
+    
+    Rows are fetched in batches and written out as they arrive, so memory
+    use does not grow with the size of the date range.
+    """
+    if compress is None:
+        compress = "gzip" if accepts_gzip(request.headers.get("accept-encoding", "")) else "none"
+    
+    rows = _export_rows(environment_id, to_naive_utc(start_date), to_naive_utc(end_date))
+    chunks = _encode_export(rows, format)
+    headers = {
+        "Content-Disposition": f'attachment; filename="sensor_logs_{environment_id}.{format}"',
+        # The encoding depends on Accept-Encoding, so shared caches must key on it
+        "Vary": "Accept-Encoding"
     }
+    if compress == "gzip":
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip_chunks(chunks)
+    
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
@@ -1,26 +1,74 @@
 """
 Sensor data API endpoints
 """
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
 
-from ..core.database import get_db
-from ..models.sensor_log import SensorLog
+from ..core.database import get_db, get_read_db
+from ..models.sensor_log import SensorLog, SENSOR_VALUE_COLUMNS, SENSOR_UNITS
 from ..models.environment import Environment
 from ..models.species import Species
 from ..schemas.sensor_log import SensorLog as SensorLogResponse, SensorLogCreate
-from ..services.sensor_simulator import sensor_simulator
+from ..schemas.sensor_rollup import SensorRollupPoint
+from ..services.sensor_simulator import sensor_simulator, SIMULATED_SENSOR_TYPES
+from ..services.latest_state import latest_state_cache, ENVIRONMENT_STATE_COLUMNS
+from ..services.rollups import choose_resolution, query_rollups
 
 router = APIRouter()
 
+SENSOR_TYPES = ['temperature', 'humidity', 'co2', 'airflow']
+
+# Bounds for bulk history generation
+MAX_HISTORY_DAYS = 365
+MAX_GENERATED_READINGS = 5_000_000
+
+
+def latest_readings_by_type_query(
+    db: Session,
+    environment_ids: Optional[List[int]] = None,
+    sensor_types: List[str] = SENSOR_TYPES
+):
+    """Latest SensorLog rows per (environment, sensor_type), ranked by a window function"""
+    ranked = db.query(
+        SensorLog.id.label("id"),
+        func.row_number().over(
+            partition_by=(SensorLog.environment_id, SensorLog.sensor_type),
+            order_by=(SensorLog.timestamp.desc(), SensorLog.id.desc())
+        ).label("rank")
+    ).filter(SensorLog.sensor_type.in_(sensor_types))
+    
+    if environment_ids is not None:
+        ranked = ranked.filter(SensorLog.environment_id.in_(environment_ids))
+    
+    ranked = ranked.subquery()
+    return db.query(SensorLog).join(ranked, SensorLog.id == ranked.c.id).filter(ranked.c.rank == 1)
+
+
+def get_latest_readings_by_type(
+    db: Session,
+    environment_ids: Optional[List[int]] = None,
+    sensor_types: List[str] = SENSOR_TYPES
+) -> Dict[int, Dict[str, SensorLog]]:
+    """Latest SensorLog per (environment, sensor_type) in one round trip.
+    
+    Returns {environment_id: {sensor_type: SensorLog}}.
+    """
+    rows = latest_readings_by_type_query(db, environment_ids, sensor_types).all()
+    
+    latest: Dict[int, Dict[str, SensorLog]] = {}
+    for row in rows:
+        latest.setdefault(row.environment_id, {})[row.sensor_type] = row
+    return latest
+
 
 @router.get("/environments/{environment_id}/sensors/latest", response_model=List[SensorLogResponse])
-async def get_latest_sensor_readings(
+def get_latest_sensor_readings(
     environment_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get the latest sensor readings for an environment"""
     
@@ -30,29 +78,24 @@ async def get_latest_sensor_readings(
         raise HTTPException(status_code=404, detail="Environment not found")
     
     # Get latest reading for each sensor type
-    sensor_types = ['temperature', 'humidity', 'co2', 'airflow']
-    latest_readings = []
-    
-    for sensor_type in sensor_types:
-        latest = db.query(SensorLog).filter(
-            SensorLog.environment_id == environment_id,
-            SensorLog.sensor_type == sensor_type
-        ).order_by(desc(SensorLog.timestamp)).first()
-        
-        if latest:
-            latest_readings.append(latest)
-    
-    return latest_readings
+    latest = get_latest_readings_by_type(db, [environment_id]).get(environment_id, {})
+    return [latest[sensor_type] for sensor_type in SENSOR_TYPES if sensor_type in latest]
 
 
-@router.get("/environments/{environment_id}/sensors/history", response_model=List[SensorLogResponse])
-async def get_sensor_history(
+@router.get("/environments/{environment_id}/sensors/history", response_model=Union[List[SensorLogResponse], List[SensorRollupPoint]])
+def get_sensor_history(
     environment_id: int,
     sensor_type: Optional[str] = Query(None, description="Filter by sensor type"),
     hours: int = Query(24, description="Number of hours of history to retrieve"),
-    db: Session = Depends(get_db)
+    resolution: str = Query("raw", regex="^(raw|auto|1m|15m|1h)$", description="raw readings, a rollup, or auto"),
+    max_points: int = Query(500, ge=1, description="Point budget used by resolution=auto"),
+    db: Session = Depends(get_read_db)
 ):
-    """Get historical sensor data for an environment"""
+    """Get historical sensor data for an environment.
+    
+    With resolution=auto, windows that would exceed max_points raw readings
+    are served from the finest rollup that fits instead.
+    """
     
     # Check if environment exists
     environment = db.query(Environment).filter(Environment.id == environment_id).first()
@@ -60,9 +103,28 @@ async def get_sensor_history(
         raise HTTPException(status_code=404, detail="Environment not found")
     
     # Calculate time range
-    start_time = datetime.utcnow() - timedelta(hours=hours)
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(hours=hours)
+    
+    if resolution == "auto":
+        resolution = choose_resolution(start_time, end_time, max_points)
+    
+    if resolution != "raw":
+        metrics = None
+        if sensor_type:
+            if sensor_type not in SENSOR_VALUE_COLUMNS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Rollups are kept per metric; sensor_type must be one of {', '.join(SENSOR_VALUE_COLUMNS)}"
+                )
+            metrics = [SENSOR_VALUE_COLUMNS[sensor_type]]
+        return query_rollups(db, resolution, environment_id=environment_id, metrics=metrics, start=start_time, end=end_time)
     
-    # Build query
+    return sensor_history_query(db, environment_id, start_time, sensor_type).all()
+
+
+def sensor_history_query(db: Session, environment_id: int, start_time: datetime, sensor_type: Optional[str] = None):
+    """Raw readings for an environment since ``start_time``, oldest first"""
     query = db.query(SensorLog).filter(
         SensorLog.environment_id == environment_id,
         SensorLog.timestamp >= start_time
@@ -71,12 +133,11 @@ async def get_sensor_history(
     if sensor_type:
         query = query.filter(SensorLog.sensor_type == sensor_type)
     
-    readings = query.order_by(SensorLog.timestamp).all()
-    return readings
+    return query.order_by(SensorLog.timestamp)
 
 
 @router.post("/environments/{environment_id}/sensors/simulate")
-async def simulate_sensor_readings(
+def simulate_sensor_readings(
     environment_id: int,
     db: Session = Depends(get_db)
 ):
@@ -101,14 +162,29 @@ async def simulate_sensor_readings(
     }
 
 
+def check_generation_size(environment_count: int, days: int, interval_minutes: int):
+    """Reject history requests that would generate more than MAX_GENERATED_READINGS rows"""
+    steps = -(-days * 24 * 60 // interval_minutes)
+    estimated = environment_count * len(SIMULATED_SENSOR_TYPES) * steps
+    if estimated > MAX_GENERATED_READINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Would generate about {estimated} readings; the limit is {MAX_GENERATED_READINGS}"
+        )
+
+
 @router.post("/environments/{environment_id}/sensors/generate-history")
-async def generate_historical_data(
+def generate_historical_data(
     environment_id: int,
-    days: int = Query(7, description="Number of days of historical data to generate"),
+    days: int = Query(7, ge=1, le=MAX_HISTORY_DAYS, description="Number of days of historical data to generate"),
+    interval_minutes: int = Query(60, ge=1, description="Minutes between generated readings"),
+    seed: Optional[int] = Query(None, description="Random seed for reproducible data"),
     db: Session = Depends(get_db)
 ):
     """Generate historical sensor data for testing and visualization"""
     
+    check_generation_size(1, days, interval_minutes)
+    
     # Check if environment exists
     environment = db.query(Environment).filter(Environment.id == environment_id).first()
     if not environment:
@@ -123,38 +199,48 @@ async def generate_historical_data(
         return {"message": "Historical data already exists for this environment"}
     
     # Generate historical data
-    logs = sensor_simulator.generate_historical_data(db, environment_id, days)
+    count = sensor_simulator.generate_historical_data(db, environment_id, days, interval_minutes * 60, seed)
     
     return {
-        "message": f"Generated {len(logs)} historical sensor readings for {days} days",
+        "message": f"Generated {count} historical sensor readings for {days} days",
         "environment_id": environment_id
     }
 
 
 @router.get("/sensors/summary")
-async def get_all_sensors_summary(db: Session = Depends(get_db)):
+def get_all_sensors_summary(db: Session = Depends(get_read_db)):
     """Get a summary of latest sensor readings for all environments"""
     
-    environments = db.query(Environment).all()
+    environments = db.query(Environment).options(selectinload(Environment.species)).all()
+    cached = {env.id: latest_state_cache.get(env.id) for env in environments}
+    
+    # Only environments the cache has not seen a reading for touch the log table
+    uncached_ids = [env_id for env_id, state in cached.items() if state is None]
+    latest_by_env = get_latest_readings_by_type(db, uncached_ids) if uncached_ids else {}
     summary = []
     
     for env in environments:
-        # Get latest readings for this environment
-        sensor_types = ['temperature', 'humidity', 'co2', 'airflow']
-        env_readings = {}
-        
-        for sensor_type in sensor_types:
-            latest = db.query(SensorLog).filter(
-                SensorLog.environment_id == env.id,
-                SensorLog.sensor_type == sensor_type
-            ).order_by(desc(SensorLog.timestamp)).first()
-            
-            if latest:
-                env_readings[sensor_type] = {
+        state = cached[env.id]
+        if state is not None:
+            env_readings = {}
+            for sensor_type in SENSOR_TYPES:
+                column = ENVIRONMENT_STATE_COLUMNS[SENSOR_VALUE_COLUMNS[sensor_type]]
+                value = state[column]
+                if value is not None:
+                    env_readings[sensor_type] = {
+                        "value": value,
+                        "unit": SENSOR_UNITS[sensor_type],
+                        "timestamp": state["reading_times"].get(column, state["last_sensor_reading"])
+                    }
+        else:
+            env_readings = {
+                sensor_type: {
                     "value": latest.value,
                     "unit": latest.unit,
                     "timestamp": latest.timestamp
                 }
+                for sensor_type, latest in latest_by_env.get(env.id, {}).items()
+            }
         
         summary.append({
             "environment_id": env.id,
@@ -167,7 +253,7 @@ async def get_all_sensors_summary(db: Session = Depends(get_db)):
 
 
 @router.post("/sensors/simulate-all")
-async def simulate_all_environments(db: Session = Depends(get_db)):
+def simulate_all_environments(db: Session = Depends(get_db)):
     """Generate sensor readings for all environments"""
     
     environments = db.query(Environment).all()
@@ -185,3 +271,48 @@ async def simulate_all_environments(db: Session = Depends(get_db)):
         "message": f"Generated sensor readings for {len(environments)} environments",
         "total_readings": total_logs
     }
+
+
+@router.post("/sensors/generate-history")
+def generate_fleet_history(
+    days: int = Query(7, ge=1, le=MAX_HISTORY_DAYS, description="Number of days of historical data to generate"),
+    interval_minutes: int = Query(60, ge=1, description="Minutes between generated readings"),
+    seed: Optional[int] = Query(None, description="Random seed for reproducible data"),
+    environment_ids: Optional[List[int]] = Query(None, description="Environments to fill (default: all)"),
+    db: Session = Depends(get_db)
+):
+    """Generate historical sensor data for many environments in one vectorized pass.
+    
+    Environments that already have readings are skipped, like the
+    single-environment endpoint does.
+    """
+    
+    if environment_ids is None:
+        environment_ids = [env_id for (env_id,) in db.query(Environment.id).all()]
+    else:
+        known = {
+            env_id for (env_id,) in db.query(Environment.id).filter(Environment.id.in_(environment_ids))
+        }
+        missing = sorted(set(environment_ids) - known)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Environments not found: {missing}")
+    
+    existing = {
+        env_id for (env_id,) in db.query(SensorLog.environment_id).filter(
+            SensorLog.environment_id.in_(environment_ids)
+        ).distinct()
+    }
+    environment_ids = [env_id for env_id in dict.fromkeys(environment_ids) if env_id not in existing]
+    
+    check_generation_size(len(environment_ids), days, interval_minutes)
+    
+    end = datetime.utcnow()
+    started = time.perf_counter()
+    count = sensor_simulator.generate_block(db, environment_ids, end - timedelta(days=days), end, interval_minutes * 60, seed) if environment_ids else 0
+    
+    return {
+        "message": f"Generated {count} historical sensor readings for {len(environment_ids)} environments",
+        "total_readings": count,
+        "skipped_environment_ids": sorted(existing),
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models import Species as SpeciesModel, GrowPhase as GrowPhaseModel
 from ..schemas import Species, SpeciesCreate, SpeciesUpdate, GrowPhase, GrowPhaseCreate, GrowPhaseUpdate
 
@@ -13,7 +13,7 @@ def get_species(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all mushroom species with their grow phases"""
     query = db.query(SpeciesModel)
@@ -23,7 +23,7 @@ def get_species(
     return species
 
 @router.get("/{species_id}", response_model=Species)
-def get_species_by_id(species_id: int, db: Session = Depends(get_db)):
+def get_species_by_id(species_id: int, db: Session = Depends(get_read_db)):
     """Get a specific species by ID"""
     species = db.query(SpeciesModel).filter(SpeciesModel.id == species_id).first()
     if not species:
@@ -98,7 +98,7 @@ def delete_species(species_id: int, db: Session = Depends(get_db)):
 
 # Grow Phase endpoints
 @router.get("/{species_id}/phases", response_model=List[GrowPhase])
-def get_species_phases(species_id: int, db: Session = Depends(get_db)):
+def get_species_phases(species_id: int, db: Session = Depends(get_read_db)):
     """Get all grow phases for a species"""
     species = db.query(SpeciesModel).filter(SpeciesModel.id == species_id).first()
     if not species:
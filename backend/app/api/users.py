@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models import User as UserModel
 from ..schemas import User, UserCreate, UserUpdate
 
@@ -13,7 +13,7 @@ def get_users(
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all users"""
     query = db.query(UserModel)
@@ -23,7 +23,7 @@ def get_users(
     return users
 
 @router.get("/{user_id}", response_model=User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
     """Get a specific user by ID"""
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user:
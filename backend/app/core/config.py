@@ -11,6 +11,18 @@ class Settings(BaseModel):
     # Database settings
     DATABASE_URL: str = "sqlite:///./mushroom_cultivation.db"
     
+    # SQLite tuning ("tuned" applies the pragmas and pools below, "legacy"
+    # keeps the single shared connection with SQLite defaults)
+    SQLITE_PROFILE: str = "tuned"
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_READ_POOL_SIZE: int = 4
+    SQLITE_WRITER_TIMEOUT_SECONDS: int = 30
+    
     # Security settings
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
@@ -47,6 +59,9 @@ class Settings(BaseModel):
     UPLOAD_DIR: str = "./uploads"
     LOG_DIR: str = "./logs"
     BACKUP_DIR: str = "./backups"
+    # custom_script rule actions may only run executables inside this
+    # directory; unset disables them
+    SCRIPTS_DIR: Optional[str] = None
     
     # Camera settings
     CAMERA_ENABLED: bool = False
@@ -56,6 +71,32 @@ class Settings(BaseModel):
     # System settings
     SENSOR_READING_INTERVAL_SECONDS: int = 30
     AUTOMATION_CHECK_INTERVAL_SECONDS: int = 60
+    CONDITION_SNAPSHOT_INTERVAL_SECONDS: int = 60
+    LATEST_STATE_FLUSH_INTERVAL_SECONDS: int = 5
+    
+    # Sensor ingestion group commit: a group is flushed at whichever limit is hit first
+    INGESTION_QUEUE_ENABLED: bool = True
+    INGESTION_BATCH_MAX_ROWS: int = 500
+    INGESTION_BATCH_MAX_DELAY_MS: int = 20
+    INGESTION_QUEUE_MAX_PENDING: int = 10000
+    
+    # Closed-loop chamber simulation for soak tests (one modelled chamber per
+    # environment; SPEED is simulated seconds per wall-clock second)
+    CHAMBER_SIMULATION_ENABLED: bool = False
+    CHAMBER_SIMULATION_INTERVAL_SECONDS: float = 30
+    CHAMBER_SIMULATION_SPEED: float = 1.0
+    CHAMBER_SIMULATION_SEED: Optional[int] = None
+    
+    # Health probes: results are cached for the TTL so frequent polling does
+    # not load the database; a controller silent for longer than
+    # READING_STALE_SECONDS is reported stale
+    HEALTH_CACHE_TTL_SECONDS: float = 5
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2
+    HEALTH_DB_SLOW_MS: float = 250
+    HEALTH_INGESTION_MAX_LAG_SECONDS: float = 30
+    HEALTH_READING_STALE_SECONDS: float = 300
+    HEALTH_DISK_MIN_FREE_MB: int = 512
+    HEALTH_DISK_WARN_FREE_RATIO: float = 0.10
     DATA_RETENTION_DAYS: int = 365
     
     class Config:
@@ -1,26 +1,113 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, QueuePool
 import os
+import time
 from .config import settings
+from .metrics import REGISTRY
+
+def sqlite_pragmas(read_only: bool = False):
+    """Per-connection pragmas for the "tuned" SQLite profile"""
+    pragmas = [("busy_timeout", settings.SQLITE_BUSY_TIMEOUT_MS)]
+    if read_only:
+        pragmas.append(("query_only", "ON"))
+    else:
+        # The journal mode is persistent in the database file; the writer sets it
+        pragmas.append(("journal_mode", settings.SQLITE_JOURNAL_MODE))
+    return pragmas + [
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        ("mmap_size", settings.SQLITE_MMAP_SIZE_BYTES),
+        # Negative cache_size is in KiB rather than pages
+        ("cache_size", -settings.SQLITE_CACHE_SIZE_KIB),
+        ("temp_store", settings.SQLITE_TEMP_STORE),
+    ]
+
+def _install_pragmas(target_engine, pragmas):
+    @event.listens_for(target_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def _is_memory_database(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
 
 # Database URL configuration
-if settings.DATABASE_URL.startswith("sqlite"):
-    # SQLite configuration
+if not settings.DATABASE_URL.startswith("sqlite"):
+    # PostgreSQL configuration
+    engine = create_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG
+    )
+    read_engine = engine
+elif settings.SQLITE_PROFILE == "legacy" or _is_memory_database(settings.DATABASE_URL):
+    # SQLite configuration: one shared connection (an in-memory database
+    # only exists inside its connection, so it always uses this path)
     engine = create_engine(
         settings.DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         echo=settings.DEBUG
     )
+    read_engine = engine
 else:
-    # PostgreSQL configuration
+    # Tuned SQLite: a single pooled writer connection serializes writes in
+    # the process, while WAL lets a pool of read-only connections query
+    # concurrently without blocking on (or being blocked by) the writer
     engine = create_engine(
         settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITER_TIMEOUT_SECONDS,
         echo=settings.DEBUG
     )
+    _install_pragmas(engine, sqlite_pragmas())
+
+    read_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+        echo=settings.DEBUG
+    )
+    _install_pragmas(read_engine, sqlite_pragmas(read_only=True))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Commit latency (including the final flush) for every write session
+DB_COMMIT_SECONDS = REGISTRY.histogram("db_commit_duration_seconds", "Database commit latency including flush")
+
+@event.listens_for(SessionLocal, "before_commit")
+def _start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_commit_time(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+def _pool_stat(stat: str):
+    """Gauge callback: ``stat`` of each distinct connection pool that supports it"""
+    pools = [("writer", engine)] + ([("reader", read_engine)] if read_engine is not engine else [])
+    def collect():
+        # QueuePool.overflow() counts up from -pool_size until the pool is full
+        return {
+            (name,): max(getattr(pool_engine.pool, stat)(), 0)
+            for name, pool_engine in pools if hasattr(pool_engine.pool, stat)
+        }
+    return collect
+
+REGISTRY.gauge("db_pool_checked_out", "Connections currently checked out", _pool_stat("checkedout"), ("pool",))
+REGISTRY.gauge("db_pool_size", "Configured pool size", _pool_stat("size"), ("pool",))
+REGISTRY.gauge("db_pool_overflow", "Connections open beyond the pool size", _pool_stat("overflow"), ("pool",))
 
 def get_db():
     """Dependency to get database session"""
@@ -30,10 +117,20 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """Dependency to get a read-only database session for query endpoints"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def create_tables():
     """Create all database tables"""
     from ..models import Base
+    from .migrations import ensure_indexes
     Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
 
 def drop_tables():
     """Drop all database tables (use with caution!)"""
@@ -0,0 +1,171 @@
+"""
+Liveness and readiness checks with cached dependency probes
+
+A ``HealthMonitor`` runs its registered probes concurrently, each under a
+timeout, and caches the combined report for a short TTL. Concurrent
+requests while a probe run is in flight share it, so load balancers
+polling the endpoints cost at most one probe run per TTL.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+# Probe statuses; a failing critical probe makes the instance not ready,
+# anything else short of "ok" only degrades it
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+
+ProbeResult = Dict[str, object]
+Probe = Callable[[], Union[ProbeResult, Awaitable[ProbeResult]]]
+
+
+class HealthMonitor:
+    def __init__(self, ttl_seconds: float = 5.0, timeout_seconds: float = 2.0):
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.started_at = time.monotonic()
+        self._probes: Dict[str, tuple] = {}
+        self._report: Optional[dict] = None
+        self._report_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+        # Blocking probes each get one worker thread; a run that outlives its
+        # timeout is remembered so the probe is not started again on top of it
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._outstanding: Dict[str, asyncio.Future] = {}
+
+    def register(self, name: str, probe: Probe, critical: bool = True):
+        """Add a probe returning ``{"status": ok|warn|fail, ...details}``.
+
+        Coroutine probes run on the event loop; plain functions run on the
+        probe's own worker thread so a blocking probe cannot stall requests
+        or pile up threads while it hangs.
+        """
+        self._probes[name] = (probe, critical)
+        if not asyncio.iscoroutinefunction(probe) and name not in self._executors:
+            self._executors[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"health-{name}")
+
+    def liveness(self) -> dict:
+        """The process is up and serving; no dependencies are touched"""
+        return {"status": OK, "uptime_seconds": round(time.monotonic() - self.started_at, 1)}
+
+    async def readiness(self) -> dict:
+        """Combined probe report, at most ``ttl_seconds`` old"""
+        if self._report is not None and time.monotonic() - self._report_at < self.ttl_seconds:
+            return {**self._report, "cached": True}
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._refresh())
+        # Shielded so a caller that disconnects does not cancel the run others are waiting on
+        return {**(await asyncio.shield(self._inflight)), "cached": False}
+
+    async def _refresh(self) -> dict:
+        try:
+            report = await self._run_probes()
+            self._report, self._report_at = report, time.monotonic()
+            return report
+        finally:
+            self._inflight = None
+
+    async def _run_probes(self) -> dict:
+        names = list(self._probes)
+        results = await asyncio.gather(*(self._run_probe(name) for name in names))
+        checks = dict(zip(names, results))
+
+        status = OK
+        for name, check in checks.items():
+            critical = self._probes[name][1]
+            if check["status"] == FAIL and critical:
+                status = FAIL
+            elif check["status"] != OK and status == OK:
+                status = WARN
+        return {
+            "status": status,
+            "ready": status != FAIL,
+            "checked_at": datetime.utcnow().isoformat() + "Z",
+            "checks": checks,
+        }
+
+    async def _run_probe(self, name: str) -> ProbeResult:
+        probe = self._probes[name][0]
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(probe):
+                result = await asyncio.wait_for(probe(), self.timeout_seconds)
+            else:
+                outstanding = self._outstanding.get(name)
+                if outstanding is not None and not outstanding.done():
+                    return {"status": FAIL, "error": "previous run has not finished", "probe_ms": 0.0}
+                future = self._outstanding[name] = asyncio.get_running_loop().run_in_executor(self._executors[name], probe)
+                # Shielded: a timed-out thread cannot be interrupted, so keep its future to check next time
+                result = await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            result = {"status": FAIL, "error": f"timed out after {self.timeout_seconds}s"}
+        except Exception as e:
+            result = {"status": FAIL, "error": f"{type(e).__name__}: {e}"}
+        result.setdefault("probe_ms", round((time.perf_counter() - started) * 1000, 2))
+        return result
+
+
+def disk_check(directories: Dict[str, str], min_free_mb: float, warn_free_ratio: float) -> ProbeResult:
+    """Free space of the filesystem under each directory.
+
+    Fails below ``min_free_mb`` and warns below ``warn_free_ratio`` of the
+    filesystem's size.
+    """
+    status = OK
+    report = {}
+    for name, path in directories.items():
+        try:
+            usage = shutil.disk_usage(path)
+        except OSError as e:
+            report[name] = {"path": path, "error": str(e)}
+            status = FAIL
+            continue
+        free_mb = usage.free / 2 ** 20
+        free_ratio = usage.free / usage.total if usage.total else 0.0
+        report[name] = {"path": os.path.abspath(path), "free_mb": round(free_mb, 1), "free_ratio": round(free_ratio, 3)}
+        if free_mb < min_free_mb:
+            status = FAIL
+        elif free_ratio < warn_free_ratio and status == OK:
+            status = WARN
+    return {"status": status, "directories": report}
+
+
+def freshness_check(last_seen: Dict[object, Optional[datetime]], stale_seconds: float, now: datetime) -> ProbeResult:
+    """Age of the latest reading from each controller; warns when any is older than ``stale_seconds``.
+
+    Times are naive UTC (aware ones are converted).
+    """
+    controllers = {}
+    stale = 0
+    for controller, seen in last_seen.items():
+        if seen is not None and seen.tzinfo is not None:
+            seen = seen.astimezone(timezone.utc).replace(tzinfo=None)
+        age = None if seen is None else round((now - seen).total_seconds(), 1)
+        if age is None or age > stale_seconds:
+            stale += 1
+        controllers[str(controller)] = {
+            "last_reading": seen.isoformat() + "Z" if seen is not None else None,
+            "age_seconds": age,
+        }
+    return {
+        "status": WARN if stale else OK,
+        "stale_after_seconds": stale_seconds,
+        "stale": stale,
+        "controllers": controllers,
+    }
+
+
+def transport_check(kind: str, transport) -> ProbeResult:
+    """Connection state of an MCU transport (None when commands are only logged)"""
+    if transport is None:
+        return {"status": OK, "transport": kind, "connected": None}
+    connected = transport.connected
+    result = {"status": OK if connected else FAIL, "transport": kind, "connected": connected}
+    if hasattr(transport, "stats"):
+        result.update(transport.stats())
+    return result
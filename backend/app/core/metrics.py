@@ -0,0 +1,355 @@
+"""
+Dependency-free metrics with Prometheus text exposition
+
+Counters and histograms keep one preallocated slot list per thread, so
+recording is a thread-local lookup plus in-place adds: no locks and no
+allocation once a thread has touched a metric. Scrapes sum the per-thread
+slots. Gauges are read from callbacks at scrape time, so queue depths and
+pool stats cost nothing between scrapes.
+"""
+import bisect
+import os
+import resource
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Request and operation latencies, seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Batch sizes and per-item counts
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+class _Slots:
+    """Per-thread slot lists; each thread only ever writes its own"""
+    __slots__ = ("_local", "_shards", "_width")
+
+    def __init__(self, width: int):
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._width = width
+
+    def get(self) -> list:
+        try:
+            return self._local.slots
+        except AttributeError:
+            slots = self._local.slots = [0] * self._width
+            self._shards.append(slots)  # list.append is atomic under the GIL
+            return slots
+
+    def totals(self) -> list:
+        totals = [0] * self._width
+        for shard in list(self._shards):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class CounterChild:
+    __slots__ = ("_slots",)
+
+    def __init__(self):
+        self._slots = _Slots(1)
+
+    def inc(self, amount: float = 1):
+        self._slots.get()[0] += amount
+
+    def value(self) -> float:
+        return self._slots.totals()[0]
+
+
+class HistogramChild:
+    __slots__ = ("_slots", "_bounds")
+
+    def __init__(self, bounds: Sequence[float]):
+        self._bounds = bounds
+        # One slot per bucket, one for +Inf, then the running sum
+        self._slots = _Slots(len(bounds) + 2)
+
+    def observe(self, value: float):
+        slots = self._slots.get()
+        slots[bisect.bisect_left(self._bounds, value)] += 1
+        slots[-1] += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """(cumulative bucket counts, count, sum)"""
+        totals = self._slots.totals()
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._create_lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """Child for the label values; cache it when the labels are fixed at the call site"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._create_lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _label_text(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {_number(child.value())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def _samples(self):
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for values, child in list(self._children.items()):
+            cumulative, count, total = child.snapshot()
+            for bound, bucket_count in zip(bounds, cumulative):
+                yield f"{self.name}_bucket{self._label_text(values, ('le', bound))} {bucket_count}"
+            yield f"{self.name}_count{self._label_text(values)} {count}"
+            yield f"{self.name}_sum{self._label_text(values)} {_number(total)}"
+
+
+GaugeValue = Union[float, Dict[LabelValues, float], None]
+
+
+class Gauge(_Metric):
+    """Value read from ``function`` at scrape time.
+
+    For labelled gauges the function returns ``{label values: value}``.
+    ``kind="counter"`` exposes a monotonic total kept elsewhere (a
+    service's own stats) as a counter.
+    """
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], GaugeValue], labelnames: Sequence[str] = (),
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.kind = kind
+
+    def _samples(self):
+        try:
+            value = self.function()
+        except Exception as e:
+            print(f"Warning: gauge {self.name} failed: {e}")
+            return
+        if value is None:
+            return
+        if not self.labelnames:
+            yield f"{self.name} {_number(value)}"
+            return
+        for values, sample in value.items():
+            yield f"{self.name}{self._label_text(values)} {_number(sample)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}")
+                if isinstance(existing, Gauge):
+                    existing.function = metric.function  # Latest registration supplies the value
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, function: Callable[[], GaugeValue], labelnames: Sequence[str] = (),
+              kind: str = "gauge") -> Gauge:
+        return self._register(Gauge(name, documentation, function, labelnames, kind))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template.
+
+    Routes are labelled by their template (``/api/batches/{batch_id}``), so
+    label cardinality stays bounded; requests no route matched share
+    ``unmatched``.
+    """
+
+    def __init__(self, app, registry: "MetricsRegistry" = None):
+        self.app = app
+        registry = registry or REGISTRY
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+        )
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+        )
+        self.in_progress = 0
+        registry.gauge("http_requests_in_progress", "HTTP requests being handled", lambda: self.in_progress)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_progress -= 1
+            route = route_template(scope)
+            method = scope["method"]
+            self.duration.labels(method, route).observe(elapsed)
+            self.requests.labels(method, route, status).inc()
+
+
+def route_template(scope) -> str:
+    """Template of the route that handled the request, e.g. ``/api/batches/{batch_id}``"""
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    if ":path}" in template:
+        return template  # A path parameter spans segments; such routes are not nested under prefixes
+    # Routes of an included router may report their path relative to its prefix;
+    # the prefix is whatever the request path has in front of the template's segments
+    path = scope["path"]
+    cut = len(path)
+    for _ in range(template.count("/")):
+        cut = path.rfind("/", 0, cut)
+    return path[:cut] + template if cut > 0 else template
+
+
+def _resident_memory_bytes() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+_STARTED_AT = time.time()
+
+# Global registry instance
+REGISTRY = MetricsRegistry()
+REGISTRY.gauge("process_resident_memory_bytes", "Resident memory size in bytes", _resident_memory_bytes)
+REGISTRY.gauge("process_cpu_seconds_total", "User and system CPU time in seconds", _cpu_seconds, kind="counter")
+REGISTRY.gauge("process_start_time_seconds", "Start time of the process since the epoch", lambda: _STARTED_AT)
@@ -0,0 +1,16 @@
+"""
+Lightweight schema migrations applied at startup
+"""
+from sqlalchemy.engine import Engine
+
+def ensure_indexes(engine: Engine):
+    """Create model indexes that are missing from existing tables.
+    
+    ``create_all`` only builds indexes together with a new table, so
+    indexes added to a model later would never reach an existing database.
+    """
+    from ..models import Base
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
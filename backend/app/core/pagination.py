@@ -0,0 +1,77 @@
+"""
+Keyset (cursor) pagination for timestamp-ordered log tables
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor for the position just after (timestamp, row_id)"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def newest_first_page_query(
+    query: Query,
+    timestamp_column,
+    id_column,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> Query:
+    """The query for one page ordered by (timestamp, id) descending, one row over ``limit``"""
+    query = query.order_by(timestamp_column.desc(), id_column.desc())
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # The redundant "<=" bound lets the planner seek on the composite index
+        query = query.filter(
+            timestamp_column <= timestamp,
+            or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < row_id))
+        )
+    elif skip:
+        query = query.offset(skip)
+    
+    return query.limit(limit + 1)
+
+def paginate_newest_first(
+    query: Query,
+    timestamp_column,
+    id_column,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List:
+    """Order by (timestamp, id) descending and return one page.
+    
+    With a cursor, the page starts strictly after it using an index range
+    seek, so deep pages cost the same as the first. Offset paging via
+    ``skip`` is still honoured when no cursor is given. The cursor for the
+    following page is returned in the X-Next-Cursor response header.
+    """
+    rows = newest_first_page_query(query, timestamp_column, id_column, cursor, skip, limit).all()
+    more = len(rows) > limit
+    
+    rows = rows[:limit]
+    if more and rows:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, timestamp_column.key), getattr(last, id_column.key)
+        )
+    return rows
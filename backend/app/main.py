@@ -1,12 +1,22 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
 from .core.config import settings
-from .core.database import create_tables, get_db
+from .core.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from .core.database import create_tables, get_db, SessionLocal, ReadSessionLocal
 from .core.seed_data import seed_database
 from .api import species, environments, users, sensor_logs, actuator_logs, alert_logs, automation_rules, sensors
+from .services.latest_state import latest_state_cache
+from .services.ingestion_queue import ingestion_queue
+from .services.rule_engine import rule_engine
+from .services.condition_tracker import condition_tracker
+from .services.rule_scheduler import rule_scheduler
+from .services.action_executor import action_executor
+from .services.chamber_model import chamber_soak
+from .services.system_health import health_monitor
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,13 +34,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Request latency and counts per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Create upload directories
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.LOG_DIR, exist_ok=True)
 os.makedirs(settings.BACKUP_DIR, exist_ok=True)
 
+# Running duration clocks of rule conditions, kept across restarts
+CONDITION_SNAPSHOT_PATH = os.path.join(settings.LOG_DIR, "condition_state.json")
+
 # Include API routers FIRST (before static files to prevent conflicts)
 app.include_router(species.router, prefix="/api/species", tags=["species"])
 app.include_router(environments.router, prefix="/api/environments", tags=["environments"])
@@ -41,6 +58,28 @@ app.include_router(alert_logs.router, prefix="/api/alert-logs", tags=["alert_log
 app.include_router(automation_rules.router, prefix="/api/automation-rules", tags=["automation_rules"])
 app.include_router(sensors.router, prefix="/api/sensors", tags=["sensors"])
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Operational metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return health_monitor.liveness()
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe: database, ingestion, storage and controller checks (503 when not ready)"""
+    report = await health_monitor.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint"""
+    report = await health_monitor.readiness()
+    return JSONResponse({**report, "version": settings.VERSION}, status_code=200 if report["ready"] else 503)
+
 # Mount static files
 if os.path.exists(settings.UPLOAD_DIR):
     app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
@@ -64,10 +103,53 @@ async def startup_event():
     finally:
         db.close()
     
+    # Serve latest readings from memory, write them back periodically, and
+    # compile the active automation rules
+    db = SessionLocal()
+    try:
+        latest_state_cache.warm(db)
+        condition_tracker.load(CONDITION_SNAPSHOT_PATH)
+        rule_engine.reload(db)
+    finally:
+        db.close()
+    latest_state_cache.start(SessionLocal, settings.LATEST_STATE_FLUSH_INTERVAL_SECONDS)
+    condition_tracker.start(CONDITION_SNAPSHOT_PATH, settings.CONDITION_SNAPSHOT_INTERVAL_SECONDS)
+    action_executor.start(SessionLocal, scripts_dir=settings.SCRIPTS_DIR)
+    rule_scheduler.set_executor(action_executor.execute_rule)
+    rule_scheduler.start(settings.AUTOMATION_CHECK_INTERVAL_SECONDS)
+    
+    # Group-commit incoming sensor readings through a single writer
+    ingestion_queue.start(
+        SessionLocal,
+        enabled=settings.INGESTION_QUEUE_ENABLED,
+        max_rows=settings.INGESTION_BATCH_MAX_ROWS,
+        max_delay_ms=settings.INGESTION_BATCH_MAX_DELAY_MS,
+        max_pending=settings.INGESTION_QUEUE_MAX_PENDING
+    )
+    
+    if settings.CHAMBER_SIMULATION_ENABLED:
+        chamber_soak.start(
+            SessionLocal,
+            interval_seconds=settings.CHAMBER_SIMULATION_INTERVAL_SECONDS,
+            speed=settings.CHAMBER_SIMULATION_SPEED,
+            seed=settings.CHAMBER_SIMULATION_SEED,
+            read_session_factory=ReadSessionLocal
+        )
+    
     print(f"{settings.APP_NAME} v{settings.VERSION} started successfully!")
     print(f"API Documentation: http://localhost:8000/api/docs")
     print(f"Database: {settings.DATABASE_URL}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Commit queued readings and flush cached state and condition clocks before exit"""
+    await chamber_soak.stop()
+    await ingestion_queue.stop()
+    await rule_scheduler.stop()
+    await action_executor.stop()
+    await latest_state_cache.stop(SessionLocal)
+    await condition_tracker.stop(CONDITION_SNAPSHOT_PATH)
+
 @app.get("/")
 async def root():
     """Root endpoint with system information"""
@@ -78,15 +160,6 @@ async def root():
         "docs_url": "/api/docs"
     }
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": settings.VERSION,
-        "database": "connected"
-    }
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -3,6 +3,7 @@ from .user import User
 from .species import Species, GrowPhase
 from .environment import Environment
 from .sensor_log import SensorLog
+from .sensor_rollup import SensorRollup
 from .actuator_log import ActuatorLog
 from .alert_log import AlertLog
 from .automation_rule import AutomationRule, RuleCondition, RuleAction
@@ -14,6 +15,7 @@ __all__ = [
     "GrowPhase", 
     "Environment",
     "SensorLog",
+    "SensorRollup",
     "ActuatorLog",
     "AlertLog",
     "AutomationRule",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime, String, Float, JSON, Enum
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, DateTime, String, Float, JSON, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from .base import BaseModel
@@ -19,6 +19,10 @@ class ActuatorAction(str, enum.Enum):
 
 class ActuatorLog(BaseModel):
     __tablename__ = "actuator_logs"
+    __table_args__ = (
+        Index("ix_actuator_logs_env_timestamp_id", "environment_id", "timestamp", "id"),
+        Index("ix_actuator_logs_env_type_timestamp", "environment_id", "actuator_type", "timestamp"),
+    )
     
     environment_id = Column(Integer, ForeignKey("environments.id"), nullable=False, index=True)
     timestamp = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Float, JSON, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Float, JSON, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from .base import BaseModel
@@ -31,6 +31,11 @@ class AlertType(str, enum.Enum):
 
 class AlertLog(BaseModel):
     __tablename__ = "alert_logs"
+    __table_args__ = (
+        Index("ix_alert_logs_env_first_occurrence_id", "environment_id", "first_occurrence", "id"),
+        Index("ix_alert_logs_env_status_first_occurrence", "environment_id", "status", "first_occurrence"),
+        Index("ix_alert_logs_status_first_occurrence", "status", "first_occurrence"),
+    )
     
     environment_id = Column(Integer, ForeignKey("environments.id"), nullable=False, index=True)
     alert_type = Column(Enum(AlertType), nullable=False)
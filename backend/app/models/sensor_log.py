@@ -1,9 +1,30 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, JSON
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, JSON, Index
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
+# Reading column that holds the value for rows tagged with a logical sensor type
+SENSOR_VALUE_COLUMNS = {
+    "temperature": "temperature",
+    "humidity": "humidity",
+    "co2": "co2_level",
+    "light": "light_level",
+    "airflow": "airflow",
+}
+
+SENSOR_UNITS = {
+    "temperature": "°C",
+    "humidity": "%",
+    "co2": "PPM",
+    "light": "lux",
+    "airflow": "m/s",
+}
+
 class SensorLog(BaseModel):
     __tablename__ = "sensor_logs"
+    __table_args__ = (
+        Index("ix_sensor_logs_env_timestamp_id", "environment_id", "timestamp", "id"),
+        Index("ix_sensor_logs_env_type_timestamp", "environment_id", "sensor_type", "timestamp"),
+    )
     
     environment_id = Column(Integer, ForeignKey("environments.id"), nullable=False, index=True)
     timestamp = Column(DateTime, nullable=False, index=True)
@@ -27,5 +48,15 @@ class SensorLog(BaseModel):
     # Relationships
     environment = relationship("Environment", back_populates="sensor_logs")
     
+    @property
+    def value(self):
+        """Reading for this row's logical sensor type (temperature, co2, ...)"""
+        column = SENSOR_VALUE_COLUMNS.get(self.sensor_type)
+        return getattr(self, column) if column else None
+    
+    @property
+    def unit(self):
+        return SENSOR_UNITS.get(self.sensor_type, "")
+    
     def __repr__(self):
         return f"<SensorLog(env='{self.environment.name if self.environment else 'Unknown'}', temp={self.temperature}, humidity={self.humidity})>"
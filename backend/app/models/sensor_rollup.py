@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, UniqueConstraint, Index
+from .base import BaseModel
+
+class SensorRollup(BaseModel):
+    """Pre-aggregated min/max/sum/count of one metric over a fixed time bucket"""
+    __tablename__ = "sensor_rollups"
+    __table_args__ = (
+        UniqueConstraint("environment_id", "metric", "resolution_seconds", "bucket_start", name="uq_sensor_rollups_bucket"),
+        # Newest-first rollup pages, for one environment and for all of them
+        Index("ix_sensor_rollups_env_res_bucket", "environment_id", "resolution_seconds", "bucket_start", "metric"),
+        Index("ix_sensor_rollups_res_bucket", "resolution_seconds", "bucket_start", "environment_id", "metric"),
+    )
+    
+    environment_id = Column(Integer, ForeignKey("environments.id"), nullable=False, index=True)
+    metric = Column(String(20), nullable=False)  # SensorLog column: temperature, co2_level, ...
+    resolution_seconds = Column(Integer, nullable=False)  # 60, 900 or 3600
+    bucket_start = Column(DateTime, nullable=False)
+    
+    # Aggregates
+    sample_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float)
+    value_max = Column(Float)
+    
+    @property
+    def value_avg(self):
+        return self.value_sum / self.sample_count if self.sample_count else None
+    
+    def __repr__(self):
+        return f"<SensorRollup(env={self.environment_id}, metric='{self.metric}', res={self.resolution_seconds}, bucket={self.bucket_start})>"
@@ -2,6 +2,7 @@ from .user import User, UserCreate, UserUpdate, UserInDB
 from .species import Species, SpeciesCreate, SpeciesUpdate, GrowPhase, GrowPhaseCreate, GrowPhaseUpdate
 from .environment import Environment, EnvironmentCreate, EnvironmentUpdate, EnvironmentStatus, EnvironmentAssignment, EnvironmentOverride
 from .sensor_log import SensorLog, SensorLogCreate
+from .sensor_rollup import SensorRollupPoint
 from .actuator_log import ActuatorLog, ActuatorLogCreate
 from .alert_log import AlertLog, AlertLogCreate, AlertLogUpdate
 from .automation_rule import AutomationRule, AutomationRuleCreate, AutomationRuleUpdate, RuleCondition, RuleAction
@@ -11,7 +12,7 @@ __all__ = [
     "Species", "SpeciesCreate", "SpeciesUpdate", 
     "GrowPhase", "GrowPhaseCreate", "GrowPhaseUpdate",
     "Environment", "EnvironmentCreate", "EnvironmentUpdate", "EnvironmentStatus", "EnvironmentAssignment", "EnvironmentOverride",
-    "SensorLog", "SensorLogCreate",
+    "SensorLog", "SensorLogCreate", "SensorRollupPoint",
     "ActuatorLog", "ActuatorLogCreate", 
     "AlertLog", "AlertLogCreate", "AlertLogUpdate",
     "AutomationRule", "AutomationRuleCreate", "AutomationRuleUpdate",
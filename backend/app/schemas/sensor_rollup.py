@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class SensorRollupPoint(BaseModel):
+    environment_id: int
+    metric: str
+    resolution_seconds: int
+    bucket_start: datetime
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg: Optional[float] = None
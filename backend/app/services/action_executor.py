@@ -0,0 +1,395 @@
+"""
+Asynchronous execution of automation rule actions
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from ..core.metrics import REGISTRY
+from ..models.actuator_log import ActuatorLog, ActuatorType, ActuatorAction
+from ..models.alert_log import AlertLog, AlertSeverity, AlertType
+from ..models.automation_rule import ActionType
+from ..models.environment import Environment
+from ..models.species import GrowPhase
+from .rule_engine import CompiledAction, CompiledRule, rule_engine
+
+# Upper bound for exponential retry back-off
+MAX_RETRY_DELAY_SECONDS = 600
+
+# Custom scripts are killed after this long
+SCRIPT_TIMEOUT_SECONDS = 60
+
+ActuatorKey = Tuple[int, str]  # (environment id, actuator name)
+# A scheduled auto-revert: (task, loop time it fires at, state to restore, rule id)
+PendingRevert = Tuple[asyncio.Task, float, bool, Optional[int]]
+
+ACTUATOR_COMMAND_SECONDS = REGISTRY.histogram("actuator_command_duration_seconds", "Time for the driver to switch an actuator")
+ACTUATOR_COMMANDS = REGISTRY.counter("actuator_commands_total", "Actuator commands by outcome", ("result",))
+ACTUATOR_COMMANDS_OK = ACTUATOR_COMMANDS.labels("ok")
+ACTUATOR_COMMANDS_FAILED = ACTUATOR_COMMANDS.labels("failed")
+ALERTS_DISPATCHED = REGISTRY.counter("alerts_dispatched_total", "Alerts raised by source", ("source",))
+AUTOMATION_ALERTS = ALERTS_DISPATCHED.labels("automation")
+
+# driver(environment_id, actuator, state, intensity, rule_id, reason) -> previous state
+ActuatorDriver = Callable[[int, str, bool, Optional[float], Optional[int], str], Awaitable[Optional[bool]]]
+
+
+class ActuatorCommand:
+    __slots__ = ("state", "intensity", "rule_id", "reason", "future")
+
+    def __init__(self, state: bool, intensity: Optional[float], rule_id: Optional[int], reason: str, future: asyncio.Future):
+        self.state = state
+        self.intensity = intensity
+        self.rule_id = rule_id
+        self.reason = reason
+        self.future = future
+
+
+class ActionExecutor:
+    """Runs the actions of fired rules without blocking requests or other chambers.
+
+    Each (environment, actuator) pair has its own command queue and worker,
+    so a slow relay only delays commands for that actuator. A rule's actions
+    run in ``execution_order`` inside their own task, honouring
+    ``delay_before_seconds``; failures are retried ``retry_attempts`` times
+    with exponential back-off, timed actuator actions are switched back
+    after ``duration_seconds``, and runs can be cancelled per rule or
+    environment.
+    """
+
+    def __init__(self):
+        self._session_factory = None
+        self._driver: Optional[ActuatorDriver] = None
+        self._scripts_dir: Optional[str] = None
+        self._queues: Dict[ActuatorKey, asyncio.Queue] = {}
+        self._workers: Dict[ActuatorKey, asyncio.Task] = {}
+        self._reverts: Dict[ActuatorKey, PendingRevert] = {}
+        self._runs: Dict[Tuple[int, int], asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.actions_completed = 0
+        self.actions_failed = 0
+        self.retries = 0
+
+    def start(self, session_factory, driver: Optional[ActuatorDriver] = None, scripts_dir: Optional[str] = None):
+        """Use ``driver`` to switch actuators (defaults to recording the change in the database).
+
+        custom_script actions only run executables under ``scripts_dir``;
+        without it they fail.
+        """
+        self._session_factory = session_factory
+        self._driver = driver or self._record_actuator_change
+        self._scripts_dir = os.path.realpath(scripts_dir) if scripts_dir else None
+
+    async def stop(self):
+        """Cancel rule runs and pending reverts, then stop the actuator workers"""
+        tasks = list(self._runs.values()) + [revert[0] for revert in self._reverts.values()] + list(self._workers.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runs.clear()
+        self._reverts.clear()
+        self._workers.clear()
+        self._queues.clear()
+
+    def stats(self) -> dict:
+        return {
+            "running_rules": len(self._runs),
+            "pending_reverts": len(self._reverts),
+            "actuator_queues": {f"{env_id}:{name}": queue.qsize() for (env_id, name), queue in self._queues.items()},
+            "actions_completed": self.actions_completed,
+            "actions_failed": self.actions_failed,
+            "retries": self.retries,
+        }
+
+    def execute_rule(self, rule: CompiledRule, environment_id: int, fired_at: datetime):
+        """Start running a fired rule's actions in the background (rule scheduler callback)"""
+        key = (rule.id, environment_id)
+        running = self._runs.get(key)
+        if running is not None and not running.done():
+            return  # Previous run of this rule is still in progress
+        self._loop = asyncio.get_running_loop()
+        task = self._loop.create_task(self._run_rule(rule, environment_id))
+        self._runs[key] = task
+
+        def forget(finished: asyncio.Task):
+            if self._runs.get(key) is finished:
+                del self._runs[key]
+        task.add_done_callback(forget)
+
+    def cancel(self, rule_id: Optional[int] = None, environment_id: Optional[int] = None) -> int:
+        """Cancel in-progress rule runs matching the filters; returns how many were cancelled.
+
+        Pending auto-reverts are left alone so no actuator is left switched on.
+        Safe to call from a worker thread (a sync request handler): the runs
+        are then cancelled on their event loop and this waits for the count.
+        """
+        loop = self._loop
+        if loop is None:
+            return 0
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            return self._cancel_runs(rule_id, environment_id)
+
+        async def cancel_on_loop() -> int:
+            return self._cancel_runs(rule_id, environment_id)
+        return asyncio.run_coroutine_threadsafe(cancel_on_loop(), loop).result(timeout=10)
+
+    def _cancel_runs(self, rule_id: Optional[int], environment_id: Optional[int]) -> int:
+        cancelled = 0
+        for (run_rule_id, run_env_id), task in list(self._runs.items()):
+            if rule_id is not None and run_rule_id != rule_id:
+                continue
+            if environment_id is not None and run_env_id != environment_id:
+                continue
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        return cancelled
+
+    async def set_actuator(self, environment_id: int, actuator: str, state: bool, intensity: Optional[float] = None,
+                           duration_seconds: Optional[int] = None, rule_id: Optional[int] = None, reason: str = "automation") -> Optional[bool]:
+        """Queue an actuator change behind earlier commands for that actuator and wait for it.
+
+        Returns the actuator's previous state. With ``duration_seconds`` the
+        previous state is restored afterwards; a newer command for the same
+        actuator supersedes a pending restore. If the newer command fails or
+        is cancelled, the superseded restore is put back on its schedule.
+        """
+        if self._driver is None:
+            raise RuntimeError("Action executor has not been started")
+        key = (environment_id, actuator)
+        loop = asyncio.get_running_loop()
+
+        # Cancelled up front so the restore cannot fire while this command waits in the queue
+        superseded = self._reverts.pop(key, None)
+        if superseded is not None:
+            superseded[0].cancel()
+
+        future = loop.create_future()
+        self._actuator_queue(key).put_nowait(ActuatorCommand(state, intensity, rule_id, reason, future))
+        try:
+            previous = await future
+        except BaseException:
+            if superseded is not None and key not in self._reverts:
+                _, revert_at, restore, revert_rule_id = superseded
+                self._schedule_revert(key, revert_at, restore, revert_rule_id)
+            raise
+
+        if duration_seconds:
+            restore = (not state) if previous is None else previous
+            self._schedule_revert(key, loop.time() + duration_seconds, restore, rule_id)
+        return previous
+
+    def _schedule_revert(self, key: ActuatorKey, revert_at: float, state: bool, rule_id: Optional[int]):
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self._revert_after(key, max(0.0, revert_at - loop.time()), state, rule_id))
+        self._reverts[key] = (task, revert_at, state, rule_id)
+
+    def _actuator_queue(self, key: ActuatorKey) -> asyncio.Queue:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.get_running_loop().create_task(self._actuator_worker(key, queue))
+        return queue
+
+    async def _actuator_worker(self, key: ActuatorKey, queue: asyncio.Queue):
+        environment_id, actuator = key
+        while True:
+            command: ActuatorCommand = await queue.get()
+            if command.future.done():
+                continue  # Its rule run was cancelled while it waited
+            started = time.perf_counter()
+            try:
+                previous = await self._driver(environment_id, actuator, command.state, command.intensity, command.rule_id, command.reason)
+            except Exception as e:
+                ACTUATOR_COMMANDS_FAILED.inc()
+                if not command.future.done():
+                    command.future.set_exception(e)
+            else:
+                ACTUATOR_COMMAND_SECONDS.observe(time.perf_counter() - started)
+                ACTUATOR_COMMANDS_OK.inc()
+                if not command.future.done():
+                    command.future.set_result(previous)
+
+    async def _revert_after(self, key: ActuatorKey, delay_seconds: int, state: bool, rule_id: Optional[int]):
+        await asyncio.sleep(delay_seconds)
+        environment_id, actuator = key
+        future = asyncio.get_running_loop().create_future()
+        self._actuator_queue(key).put_nowait(ActuatorCommand(state, None, rule_id, "auto-revert", future))
+        pending = self._reverts.get(key)
+        if pending is not None and pending[0] is asyncio.current_task():
+            del self._reverts[key]
+        try:
+            await future
+        except Exception as e:
+            print(f"Warning: reverting {actuator} in environment {environment_id} failed: {e}")
+
+    async def _run_rule(self, rule: CompiledRule, environment_id: int):
+        for action in rule.actions:
+            if action.delay_before_seconds:
+                await asyncio.sleep(action.delay_before_seconds)
+            if not await self._run_with_retry(action, rule, environment_id):
+                return  # Later actions may depend on this one
+
+    async def _run_with_retry(self, action: CompiledAction, rule: CompiledRule, environment_id: int) -> bool:
+        for attempt in range(action.retry_attempts + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(min(action.retry_delay_seconds * 2 ** (attempt - 1), MAX_RETRY_DELAY_SECONDS))
+            try:
+                await self._perform(action, rule, environment_id)
+                self.actions_completed += 1
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: action {action.id} of rule {rule.name!r} failed (attempt {attempt + 1}): {e}")
+        self.actions_failed += 1
+        return False
+
+    async def _perform(self, action: CompiledAction, rule: CompiledRule, environment_id: int):
+        reason = f"Rule '{rule.name}'"
+        if action.action_type == ActionType.SET_ACTUATOR:
+            if not action.target_actuator:
+                raise ValueError("set_actuator action has no target_actuator")
+            state = True if action.target_state is None else action.target_state
+            await self.set_actuator(environment_id, action.target_actuator, state, action.target_intensity,
+                                    action.duration_seconds, rule.id, reason)
+        elif action.action_type == ActionType.SEND_ALERT:
+            await asyncio.to_thread(self._create_alert, action, rule, environment_id)
+        elif action.action_type == ActionType.CHANGE_PHASE:
+            await asyncio.to_thread(self._change_phase, action, environment_id)
+        elif action.action_type == ActionType.DELAY:
+            await asyncio.sleep(action.duration_seconds or 0)
+        elif action.action_type == ActionType.CUSTOM_SCRIPT:
+            await self._run_script(action, rule, environment_id)
+        else:
+            raise ValueError(f"Unsupported action type: {action.action_type}")
+
+    async def _record_actuator_change(self, environment_id: int, actuator: str, state: bool, intensity: Optional[float],
+                                      rule_id: Optional[int], reason: str) -> Optional[bool]:
+        return await asyncio.to_thread(self._write_actuator_change, environment_id, actuator, state, intensity, rule_id, reason)
+
+    def _write_actuator_change(self, environment_id, actuator, state, intensity, rule_id, reason) -> Optional[bool]:
+        db = self._session_factory()
+        try:
+            environment = db.query(Environment).filter(Environment.id == environment_id).first()
+            if environment is None:
+                raise ValueError(f"Environment {environment_id} not found")
+
+            now = datetime.utcnow()
+            column = f"{actuator}_state"
+            previous = getattr(environment, column, None)
+            if hasattr(Environment, column):
+                setattr(environment, column, state)
+                environment.last_actuator_update = now
+
+            if actuator in ActuatorType._value2member_map_:
+                db.add(ActuatorLog(
+                    environment_id=environment_id,
+                    timestamp=now,
+                    actuator_type=ActuatorType(actuator),
+                    action=ActuatorAction.ADJUST if intensity is not None else (ActuatorAction.ON if state else ActuatorAction.OFF),
+                    previous_state=previous,
+                    new_state=state,
+                    intensity=intensity,
+                    trigger_source="automation",
+                    trigger_rule_id=rule_id,
+                    trigger_reason=reason
+                ))
+            db.commit()
+            return previous
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _create_alert(self, action: CompiledAction, rule: CompiledRule, environment_id: int):
+        severity = action.alert_severity if action.alert_severity in AlertSeverity._value2member_map_ else AlertSeverity.MEDIUM
+        now = datetime.utcnow()
+        db = self._session_factory()
+        try:
+            db.add(AlertLog(
+                environment_id=environment_id,
+                alert_type=AlertType.CUSTOM,
+                severity=severity,
+                title=f"Automation rule '{rule.name}'",
+                message=action.alert_message or f"Automation rule '{rule.name}' was triggered",
+                first_occurrence=now,
+                last_occurrence=now,
+                alert_metadata={"rule_id": rule.id, "action_id": action.id}
+            ))
+            db.commit()
+            AUTOMATION_ALERTS.inc()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _change_phase(self, action: CompiledAction, environment_id: int):
+        db = self._session_factory()
+        try:
+            environment = db.query(Environment).filter(Environment.id == environment_id).first()
+            if environment is None or environment.species_id is None:
+                raise ValueError(f"Environment {environment_id} has no species assigned")
+            phase = db.query(GrowPhase).filter(
+                GrowPhase.species_id == environment.species_id,
+                GrowPhase.name == action.target_phase_name
+            ).first()
+            if phase is None:
+                raise ValueError(f"Phase '{action.target_phase_name}' not found for assigned species")
+
+            environment.current_phase_id = phase.id
+            environment.phase_start_time = datetime.utcnow()
+            db.commit()
+            rule_engine.set_environment_context(environment_id, environment.species_id, phase.name)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def resolve_script(self, script_path: Optional[str]) -> str:
+        """The real path of a script inside the scripts directory; anything else is rejected"""
+        if not script_path:
+            raise ValueError("custom_script action has no script_path")
+        if self._scripts_dir is None:
+            raise ValueError("custom_script actions are disabled (SCRIPTS_DIR is not set)")
+        # realpath follows symlinks, so a link pointing out of the directory is caught too
+        script = os.path.realpath(os.path.join(self._scripts_dir, script_path))
+        if os.path.commonpath([script, self._scripts_dir]) != self._scripts_dir:
+            raise ValueError(f"Script {script_path!r} is outside the scripts directory")
+        if not os.path.isfile(script):
+            raise ValueError(f"Script {script_path!r} not found in the scripts directory")
+        return script
+
+    async def _run_script(self, action: CompiledAction, rule: CompiledRule, environment_id: int):
+        script = self.resolve_script(action.script_path)
+        arguments = json.dumps({
+            "rule_id": rule.id,
+            "environment_id": environment_id,
+            "parameters": action.script_parameters or {}
+        })
+        process = await asyncio.create_subprocess_exec(script, arguments)
+        try:
+            returncode = await asyncio.wait_for(process.wait(), SCRIPT_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            process.kill()
+            raise
+        if returncode != 0:
+            raise RuntimeError(f"{action.script_path} exited with status {returncode}")
+
+
+# Global executor instance
+action_executor = ActionExecutor()
+REGISTRY.gauge(
+    "actuator_queue_depth", "Actuator commands waiting across all actuators",
+    lambda: sum(queue.qsize() for queue in list(action_executor._queues.values()))
+)
@@ -0,0 +1,338 @@
+"""
+Discrete-time physical model of grow chambers for soak-testing automation
+
+Temperature, humidity and CO2 respond to each chamber's fan, humidifier,
+heat mat and CO2 valve and to mycelium respiration, so readings react to
+what the rule engine switches. ``ChamberSoak`` drives one modelled chamber
+per environment through the real ingestion queue.
+
+    cd backend && python -m app.services.chamber_model --chambers 5000 --hours 24
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from ..models.environment import Environment
+from .ingestion_queue import ingestion_queue
+
+# Actuators the model responds to, as Environment.<name>_state columns
+MODELLED_ACTUATORS = ('fan', 'humidifier', 'heat_mat', 'co2_valve')
+
+# Conditions outside the chambers
+AMBIENT_TEMPERATURE_C = 20.0
+AMBIENT_HUMIDITY_PCT = 50.0
+AMBIENT_CO2_PPM = 420.0
+
+# A ~1 m3 chamber holding about 10 kg of substrate
+AIR_HEAT_CAPACITY_J_PER_K = 1200.0       # 1 m3 of air
+CHAMBER_HEAT_CAPACITY_J_PER_K = 20000.0  # Air, walls and substrate together
+WALL_LOSS_W_PER_K = 5.0
+LEAK_AIR_CHANGES_PER_HOUR = 0.5
+FAN_AIR_CHANGES_PER_HOUR = 30.0
+HEAT_MAT_W = 60.0
+HUMIDIFIER_HPA_PER_SECOND = 0.1
+CO2_VALVE_PPM_PER_SECOND = 5.0
+SUBSTRATE_EVAPORATION_PER_SECOND = 1 / 1800
+
+# Respiration at full activity
+RESPIRATION_HEAT_W = 8.0
+RESPIRATION_CO2_PPM_PER_SECOND = 0.3
+
+# Respiration relative to full activity by grow phase (None: no phase running)
+STAGE_RESPIRATION = {
+    'colonization': 1.0,
+    'consolidation': 0.7,
+    'fruiting': 0.6,
+    None: 0.1,
+}
+
+# Standard deviation of simulated sensor noise
+SENSOR_NOISE = {'temperature': 0.1, 'humidity': 0.8, 'co2_level': 15.0}
+
+
+def _numpy():
+    """Import NumPy on first use so the API does not load it unless the model runs"""
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("The chamber model requires NumPy (pip install numpy)") from e
+    return numpy
+
+
+def saturation_vapour_pressure(np, temperature_c):
+    """Magnus formula, hPa"""
+    return 6.112 * np.exp(17.62 * temperature_c / (243.12 + temperature_c))
+
+
+class ChamberModel:
+    """State of many chambers as NumPy arrays, advanced together by ``step``.
+
+    Each quantity relaxes towards an equilibrium set by ventilation and its
+    sources, and is integrated exactly over the step, so large steps stay
+    stable and the model can run far faster than real time. Humidity is
+    tracked as vapour pressure so heating a chamber lowers its RH.
+    """
+
+    def __init__(self, chambers: int, seed: Optional[int] = None):
+        np = self._np = _numpy()
+        self.chambers = chambers
+        self.rng = np.random.default_rng(seed)
+        self.temperature = np.full(chambers, AMBIENT_TEMPERATURE_C)
+        self.vapour_pressure = saturation_vapour_pressure(np, self.temperature) * AMBIENT_HUMIDITY_PCT / 100
+        self.co2 = np.full(chambers, AMBIENT_CO2_PPM)
+        self.respiration = np.full(chambers, STAGE_RESPIRATION[None])
+        self.actuators = {name: np.zeros(chambers, dtype=bool) for name in MODELLED_ACTUATORS}
+        self.elapsed_seconds = 0.0
+
+    @property
+    def humidity(self):
+        np = self._np
+        return np.minimum(100 * self.vapour_pressure / saturation_vapour_pressure(np, self.temperature), 100.0)
+
+    def set_state(self, index: int, temperature: Optional[float] = None, humidity: Optional[float] = None, co2: Optional[float] = None):
+        """Start a chamber from known readings"""
+        if temperature is not None:
+            self.temperature[index] = temperature
+        if humidity is not None:
+            self.vapour_pressure[index] = saturation_vapour_pressure(self._np, self.temperature[index]) * humidity / 100
+        if co2 is not None:
+            self.co2[index] = co2
+
+    def step(self, dt: float):
+        """Advance every chamber by ``dt`` seconds"""
+        np = self._np
+        fan = self.actuators['fan']
+        air_exchange = (LEAK_AIR_CHANGES_PER_HOUR + fan * FAN_AIR_CHANGES_PER_HOUR) / 3600
+
+        # Temperature: wall losses plus the air swapped by ventilation
+        k_temperature = WALL_LOSS_W_PER_K / CHAMBER_HEAT_CAPACITY_J_PER_K \
+            + air_exchange * AIR_HEAT_CAPACITY_J_PER_K / CHAMBER_HEAT_CAPACITY_J_PER_K
+        heat = (self.actuators['heat_mat'] * HEAT_MAT_W + self.respiration * RESPIRATION_HEAT_W) / CHAMBER_HEAT_CAPACITY_J_PER_K
+        self._relax(self.temperature, k_temperature, AMBIENT_TEMPERATURE_C + heat / k_temperature, dt)
+
+        # Water vapour: exchanged with outside air, evaporated from the substrate, added by the humidifier
+        saturation = saturation_vapour_pressure(np, self.temperature)
+        ambient_vapour = saturation_vapour_pressure(np, AMBIENT_TEMPERATURE_C) * AMBIENT_HUMIDITY_PCT / 100
+        k_evaporation = SUBSTRATE_EVAPORATION_PER_SECOND * self.respiration
+        k_vapour = air_exchange + k_evaporation
+        vapour_equilibrium = (air_exchange * ambient_vapour + k_evaporation * saturation
+                              + self.actuators['humidifier'] * HUMIDIFIER_HPA_PER_SECOND) / k_vapour
+        self._relax(self.vapour_pressure, k_vapour, vapour_equilibrium, dt)
+        np.minimum(self.vapour_pressure, saturation, out=self.vapour_pressure)  # Condensation
+
+        # CO2: respiration and the valve against ventilation
+        co2_sources = self.respiration * RESPIRATION_CO2_PPM_PER_SECOND + self.actuators['co2_valve'] * CO2_VALVE_PPM_PER_SECOND
+        self._relax(self.co2, air_exchange, AMBIENT_CO2_PPM + co2_sources / air_exchange, dt)
+
+        self.elapsed_seconds += dt
+
+    def _relax(self, value, rate, equilibrium, dt: float):
+        """Exact solution of dx/dt = rate * (equilibrium - x) over dt, in place"""
+        value += (equilibrium - value) * -self._np.expm1(-rate * dt)
+
+    def sample(self) -> Dict[str, object]:
+        """Noisy sensor readings for every chamber, keyed by SensorLog column"""
+        np = self._np
+        shape = self.chambers
+        return {
+            'temperature': np.round(self.temperature + self.rng.normal(0, SENSOR_NOISE['temperature'], shape), 2),
+            'humidity': np.round(np.clip(self.humidity + self.rng.normal(0, SENSOR_NOISE['humidity'], shape), 0, 100), 2),
+            'co2_level': np.round(np.maximum(self.co2 + self.rng.normal(0, SENSOR_NOISE['co2_level'], shape), 0), 1),
+            'airflow': np.round(np.where(self.actuators['fan'], 1.5, 0.1) + self.rng.normal(0, 0.05, shape).clip(-0.1, 0.1), 2),
+        }
+
+
+class ChamberSoak:
+    """Feeds modelled readings for every environment into the ingestion queue.
+
+    Every ``interval_seconds`` of wall time the model advances
+    ``interval_seconds * speed`` simulated seconds, picks up actuator states
+    from the Environment rows (where the action executor records them) and
+    submits one reading per environment, so the rule engine, actuator
+    commands and the model form a closed loop. Readings are stamped with
+    wall-clock time.
+    """
+
+    def __init__(self):
+        self._session_factory = None
+        self._read_session_factory = None
+        self._task: Optional[asyncio.Task] = None
+        self.model: Optional[ChamberModel] = None
+        self.environment_ids: List[int] = []
+        self.interval_seconds = 30.0
+        self.speed = 1.0
+        self._seed: Optional[int] = None
+        self.ticks = 0
+        self.readings_submitted = 0
+        self.late_ticks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, session_factory, interval_seconds: float = 30, speed: float = 1.0, seed: Optional[int] = None,
+              read_session_factory=None):
+        """Model every environment and start submitting readings on the running event loop.
+
+        Actuator states are polled every tick through ``read_session_factory``
+        (defaults to ``session_factory``) so polling does not queue behind writes.
+        """
+        if self._task is not None:
+            return
+        self._session_factory = session_factory
+        self._read_session_factory = read_session_factory or session_factory
+        self.interval_seconds = interval_seconds
+        self.speed = speed
+        self._seed = seed
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Warning: chamber simulation had stopped with an error: {e}")
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "chambers": len(self.environment_ids),
+            "ticks": self.ticks,
+            "simulated_hours": round(self.model.elapsed_seconds / 3600, 2) if self.model else 0,
+            "readings_submitted": self.readings_submitted,
+            "late_ticks": self.late_ticks,
+        }
+
+    def _load_environments(self):
+        db = self._session_factory()
+        try:
+            environments = db.execute(
+                select(Environment).options(selectinload(Environment.current_phase)).order_by(Environment.id)
+            ).scalars().all()
+            model = ChamberModel(len(environments), self._seed)
+            for index, env in enumerate(environments):
+                model.set_state(index, env.current_temperature, env.current_humidity, env.current_co2)
+                phase = env.current_phase.name if env.current_phase else None
+                model.respiration[index] = STAGE_RESPIRATION.get(phase, STAGE_RESPIRATION['colonization'])
+            return [env.id for env in environments], model
+        finally:
+            db.close()
+
+    def _read_actuators(self) -> List[tuple]:
+        columns = [getattr(Environment, f"{name}_state") for name in MODELLED_ACTUATORS]
+        db = self._read_session_factory()
+        try:
+            return db.execute(select(Environment.id, *columns)).all()
+        finally:
+            db.close()
+
+    def _apply_actuators(self, rows: List[tuple]):
+        index_of = {env_id: index for index, env_id in enumerate(self.environment_ids)}
+        for env_id, *states in rows:
+            index = index_of.get(env_id)
+            if index is None:
+                continue
+            for name, state in zip(MODELLED_ACTUATORS, states):
+                self.model.actuators[name][index] = bool(state)
+
+    async def _run(self):
+        self.environment_ids, self.model = await asyncio.to_thread(self._load_environments)
+        if not self.environment_ids:
+            print("Warning: chamber simulation has no environments to model")
+            return
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            # One failed tick (a locked database, say) must not end the soak run
+            try:
+                await self._tick()
+            except Exception as e:
+                print(f"Warning: chamber simulation tick failed: {e}")
+            self.ticks += 1
+
+            next_tick += self.interval_seconds
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Ingestion is not keeping up; skip ahead rather than bursting
+                self.late_ticks += 1
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def _tick(self):
+        self._apply_actuators(await asyncio.to_thread(self._read_actuators))
+        self.model.step(self.interval_seconds * self.speed)
+        readings = self.model.sample()
+        now = datetime.utcnow()
+        columns = {column: values.tolist() for column, values in readings.items()}
+        rows = [
+            {
+                'environment_id': env_id,
+                'timestamp': now,
+                'sensor_type': 'chamber_model',
+                'raw_data': {'simulated': True, 'model': 'chamber'},
+                **{column: values[index] for column, values in columns.items()},
+            }
+            for index, env_id in enumerate(self.environment_ids)
+        ]
+        await ingestion_queue.submit_many(rows)
+        self.readings_submitted += len(rows)
+
+
+def run_benchmark(chambers: int = 5000, hours: float = 24, dt: float = 10, seed: Optional[int] = 1) -> dict:
+    """Step the model under a simple in-array thermostat/humidistat/CO2 controller"""
+    np = _numpy()
+    model = ChamberModel(chambers, seed)
+    model.respiration[:] = model.rng.choice([STAGE_RESPIRATION['colonization'], STAGE_RESPIRATION['fruiting']], chambers)
+    steps = int(hours * 3600 / dt)
+    in_band = 0.0
+    actuator_switches = 0
+
+    started = time.perf_counter()
+    for _ in range(steps):
+        previous = {name: state.copy() for name, state in model.actuators.items()}
+        readings = model.sample()
+        model.actuators['heat_mat'] = readings['temperature'] < np.where(model.actuators['heat_mat'], 23.0, 22.0)
+        model.actuators['humidifier'] = readings['humidity'] < np.where(model.actuators['humidifier'], 92.0, 85.0)
+        model.actuators['fan'] = readings['co2_level'] > np.where(model.actuators['fan'], 700.0, 1000.0)
+        actuator_switches += sum(int((previous[name] != model.actuators[name]).sum()) for name in MODELLED_ACTUATORS)
+        model.step(dt)
+        in_band += float(((model.temperature > 21) & (model.temperature < 24) & (model.co2 < 1200)).mean())
+    elapsed = time.perf_counter() - started
+
+    return {
+        "chambers": chambers,
+        "simulated_hours": hours,
+        "step_seconds": dt,
+        "wall_seconds": round(elapsed, 2),
+        "chamber_steps_per_second": round(chambers * steps / elapsed),
+        "realtime_factor": round(hours * 3600 / elapsed),
+        "fraction_in_band": round(in_band / steps, 3),
+        "actuator_switches": actuator_switches,
+        "mean_temperature": round(float(model.temperature.mean()), 2),
+        "mean_humidity": round(float(model.humidity.mean()), 1),
+        "mean_co2": round(float(model.co2.mean()), 1),
+    }
+
+
+# Global soak runner instance
+chamber_soak = ChamberSoak()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the chamber model under a simple closed-loop controller")
+    parser.add_argument("--chambers", type=int, default=5000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--dt", type=float, default=10, help="Simulated seconds per step")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.chambers, args.hours, args.dt, args.seed), indent=2))
@@ -0,0 +1,137 @@
+"""
+Incremental "condition true since" tracking for duration-based rule conditions
+"""
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1)
+
+TrackerKey = Tuple[int, int]  # (rule condition id, environment id)
+
+
+class ConditionTracker:
+    """Remembers since when each (condition, environment) pair has held.
+
+    Each reading moves a pair's state machine in O(1): a true reading starts
+    the clock if it is not running, a false one stops it. Whether a
+    condition has held for its duration is then a subtraction, with no
+    history queries. The running clocks are snapshotted to a small JSON
+    file so sustained conditions survive a restart.
+    """
+
+    def __init__(self):
+        self._true_since: Dict[TrackerKey, datetime] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def update(self, condition_id: int, environment_id: int, holds: bool, timestamp: datetime) -> Optional[datetime]:
+        """Record whether the condition holds at ``timestamp``; returns since when it has held"""
+        key = (condition_id, environment_id)
+        with self._lock:
+            since = self._true_since.get(key)
+            if holds:
+                if since is None:
+                    since = self._true_since[key] = timestamp
+                    self._dirty = True
+                return since
+            if since is not None:
+                del self._true_since[key]
+                self._dirty = True
+            return None
+
+    def true_since(self, condition_id: int, environment_id: int) -> Optional[datetime]:
+        return self._true_since.get((condition_id, environment_id))
+
+    def prune(self, condition_ids: Iterable[int]):
+        """Forget clocks for conditions that no longer exist"""
+        keep = set(condition_ids)
+        with self._lock:
+            stale = [key for key in self._true_since if key[0] not in keep]
+            for key in stale:
+                del self._true_since[key]
+            self._dirty = self._dirty or bool(stale)
+
+    def reset(self, condition_ids: Iterable[int] = (), environment_ids: Iterable[int] = ()):
+        """Stop the clocks of the given conditions, and of every condition in the given environments"""
+        conditions, environments = set(condition_ids), set(environment_ids)
+        if not conditions and not environments:
+            return
+        with self._lock:
+            stale = [key for key in self._true_since if key[0] in conditions or key[1] in environments]
+            for key in stale:
+                del self._true_since[key]
+            self._dirty = self._dirty or bool(stale)
+
+    def items(self) -> Dict[TrackerKey, datetime]:
+        with self._lock:
+            return dict(self._true_since)
+
+    def save(self, path: str) -> bool:
+        """Write the running clocks to ``path`` if they changed; returns whether it wrote"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            entries = [
+                [condition_id, environment_id, round((since - _EPOCH).total_seconds(), 3)]
+                for (condition_id, environment_id), since in self._true_since.items()
+            ]
+            self._dirty = False
+
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump({"version": 1, "true_since": entries}, f, separators=(",", ":"))
+            os.replace(temp_path, path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def load(self, path: str) -> int:
+        """Restore clocks saved by ``save``; returns how many were loaded"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable condition snapshot {path}: {e}")
+            return 0
+
+        with self._lock:
+            for condition_id, environment_id, seconds in data.get("true_since", []):
+                self._true_since.setdefault((condition_id, environment_id), _EPOCH + timedelta(seconds=seconds))
+            return len(self._true_since)
+
+    def start(self, path: str, interval_seconds: float):
+        """Snapshot to ``path`` every ``interval_seconds`` on the running event loop"""
+        if self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._save_periodically(path, interval_seconds))
+
+    async def stop(self, path: str):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        await asyncio.to_thread(self.save, path)
+
+    async def _save_periodically(self, path: str, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.save, path)
+            except Exception as e:
+                print(f"Warning: condition snapshot failed: {e}")
+
+
+# Global tracker instance
+condition_tracker = ConditionTracker()
@@ -0,0 +1,238 @@
+"""
+Single-writer ingestion queue that group-commits sensor readings
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+from sqlalchemy import insert
+from ..core.metrics import REGISTRY, SIZE_BUCKETS
+from ..models.sensor_log import SensorLog
+from .latest_state import latest_state_cache
+from .rollups import apply_rollups, to_naive_utc
+from .rule_engine import rule_engine
+
+
+# A submission: the readings to insert, the future resolved once they commit
+# and when it was queued (time.monotonic())
+Submission = Tuple[List[dict], asyncio.Future, float]
+
+READINGS_INGESTED = REGISTRY.counter("sensor_readings_ingested_total", "Sensor readings committed")
+GROUP_ROWS = REGISTRY.histogram("ingestion_group_rows", "Readings per group commit", buckets=SIZE_BUCKETS)
+GROUP_WRITE_SECONDS = REGISTRY.histogram(
+    "ingestion_group_write_seconds", "Time to insert, roll up and commit one group"
+)
+
+
+class IngestionQueue:
+    """Coalesces sensor readings from many requests into few transactions.
+
+    A single writer task drains the queue and commits everything that
+    arrived within ``max_delay_ms`` (or ``max_rows`` rows, whichever comes
+    first) as one multi-row INSERT. Callers await their submission and only
+    get their rows back once the group holding them has committed.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+        self._max_rows = 500
+        self._max_delay = 0.02
+        self.groups_committed = 0
+        self.rows_committed = 0
+        self.last_commit_at: Optional[float] = None  # time.monotonic()
+        # Queue times of the submissions still in the queue, oldest first,
+        # and of the oldest one in the group being written
+        self._queued_at: Deque[float] = deque()
+        self._writing_since: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, session_factory, enabled: bool = True, max_rows: int = 500, max_delay_ms: int = 20, max_pending: int = 10000):
+        """Start the writer task on the running event loop.
+
+        When disabled, submissions are still accepted but each one is
+        written in its own transaction.
+        """
+        self._session_factory = session_factory
+        self._max_rows = max(1, max_rows)
+        self._max_delay = max(0, max_delay_ms) / 1000
+        if enabled and self._task is None:
+            # Bounded so producers feel backpressure when the writer falls behind
+            self._queue = asyncio.Queue(maxsize=max_pending)
+            self.last_commit_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commit everything already queued, then stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+        self._queued_at.clear()
+
+    async def submit(self, reading: dict) -> SensorLog:
+        """Queue one reading (SensorLog column values); returns it once committed"""
+        return (await self.submit_many([reading]))[0]
+
+    async def submit_many(self, readings: List[dict]) -> List[SensorLog]:
+        """Queue readings to be committed together; returns them once committed"""
+        if self._session_factory is None:
+            raise RuntimeError("Ingestion queue has not been started")
+        if not readings:
+            return []
+        if self._task is None:
+            logs, write_seconds = await asyncio.to_thread(self._write, readings)
+            await asyncio.to_thread(self._publish, logs, write_seconds)
+            return logs
+
+        future = asyncio.get_running_loop().create_future()
+        queued_at = time.monotonic()
+        await self._queue.put((list(readings), future, queued_at))
+        # Nothing else runs between the put and this append, so the two stay in the same order
+        self._queued_at.append(queued_at)
+        return await future
+
+    def stats(self) -> dict:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return {
+            "running": self.running,
+            "pending": pending,
+            "max_pending": self._queue.maxsize if self._queue is not None else 0,
+            "groups_committed": self.groups_committed,
+            "rows_committed": self.rows_committed,
+            "lag_seconds": self.lag_seconds(),
+        }
+
+    def lag_seconds(self) -> float:
+        """How long the oldest uncommitted submission has been waiting; 0 when there is none"""
+        oldest = self._writing_since
+        if oldest is None and self._queued_at:
+            oldest = self._queued_at[0]
+        if oldest is None:
+            return 0.0
+        return round(time.monotonic() - oldest, 3)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            self._queued_at.popleft()
+
+            batch: List[Submission] = [item]
+            rows = len(item[0])
+            deadline = loop.time() + self._max_delay
+            while rows < self._max_rows:
+                # Take whatever is already waiting before sleeping on the queue
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                self._queued_at.popleft()
+                batch.append(item)
+                rows += len(item[0])
+
+            self._writing_since = batch[0][2]
+            try:
+                await self._commit(batch)
+            finally:
+                self._writing_since = None
+
+    async def _commit(self, batch: List[Submission]):
+        readings = [reading for submission, *_ in batch for reading in submission]
+        try:
+            logs, write_seconds = await asyncio.to_thread(self._write, readings)
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # Retry submissions one by one so a bad reading only fails its own caller
+            for submission in batch:
+                await self._commit([submission])
+            return
+
+        # Outside the retried region: the rows are committed, so a failure
+        # here must not send them through _write again
+        await asyncio.to_thread(self._publish, logs, write_seconds)
+
+        offset = 0
+        for submission, future, _ in batch:
+            if not future.done():
+                future.set_result(logs[offset:offset + len(submission)])
+            offset += len(submission)
+
+    def _write(self, readings: List[dict]) -> Tuple[List[SensorLog], float]:
+        """Insert readings in one transaction (runs in a worker thread).
+
+        Returns the committed logs and the seconds the write took.
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        params = [
+            {**reading, "timestamp": to_naive_utc(reading.get("timestamp")), "created_at": now, "updated_at": now}
+            for reading in readings
+        ]
+        table = SensorLog.__table__
+
+        db = self._session_factory()
+        try:
+            # One executemany; SQLAlchemy batches it into multi-row INSERT ... RETURNING
+            ids = db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                params
+            ).scalars().all()
+            logs = [SensorLog(id=log_id, **row) for log_id, row in zip(ids, params)]
+            apply_rollups(db, logs)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return logs, time.perf_counter() - started
+
+    def _publish(self, logs: List[SensorLog], write_seconds: float):
+        """Post-commit work for a written group (runs in a worker thread)"""
+        self.groups_committed += 1
+        self.rows_committed += len(logs)
+        self.last_commit_at = time.monotonic()
+        try:
+            GROUP_WRITE_SECONDS.observe(write_seconds)
+            GROUP_ROWS.observe(len(logs))
+            READINGS_INGESTED.inc(len(logs))
+        except Exception as e:
+            print(f"Warning: Failed to record ingestion metrics: {e}")
+
+        for log in logs:
+            try:
+                latest_state_cache.record_log(log)
+            except Exception as e:
+                print(f"Warning: Failed to update latest state for sensor log {log.id}: {e}")
+            try:
+                rule_engine.evaluate_log(log)
+            except Exception as e:
+                print(f"Warning: Failed to evaluate rules for sensor log {log.id}: {e}")
+
+
+# Global queue instance
+ingestion_queue = IngestionQueue()
+REGISTRY.gauge("ingestion_queue_depth", "Submissions waiting for the writer", lambda: ingestion_queue.stats()["pending"])
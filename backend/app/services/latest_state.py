@@ -0,0 +1,159 @@
+"""
+Write-through cache of the latest sensor state per environment
+"""
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from ..models.environment import Environment
+from ..models.sensor_log import SensorLog
+
+
+# SensorLog reading column -> Environment "current" column
+ENVIRONMENT_STATE_COLUMNS = {
+    'temperature': 'current_temperature',
+    'humidity': 'current_humidity',
+    'co2_level': 'current_co2',
+    'light_level': 'current_light_level',
+    'airflow': 'current_airflow',
+}
+
+
+class LatestStateCache:
+    """Keeps each environment's latest readings in memory.
+
+    Every ingested reading updates the cache immediately; changed
+    environments are written back to their ``Environment.current_*``
+    columns in one batched UPDATE on each flush.
+    """
+
+    def __init__(self):
+        self._state: Dict[int, dict] = {}
+        # environment id -> state column -> timestamp of the reading that set it
+        self._reading_times: Dict[int, Dict[str, datetime]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def warm(self, db: Session):
+        """Load the last flushed state so reads are served from memory after a restart"""
+        columns = [getattr(Environment, c) for c in ENVIRONMENT_STATE_COLUMNS.values()]
+        rows = db.query(Environment.id, Environment.last_sensor_reading, *columns).all()
+        with self._lock:
+            for row in rows:
+                state = dict(zip(ENVIRONMENT_STATE_COLUMNS.values(), row[2:]))
+                state['last_sensor_reading'] = row.last_sensor_reading
+                if row.id not in self._state:
+                    self._state[row.id] = state
+                    # Only the environment-wide time was persisted
+                    self._reading_times[row.id] = {
+                        column: row.last_sensor_reading
+                        for column, value in state.items()
+                        if value is not None and column != 'last_sensor_reading' and row.last_sensor_reading is not None
+                    }
+
+    def record(self, environment_id: int, timestamp: datetime, readings: Dict[str, Optional[float]]):
+        """Apply a reading keyed by SensorLog column name (temperature, co2_level, ...)"""
+        with self._lock:
+            state = self._state.get(environment_id)
+            if state is None:
+                state = self._state[environment_id] = dict.fromkeys(ENVIRONMENT_STATE_COLUMNS.values())
+                state['last_sensor_reading'] = None
+            times = self._reading_times.setdefault(environment_id, {})
+
+            # Staleness is per column: a late humidity reading must not hide a newer temperature
+            changed = False
+            for column, value in readings.items():
+                if value is None or column not in ENVIRONMENT_STATE_COLUMNS:
+                    continue
+                state_column = ENVIRONMENT_STATE_COLUMNS[column]
+                last = times.get(state_column)
+                if last is not None and timestamp < last:
+                    continue  # Late or replayed reading
+                state[state_column] = value
+                times[state_column] = timestamp
+                changed = True
+            if not changed:
+                return
+            if state['last_sensor_reading'] is None or timestamp > state['last_sensor_reading']:
+                state['last_sensor_reading'] = timestamp
+            self._dirty.add(environment_id)
+
+    def record_log(self, log: SensorLog):
+        self.record(
+            log.environment_id,
+            log.timestamp,
+            {column: getattr(log, column) for column in ENVIRONMENT_STATE_COLUMNS}
+        )
+
+    def get(self, environment_id: int) -> Optional[dict]:
+        """Latest state for an environment, or None if no reading has been seen.
+
+        ``reading_times`` maps each state column to the time of its own reading.
+        """
+        with self._lock:
+            state = self._state.get(environment_id)
+            if state is None or state['last_sensor_reading'] is None:
+                return None
+            return {**state, 'reading_times': dict(self._reading_times.get(environment_id, {}))}
+
+    def last_reading_times(self) -> Dict[int, Optional[datetime]]:
+        """Timestamp of the latest reading per environment (None if it never reported)"""
+        with self._lock:
+            return {environment_id: state['last_sensor_reading'] for environment_id, state in self._state.items()}
+
+    def flush(self, db: Session) -> int:
+        """Write changed environments back to the database; returns rows updated"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            rows: List[dict] = [{'id': env_id, **self._state[env_id]} for env_id in self._dirty]
+            self._dirty = set()
+
+        try:
+            # ORM bulk UPDATE by primary key: one executemany for all environments
+            db.execute(update(Environment), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty.update(row['id'] for row in rows)
+            raise
+        return len(rows)
+
+    def start(self, session_factory, interval_seconds: float):
+        """Flush every ``interval_seconds`` on the running event loop"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically(session_factory, interval_seconds))
+
+    async def stop(self, session_factory):
+        """Cancel the periodic flush and write out anything pending"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self._flush_with_session, session_factory)
+
+    async def _flush_periodically(self, session_factory, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self._flush_with_session, session_factory)
+            except Exception as e:
+                print(f"Warning: latest state flush failed: {e}")
+
+    def _flush_with_session(self, session_factory) -> int:
+        db = session_factory()
+        try:
+            return self.flush(db)
+        finally:
+            db.close()
+
+
+# Global cache instance
+latest_state_cache = LatestStateCache()
@@ -0,0 +1,208 @@
+"""
+In-process MQTT broker stand-in and fake MCUs for offline transport testing
+
+    cd backend && python -m app.services.mqtt_broker --commands 20000 --mcus 8
+"""
+import argparse
+import asyncio
+import json
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+from .mqtt_transport import (
+    CONNACK, CONNECT, DISCONNECT, PINGREQ, PINGRESP, PUBACK, PUBLISH, SUBACK, SUBSCRIBE,
+    MQTTClient, MQTTTransport, decode_publish, decode_string, encode_packet, encode_publish,
+    read_packet, topic_matches,
+)
+
+
+class _Session:
+    __slots__ = ("writer", "subscriptions", "next_packet_id")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions: Dict[str, int] = {}
+        self.next_packet_id = 0
+
+    def packet_id(self) -> int:
+        self.next_packet_id = self.next_packet_id % 65535 + 1
+        return self.next_packet_id
+
+
+class InProcessBroker:
+    """Minimal MQTT 3.1.1 broker on localhost.
+
+    Routes QoS 0/1 publishes to matching subscribers at the lower of the
+    two QoS levels. There is no persistence, retained messages or
+    redelivery; it exists so the transport can be exercised without a
+    real broker.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: List[_Session] = []
+        self.messages_routed = 0
+
+    async def start(self) -> int:
+        """Start listening; returns the bound port"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for session in list(self._sessions):
+            session.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = _Session(writer)
+        try:
+            packet_type, _, _ = await read_packet(reader)
+            if packet_type != CONNECT:
+                return
+            writer.write(encode_packet(CONNACK, 0, b"\x00\x00"))
+            self._sessions.append(session)
+
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                if packet_type == PUBLISH:
+                    topic, payload, qos, packet_id = decode_publish(flags, body)
+                    if qos:
+                        writer.write(encode_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                    self._route(topic, payload, qos)
+                elif packet_type == SUBSCRIBE:
+                    packet_id = body[:2]
+                    offset = 2
+                    granted = bytearray()
+                    while offset < len(body):
+                        topic_filter, offset = decode_string(body, offset)
+                        qos = min(body[offset], 1)
+                        offset += 1
+                        session.subscriptions[topic_filter] = qos
+                        granted.append(qos)
+                    writer.write(encode_packet(SUBACK, 0, packet_id + bytes(granted)))
+                elif packet_type == PINGREQ:
+                    writer.write(encode_packet(PINGRESP, 0))
+                elif packet_type == DISCONNECT:
+                    break
+                # PUBACKs from subscribers need no bookkeeping without redelivery
+                if writer.transport.get_write_buffer_size() > 256 * 1024:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            writer.close()
+
+    def _route(self, topic: str, payload: bytes, qos: int):
+        for session in self._sessions:
+            granted = None
+            for topic_filter, sub_qos in session.subscriptions.items():
+                if topic_matches(topic_filter, topic):
+                    granted = max(granted or 0, sub_qos)
+            if granted is None:
+                continue
+            delivery_qos = min(qos, granted)
+            packet_id = session.packet_id() if delivery_qos else None
+            session.writer.write(encode_publish(topic, payload, delivery_qos, packet_id))
+            self.messages_routed += 1
+
+
+class FakeMCU:
+    """Acknowledges commands on its command topic and can publish telemetry"""
+
+    def __init__(self, mcu_id: str, host: str, port: int, topic_prefix: str = "mushroom", fail_commands: Tuple[str, ...] = ()):
+        self.mcu_id = mcu_id
+        self.topic_prefix = topic_prefix
+        self.fail_commands = fail_commands
+        self.client = MQTTClient(host, port, client_id=f"fake-{mcu_id}")
+        self.commands: List[dict] = []
+
+    async def start(self):
+        await self.client.subscribe(f"{self.topic_prefix}/{self.mcu_id}/cmd", self._on_command)
+        await self.client.connect()
+
+    async def stop(self):
+        await self.client.disconnect()
+
+    async def publish_telemetry(self, reading: dict, qos: int = 0):
+        await self.client.publish(f"{self.topic_prefix}/{self.mcu_id}/telemetry", json.dumps(reading), qos)
+
+    async def _on_command(self, topic: str, payload: bytes):
+        command = json.loads(payload)
+        self.commands.append(command)
+        ack = {"msgId": command.get("msgId"), "ok": command.get("cmd") not in self.fail_commands}
+        await self.client.publish(f"{self.topic_prefix}/{self.mcu_id}/ack", json.dumps(ack), qos=0)
+
+
+async def run_load_test(commands: int = 10000, mcus: int = 4, telemetry: int = 10000, max_inflight: int = 100) -> dict:
+    """Measure command round trips and telemetry fan-in through the local broker"""
+    broker = InProcessBroker()
+    port = await broker.start()
+    fakes = [FakeMCU(f"MCU_{i + 1:03d}", broker.host, port) for i in range(mcus)]
+    for fake in fakes:
+        await fake.start()
+    transport = MQTTTransport.connect_to(broker.host, port, max_inflight=max_inflight)
+    received = 0
+    all_received = asyncio.Event()
+
+    def on_telemetry(mcu_id: str, reading: dict):
+        nonlocal received
+        received += 1
+        if received >= telemetry:
+            all_received.set()
+
+    await transport.on_telemetry(on_telemetry)
+    await transport.start()
+
+    latencies: List[float] = []
+
+    async def timed_send(index: int) -> bool:
+        started = time.perf_counter()
+        ok = await transport.send_command(fakes[index % mcus].mcu_id, {"cmd": "SET_ACTUATOR", "seq": index})
+        latencies.append(time.perf_counter() - started)
+        return ok
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(timed_send(i) for i in range(commands)))
+    command_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index in range(telemetry):
+        await fakes[index % mcus].publish_telemetry({"tempC": 22.5, "rh": 88.0, "seq": index})
+    if telemetry:
+        await asyncio.wait_for(all_received.wait(), 60)
+    telemetry_seconds = time.perf_counter() - started
+
+    await transport.stop()
+    for fake in fakes:
+        await fake.stop()
+    await broker.stop()
+
+    latencies.sort()
+    return {
+        "commands": commands,
+        "acknowledged": sum(results),
+        "commands_per_second": round(commands / command_seconds) if command_seconds else None,
+        "ack_latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "ack_latency_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "telemetry": telemetry,
+        "telemetry_per_second": round(telemetry / telemetry_seconds) if telemetry_seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the MQTT transport against an in-process broker")
+    parser.add_argument("--commands", type=int, default=10000)
+    parser.add_argument("--mcus", type=int, default=4)
+    parser.add_argument("--telemetry", type=int, default=10000)
+    parser.add_argument("--max-inflight", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_load_test(args.commands, args.mcus, args.telemetry, args.max_inflight)), indent=2))
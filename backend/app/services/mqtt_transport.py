@@ -0,0 +1,433 @@
+"""
+Asyncio MQTT 3.1.1 client and MCU command/telemetry transport
+
+Topics, under a configurable prefix (``MQTT_TOPIC_PREFIX``):
+
+    {prefix}/{mcu_id}/cmd        server -> MCU  JSON command with a "msgId"
+    {prefix}/{mcu_id}/ack        MCU -> server  {"msgId": ..., "ok": true|false}
+    {prefix}/{mcu_id}/telemetry  MCU -> server  JSON reading
+
+Only the parts of MQTT the transport needs are implemented (QoS 0/1,
+no retained messages or wills), so there is no third-party dependency.
+"""
+import asyncio
+import itertools
+import json
+import struct
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+# Control packet types
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+MessageCallback = Callable[[str, bytes], Union[None, Awaitable[None]]]
+
+
+class MQTTError(Exception):
+    pass
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def decode_string(data: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = struct.unpack_from("!H", data, offset)
+    start = offset + 2
+    return data[start:start + length].decode("utf-8"), start + length
+
+
+def encode_packet(packet_type: int, flags: int, body: bytes = b"") -> bytes:
+    """Fixed header (type, flags, variable-length remaining length) plus body"""
+    header = bytearray([packet_type << 4 | flags])
+    length = len(body)
+    while True:
+        byte = length % 128
+        length //= 128
+        header.append(byte | 0x80 if length else byte)
+        if not length:
+            break
+    return bytes(header) + body
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """Read one control packet; returns (type, flags, body)"""
+    first = (await reader.readexactly(1))[0]
+    length = 0
+    multiplier = 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+        if multiplier > 128 ** 3:
+            raise MQTTError("Malformed remaining length")
+    body = await reader.readexactly(length) if length else b""
+    return first >> 4, first & 0x0F, body
+
+
+def encode_publish(topic: str, payload: bytes, qos: int = 0, packet_id: Optional[int] = None, dup: bool = False) -> bytes:
+    flags = (0x08 if dup else 0) | qos << 1
+    body = encode_string(topic)
+    if qos:
+        body += struct.pack("!H", packet_id)
+    return encode_packet(PUBLISH, flags, body + payload)
+
+
+def decode_publish(flags: int, body: bytes) -> Tuple[str, bytes, int, Optional[int]]:
+    """Returns (topic, payload, qos, packet_id)"""
+    qos = (flags >> 1) & 0x03
+    topic, offset = decode_string(body, 0)
+    packet_id = None
+    if qos:
+        (packet_id,) = struct.unpack_from("!H", body, offset)
+        offset += 2
+    return topic, body[offset:], qos, packet_id
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT topic filter matching with ``+`` and ``#`` wildcards"""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[index]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class MQTTClient:
+    """Persistent MQTT connection with QoS 1 publishing and subscriptions.
+
+    The connection is supervised: if it drops, the client reconnects with
+    exponential back-off, restores its subscriptions and re-sends every
+    unacknowledged QoS 1 message with the DUP flag. At most
+    ``max_inflight`` QoS 1 messages await a PUBACK at once; further
+    publishers wait for a slot, which bounds memory and broker load.
+    """
+
+    def __init__(self, host: str, port: int = 1883, client_id: str = "mushroom-server",
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 keepalive: int = 60, max_inflight: int = 100, reconnect_max_delay: float = 30.0):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._drain_lock = asyncio.Lock()
+        self._inflight_slots = asyncio.Semaphore(max_inflight)
+        self._inflight: Dict[int, Tuple[bytes, asyncio.Future]] = {}
+        self._packet_ids = itertools.cycle(range(1, 65536))
+        self._subscriptions: Dict[str, Tuple[int, List[MessageCallback]]] = {}
+        self._pending_subacks: Dict[int, asyncio.Future] = {}
+        self._supervisor: Optional[asyncio.Task] = None
+        # Running coroutine handlers; the loop only keeps weak references to tasks
+        self._handler_tasks: Set[asyncio.Task] = set()
+        self._closing = False
+        self.messages_sent = 0
+        self.messages_received = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def connect(self, timeout: float = 10.0):
+        """Start the connection supervisor and wait for the first successful connect"""
+        self._closing = False
+        if self._supervisor is None:
+            self._supervisor = asyncio.create_task(self._supervise())
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def disconnect(self):
+        self._closing = True
+        if self._writer is not None and self.connected:
+            try:
+                self._writer.write(encode_packet(DISCONNECT, 0))
+                await self._writer.drain()
+            except ConnectionError:
+                pass
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        self._close_writer()
+        for _, future in self._inflight.values():
+            if not future.done():
+                future.set_exception(MQTTError("Client disconnected"))
+        self._inflight.clear()
+
+    async def publish(self, topic: str, payload: Union[bytes, str], qos: int = 1):
+        """Publish a message; with QoS 1, returns once the broker has acknowledged it"""
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if qos == 0:
+            await self._connected.wait()
+            await self._send(encode_publish(topic, payload))
+            self.messages_sent += 1
+            return
+
+        async with self._inflight_slots:
+            packet_id = self._next_packet_id()
+            packet = encode_publish(topic, payload, 1, packet_id)
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[packet_id] = (packet, future)
+            try:
+                if self.connected:
+                    await self._send(packet)
+                # Otherwise the supervisor sends it after reconnecting
+                await future
+            finally:
+                self._inflight.pop(packet_id, None)
+            self.messages_sent += 1
+
+    async def subscribe(self, topic_filter: str, callback: MessageCallback, qos: int = 1):
+        """Call ``callback(topic, payload)`` for messages matching the filter"""
+        entry = self._subscriptions.get(topic_filter)
+        if entry is not None:
+            entry[1].append(callback)
+            return
+        self._subscriptions[topic_filter] = (qos, [callback])
+        if self.connected:
+            await self._send_subscribe([(topic_filter, qos)])
+
+    def _next_packet_id(self) -> int:
+        for packet_id in self._packet_ids:
+            if packet_id not in self._inflight and packet_id not in self._pending_subacks:
+                return packet_id
+
+    async def _send(self, data: bytes):
+        writer = self._writer
+        if writer is None:
+            raise MQTTError("Not connected")
+        writer.write(data)
+        # Only one coroutine may wait on drain at a time
+        if writer.transport.get_write_buffer_size() > 64 * 1024:
+            async with self._drain_lock:
+                await writer.drain()
+
+    async def _send_subscribe(self, topics: List[Tuple[str, int]]):
+        packet_id = self._next_packet_id()
+        body = struct.pack("!H", packet_id) + b"".join(encode_string(t) + bytes([q]) for t, q in topics)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_subacks[packet_id] = future
+        try:
+            await self._send(encode_packet(SUBSCRIBE, 0x02, body))
+            await asyncio.wait_for(future, 10)
+        finally:
+            self._pending_subacks.pop(packet_id, None)
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        flags = 0x02  # Clean session
+        payload = encode_string(self.client_id)
+        if self.username is not None:
+            flags |= 0x80
+            payload += encode_string(self.username)
+            if self.password is not None:
+                flags |= 0x40
+                payload += encode_string(self.password)
+        variable_header = encode_string("MQTT") + bytes([4, flags]) + struct.pack("!H", self.keepalive)
+        self._writer.write(encode_packet(CONNECT, 0, variable_header + payload))
+        await self._writer.drain()
+
+        packet_type, _, body = await asyncio.wait_for(read_packet(self._reader), 10)
+        if packet_type != CONNACK or len(body) < 2:
+            raise MQTTError("Expected CONNACK")
+        if body[1] != 0:
+            raise MQTTError(f"Connection refused (code {body[1]})")
+
+    async def _supervise(self):
+        delay = 0.5
+        while not self._closing:
+            try:
+                await self._open()
+            except (OSError, MQTTError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                print(f"Warning: MQTT connect to {self.host}:{self.port} failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+                continue
+
+            delay = 0.5
+            reader_task = asyncio.create_task(self._read_loop())
+            ping_task = asyncio.create_task(self._ping_loop())
+            self._connected.set()
+            try:
+                if self._subscriptions:
+                    await self._send_subscribe([(t, qos) for t, (qos, _) in self._subscriptions.items()])
+                # Re-send anything the previous connection left unacknowledged
+                for packet_id, (packet, _) in list(self._inflight.items()):
+                    await self._send(bytes([packet[0] | 0x08]) + packet[1:])
+                await reader_task
+            except (OSError, MQTTError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                if not self._closing:
+                    print(f"Warning: MQTT connection lost: {e}")
+            finally:
+                self._connected.clear()
+                reader_task.cancel()
+                ping_task.cancel()
+                self._close_writer()
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _ping_loop(self):
+        while True:
+            await asyncio.sleep(max(self.keepalive / 2, 1))
+            await self._send(encode_packet(PINGREQ, 0))
+
+    async def _read_loop(self):
+        while True:
+            packet_type, flags, body = await read_packet(self._reader)
+            if packet_type == PUBLISH:
+                topic, payload, qos, packet_id = decode_publish(flags, body)
+                if qos:
+                    await self._send(encode_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                self.messages_received += 1
+                self._dispatch(topic, payload)
+            elif packet_type == PUBACK:
+                (packet_id,) = struct.unpack("!H", body[:2])
+                entry = self._inflight.get(packet_id)
+                if entry is not None and not entry[1].done():
+                    entry[1].set_result(None)
+            elif packet_type == SUBACK:
+                (packet_id,) = struct.unpack("!H", body[:2])
+                future = self._pending_subacks.get(packet_id)
+                if future is not None and not future.done():
+                    future.set_result(body[2:])
+
+    def _dispatch(self, topic: str, payload: bytes):
+        for topic_filter, (_, callbacks) in self._subscriptions.items():
+            if not topic_matches(topic_filter, topic):
+                continue
+            for callback in callbacks:
+                try:
+                    result = callback(topic, payload)
+                    if asyncio.iscoroutine(result):
+                        task = asyncio.create_task(result)
+                        self._handler_tasks.add(task)
+                        task.add_done_callback(lambda task, topic=topic: self._handler_done(task, topic))
+                except Exception as e:
+                    print(f"Warning: MQTT handler for {topic} failed: {e}")
+
+    def _handler_done(self, task: asyncio.Task, topic: str):
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Warning: MQTT handler for {topic} failed: {task.exception()}")
+
+
+class MQTTTransport:
+    """Sends commands to MCUs and receives their telemetry over MQTT.
+
+    Each command is stamped with a ``msgId`` and published QoS 1 to the
+    MCU's command topic; ``send_command`` resolves when the MCU publishes
+    a matching acknowledgement (or times out).
+    """
+
+    def __init__(self, client: MQTTClient, topic_prefix: str = "mushroom", ack_timeout: float = 5.0):
+        self.client = client
+        self.topic_prefix = topic_prefix.rstrip("/")
+        self.ack_timeout = ack_timeout
+        self._acks: Dict[str, asyncio.Future] = {}
+        self._message_ids = itertools.count(1)
+
+    @classmethod
+    def connect_to(cls, host: str, port: int = 1883, topic_prefix: str = "mushroom", username: Optional[str] = None,
+                   password: Optional[str] = None, client_id: str = "mushroom-server", **options) -> "MQTTTransport":
+        ack_timeout = options.pop("ack_timeout", 5.0)
+        client = MQTTClient(host, port, client_id, username, password, **options)
+        return cls(client, topic_prefix, ack_timeout)
+
+    @property
+    def connected(self) -> bool:
+        return self.client.connected
+
+    def stats(self) -> dict:
+        return {
+            "messages_sent": self.client.messages_sent,
+            "messages_received": self.client.messages_received,
+            "awaiting_ack": len(self._acks),
+        }
+
+    def topic(self, mcu_id: str, kind: str) -> str:
+        return f"{self.topic_prefix}/{mcu_id}/{kind}"
+
+    def mcu_from_topic(self, topic: str) -> str:
+        return topic[len(self.topic_prefix) + 1:].split("/", 1)[0]
+
+    async def start(self):
+        await self.client.subscribe(self.topic("+", "ack"), self._on_ack)
+        await self.client.connect()
+
+    async def stop(self):
+        await self.client.disconnect()
+        for future in self._acks.values():
+            if not future.done():
+                future.cancel()
+        self._acks.clear()
+
+    async def on_telemetry(self, callback: Callable[[str, dict], Union[None, Awaitable[None]]]):
+        """Call ``callback(mcu_id, reading)`` for every telemetry message"""
+        def handle(topic: str, payload: bytes):
+            try:
+                reading = json.loads(payload)
+            except ValueError:
+                print(f"Warning: ignoring malformed telemetry on {topic}")
+                return None
+            return callback(self.mcu_from_topic(topic), reading)
+        await self.client.subscribe(self.topic("+", "telemetry"), handle)
+
+    async def send_command(self, mcu_id: str, command: dict, wait_for_ack: bool = True) -> bool:
+        """Deliver a command; returns whether the MCU acknowledged it successfully.
+
+        Publishing and waiting for the acknowledgement share ``ack_timeout``,
+        so an unreachable broker fails the command instead of hanging it.
+        """
+        message_id = f"{self.client.client_id}-{next(self._message_ids)}"
+        payload = json.dumps({**command, "msgId": message_id}, separators=(",", ":"))
+        future = None
+        if wait_for_ack:
+            future = asyncio.get_running_loop().create_future()
+            self._acks[message_id] = future
+
+        async def deliver() -> bool:
+            await self.client.publish(self.topic(mcu_id, "cmd"), payload)
+            return True if future is None else await future
+
+        try:
+            return await asyncio.wait_for(deliver(), self.ack_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._acks.pop(message_id, None)
+
+    def _on_ack(self, topic: str, payload: bytes):
+        try:
+            ack = json.loads(payload)
+        except ValueError:
+            return
+        future = self._acks.get(ack.get("msgId"))
+        if future is not None and not future.done():
+            future.set_result(bool(ack.get("ok", True)))
@@ -0,0 +1,211 @@
+"""
+Incrementally maintained time-bucket rollups of sensor readings
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.sensor_log import SensorLog
+from ..models.sensor_rollup import SensorRollup
+from ..schemas.sensor_rollup import SensorRollupPoint
+
+
+# Supported rollup resolutions, finest first
+ROLLUP_RESOLUTIONS = {
+    '1m': 60,
+    '15m': 900,
+    '1h': 3600,
+}
+
+# SensorLog columns that are rolled up
+ROLLUP_METRICS = ('temperature', 'humidity', 'co2_level', 'light_level', 'airflow')
+
+_EPOCH = datetime(1970, 1, 1)
+
+RollupKey = Tuple[int, str, int, datetime]
+
+
+def to_naive_utc(timestamp: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored and bucketed as naive UTC; convert aware ones"""
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def bucket_start(timestamp: datetime, resolution_seconds: int) -> datetime:
+    """Floor a naive UTC timestamp to the start of its bucket"""
+    seconds = int((timestamp - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % resolution_seconds)
+
+
+def aggregate_readings(logs: Iterable[SensorLog]) -> Dict[RollupKey, List[float]]:
+    """Fold readings into {(env, metric, resolution, bucket): [count, sum, min, max]}"""
+    aggregates: Dict[RollupKey, List[float]] = {}
+    for log in logs:
+        for metric in ROLLUP_METRICS:
+            value = getattr(log, metric)
+            if value is None:
+                continue
+            for resolution_seconds in ROLLUP_RESOLUTIONS.values():
+                key = (log.environment_id, metric, resolution_seconds, bucket_start(log.timestamp, resolution_seconds))
+                agg = aggregates.get(key)
+                if agg is None:
+                    aggregates[key] = [1, value, value, value]
+                else:
+                    agg[0] += 1
+                    agg[1] += value
+                    if value < agg[2]:
+                        agg[2] = value
+                    if value > agg[3]:
+                        agg[3] = value
+    return aggregates
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+
+    table = SensorRollup.__table__
+    stmt = insert(table)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.environment_id, table.c.metric, table.c.resolution_seconds, table.c.bucket_start],
+        set_={
+            'sample_count': table.c.sample_count + excluded.sample_count,
+            'value_sum': table.c.value_sum + excluded.value_sum,
+            'value_min': case((excluded.value_min < table.c.value_min, excluded.value_min), else_=table.c.value_min),
+            'value_max': case((excluded.value_max > table.c.value_max, excluded.value_max), else_=table.c.value_max),
+            'updated_at': excluded.updated_at,
+        }
+    )
+
+
+def apply_aggregates(db: Session, aggregates: Dict[RollupKey, List[float]]):
+    """Merge pre-aggregated buckets into the rollup table (caller commits)"""
+    if not aggregates:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'environment_id': env_id,
+            'metric': metric,
+            'resolution_seconds': resolution_seconds,
+            'bucket_start': start,
+            'sample_count': agg[0],
+            'value_sum': agg[1],
+            'value_min': agg[2],
+            'value_max': agg[3],
+            'created_at': now,
+            'updated_at': now,
+        }
+        for (env_id, metric, resolution_seconds, start), agg in aggregates.items()
+    ]
+
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+        return
+
+    # Portable fallback: read-modify-write each bucket
+    for row in rows:
+        existing = db.query(SensorRollup).filter(
+            SensorRollup.environment_id == row['environment_id'],
+            SensorRollup.metric == row['metric'],
+            SensorRollup.resolution_seconds == row['resolution_seconds'],
+            SensorRollup.bucket_start == row['bucket_start']
+        ).first()
+        if existing is None:
+            db.add(SensorRollup(**row))
+        else:
+            existing.sample_count += row['sample_count']
+            existing.value_sum += row['value_sum']
+            existing.value_min = min(existing.value_min, row['value_min'])
+            existing.value_max = max(existing.value_max, row['value_max'])
+
+
+def apply_rollups(db: Session, logs: Iterable[SensorLog]):
+    """Fold new readings into the rollup table in the caller's transaction"""
+    apply_aggregates(db, aggregate_readings(logs))
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest resolution whose point count for the window fits in ``max_points``.
+
+    Returns 'raw' when raw readings already fit, and the coarsest rollup if
+    nothing does.
+    """
+    window_seconds = max((end - start).total_seconds(), 0)
+    if window_seconds / settings.SENSOR_READING_INTERVAL_SECONDS <= max_points:
+        return 'raw'
+    for name, resolution_seconds in ROLLUP_RESOLUTIONS.items():
+        if window_seconds / resolution_seconds <= max_points:
+            return name
+    return list(ROLLUP_RESOLUTIONS)[-1]
+
+
+def query_rollups(
+    db: Session,
+    resolution: str,
+    environment_id: Optional[int] = None,
+    metrics: Optional[Iterable[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    descending: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> List[SensorRollupPoint]:
+    """Rollup points for a window at one resolution"""
+    query = rollup_query(db, resolution, environment_id, metrics, start, end, descending, offset, limit)
+    return [
+        SensorRollupPoint(
+            environment_id=row.environment_id,
+            metric=row.metric,
+            resolution_seconds=row.resolution_seconds,
+            bucket_start=row.bucket_start,
+            count=row.sample_count,
+            min=row.value_min,
+            max=row.value_max,
+            avg=row.value_avg
+        )
+        for row in query.all()
+    ]
+
+
+def rollup_query(
+    db: Session,
+    resolution: str,
+    environment_id: Optional[int] = None,
+    metrics: Optional[Iterable[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    descending: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None
+):
+    query = db.query(SensorRollup).filter(SensorRollup.resolution_seconds == ROLLUP_RESOLUTIONS[resolution])
+
+    if environment_id:
+        query = query.filter(SensorRollup.environment_id == environment_id)
+    if metrics:
+        query = query.filter(SensorRollup.metric.in_(list(metrics)))
+    if start:
+        query = query.filter(SensorRollup.bucket_start >= bucket_start(start, ROLLUP_RESOLUTIONS[resolution]))
+    if end:
+        query = query.filter(SensorRollup.bucket_start <= end)
+
+    order = (SensorRollup.bucket_start, SensorRollup.environment_id, SensorRollup.metric)
+    if descending:
+        # Reverse every key so the page walks an index backwards instead of sorting
+        order = tuple(column.desc() for column in order)
+    query = query.order_by(*order)
+    if offset:
+        query = query.offset(offset)
+    if limit:
+        query = query.limit(limit)
+    return query
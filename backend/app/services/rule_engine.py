@@ -0,0 +1,415 @@
+"""
+Compiled evaluation of automation rules against incoming sensor readings
+"""
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, selectinload
+from ..core.metrics import REGISTRY, SIZE_BUCKETS
+from ..models.automation_rule import ActionType, AutomationRule, RuleAction, RuleLogic, RuleOperator
+from ..models.environment import Environment
+from ..models.sensor_log import SensorLog, SENSOR_VALUE_COLUMNS
+from .condition_tracker import ConditionTracker, condition_tracker
+
+
+# Parameters are matched by SensorLog column name; sensor type names are accepted as aliases
+READING_PARAMETERS = tuple(SENSOR_VALUE_COLUMNS.values())
+
+RULES_PER_READING = REGISTRY.histogram(
+    "rules_evaluated_per_reading", "Candidate rules evaluated for each reading", buckets=SIZE_BUCKETS
+)
+RULE_MATCHES = REGISTRY.counter("rule_matches_total", "Rule matches produced by readings")
+
+
+def canonical_parameter(name: str) -> str:
+    name = (name or "").strip().lower()
+    return SENSOR_VALUE_COLUMNS.get(name, name)
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def within_hours(hour: int, start: Optional[int], end: Optional[int]) -> bool:
+    """Whether an hour of day falls in [start, end), wrapping past midnight"""
+    if start is None or end is None or start == end:
+        return True
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def compile_predicate(operator: RuleOperator, threshold: float, threshold_max: Optional[float] = None) -> Callable[[float], bool]:
+    """Turn a condition's operator and thresholds into a single-argument closure"""
+    if operator == RuleOperator.GREATER_THAN:
+        return lambda value: value > threshold
+    if operator == RuleOperator.LESS_THAN:
+        return lambda value: value < threshold
+    if operator == RuleOperator.GREATER_EQUAL:
+        return lambda value: value >= threshold
+    if operator == RuleOperator.LESS_EQUAL:
+        return lambda value: value <= threshold
+    if operator == RuleOperator.EQUAL:
+        return lambda value: value == threshold
+    if operator == RuleOperator.NOT_EQUAL:
+        return lambda value: value != threshold
+
+    low, high = sorted((threshold, threshold if threshold_max is None else threshold_max))
+    if operator == RuleOperator.BETWEEN:
+        return lambda value: low <= value <= high
+    if operator == RuleOperator.NOT_BETWEEN:
+        return lambda value: value < low or value > high
+    raise ValueError(f"Unsupported rule operator: {operator}")
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    id: int
+    parameter: str
+    predicate: Callable[[float], bool]
+    duration_minutes: int = 0
+    window_start: Optional[int] = None
+    window_end: Optional[int] = None
+
+    @property
+    def duration(self) -> timedelta:
+        return timedelta(minutes=self.duration_minutes)
+
+    def test(self, value: Optional[float], now: datetime) -> bool:
+        """Whether the reading satisfies the condition right now (ignoring duration)"""
+        if value is None:
+            return False
+        return within_hours(now.hour, self.window_start, self.window_end) and self.predicate(value)
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+    id: int
+    execution_order: int
+    action_type: ActionType
+    target_actuator: Optional[str] = None
+    target_state: Optional[bool] = None
+    target_intensity: Optional[float] = None
+    duration_seconds: Optional[int] = None
+    delay_before_seconds: int = 0
+    alert_message: Optional[str] = None
+    alert_severity: Optional[str] = None
+    target_phase_name: Optional[str] = None
+    script_path: Optional[str] = None
+    script_parameters: Optional[dict] = None
+    retry_attempts: int = 0
+    retry_delay_seconds: int = 30
+
+
+def compile_action(action: RuleAction) -> CompiledAction:
+    return CompiledAction(
+        id=action.id,
+        execution_order=action.execution_order or 0,
+        action_type=action.action_type,
+        target_actuator=action.target_actuator,
+        target_state=action.target_state,
+        target_intensity=action.target_intensity,
+        duration_seconds=action.duration_seconds,
+        delay_before_seconds=action.delay_before_seconds or 0,
+        alert_message=action.alert_message,
+        alert_severity=action.alert_severity,
+        target_phase_name=action.target_phase_name,
+        script_path=action.script_path,
+        script_parameters=action.script_parameters,
+        retry_attempts=action.retry_attempts or 0,
+        retry_delay_seconds=action.retry_delay_seconds if action.retry_delay_seconds is not None else 30
+    )
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    id: int
+    name: str
+    priority: int
+    environment_id: Optional[int]
+    species_id: Optional[int]
+    phase_name: Optional[str]
+    match_all: bool
+    conditions: Tuple[CompiledCondition, ...]
+    actions: Tuple[CompiledAction, ...]
+    cooldown_minutes: int = 0
+    max_executions_per_hour: Optional[int] = None
+    active_hours_start: Optional[int] = None
+    active_hours_end: Optional[int] = None
+
+    @property
+    def parameters(self) -> frozenset:
+        return frozenset(condition.parameter for condition in self.conditions)
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    rule: CompiledRule
+    environment_id: int
+    timestamp: datetime
+
+
+def compile_rule(rule: AutomationRule) -> Optional[CompiledRule]:
+    """Compile an ORM rule; rules without conditions never fire and compile to None"""
+    conditions = tuple(
+        CompiledCondition(
+            id=condition.id,
+            parameter=canonical_parameter(condition.parameter_name),
+            predicate=compile_predicate(condition.operator, condition.threshold_value, condition.threshold_value_max),
+            duration_minutes=condition.duration_minutes or 0,
+            window_start=condition.time_window_start,
+            window_end=condition.time_window_end
+        )
+        for condition in rule.conditions
+    )
+    if not conditions:
+        return None
+
+    return CompiledRule(
+        id=rule.id,
+        name=rule.name,
+        priority=rule.priority if rule.priority is not None else 100,
+        environment_id=rule.environment_id,
+        species_id=rule.species_id,
+        phase_name=rule.phase_name.lower() if rule.phase_name else None,
+        match_all=rule.logic_operator != RuleLogic.OR,
+        conditions=conditions,
+        actions=tuple(compile_action(action) for action in sorted(rule.actions, key=lambda a: (a.execution_order or 0, a.id))),
+        cooldown_minutes=rule.cooldown_minutes or 0,
+        max_executions_per_hour=rule.max_executions_per_hour,
+        active_hours_start=rule.active_hours_start,
+        active_hours_end=rule.active_hours_end
+    )
+
+
+def condition_definitions(rule: AutomationRule) -> Dict[int, tuple]:
+    """What each condition's clock depends on: the condition itself and its rule's scope"""
+    scope = (rule.environment_id, rule.species_id, rule.phase_name.lower() if rule.phase_name else None)
+    return {
+        condition.id: scope + (
+            canonical_parameter(condition.parameter_name),
+            condition.operator,
+            condition.threshold_value,
+            condition.threshold_value_max,
+            condition.duration_minutes or 0,
+            condition.time_window_start,
+            condition.time_window_end
+        )
+        for condition in rule.conditions
+    }
+
+
+# (environment_id, species_id, phase_name, parameter); None scope fields match any value
+IndexKey = Tuple[Optional[int], Optional[int], Optional[str], str]
+
+
+class RuleEngine:
+    """Evaluates active automation rules as readings arrive.
+
+    Rules are compiled to closures once and indexed by scope and parameter,
+    so a reading only evaluates the rules that reference one of the
+    parameters it carries and apply to its environment's species and phase.
+    """
+
+    def __init__(self, tracker: ConditionTracker = condition_tracker):
+        self.tracker = tracker
+        self._index: Dict[IndexKey, Tuple[CompiledRule, ...]] = {}
+        self._rules: Dict[int, CompiledRule] = {}
+        self._contexts: Dict[int, Tuple[Optional[int], Optional[str]]] = {}
+        self._values: Dict[int, Dict[str, float]] = {}
+        self._condition_definitions: Optional[Dict[int, tuple]] = None
+        self._listeners: List[Callable[[List[RuleMatch], List[RuleMatch]], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._rules)
+
+    def get_rule(self, rule_id: int) -> Optional[CompiledRule]:
+        return self._rules.get(rule_id)
+
+    def reload(self, db: Session):
+        """Recompile all active rules and environment scopes (call after rule changes)"""
+        rules = db.query(AutomationRule).options(
+            selectinload(AutomationRule.conditions),
+            selectinload(AutomationRule.actions)
+        ).filter(AutomationRule.is_active == True).all()
+
+        compiled = {}
+        definitions = {}
+        index: Dict[IndexKey, List[CompiledRule]] = {}
+        for rule in rules:
+            compiled_rule = compile_rule(rule)
+            if compiled_rule is None:
+                continue
+            compiled[rule.id] = compiled_rule
+            definitions.update(condition_definitions(rule))
+            for parameter in compiled_rule.parameters:
+                key = (compiled_rule.environment_id, compiled_rule.species_id, compiled_rule.phase_name, parameter)
+                index.setdefault(key, []).append(compiled_rule)
+
+        environments = db.query(Environment).options(selectinload(Environment.current_phase)).all()
+        contexts = {
+            env.id: (env.species_id, env.current_phase.name.lower() if env.current_phase else None)
+            for env in environments
+        }
+
+        # Swap in whole snapshots so evaluation never sees a half-built index
+        previous_definitions, previous_contexts = self._condition_definitions, self._contexts
+        self._index = {key: tuple(sorted(group, key=lambda r: (r.priority, r.id))) for key, group in index.items()}
+        self._rules = compiled
+        self._contexts = contexts
+        self._condition_definitions = definitions
+
+        # A clock only carries over while its condition, the rule's scope and
+        # the environment's species/phase are unchanged. Clocks restored from
+        # a snapshot are kept on the first load, when there is nothing to compare.
+        self.tracker.prune(definitions)
+        if previous_definitions is not None:
+            self.tracker.reset(
+                condition_ids=[
+                    condition_id for condition_id, definition in definitions.items()
+                    if condition_id in previous_definitions and previous_definitions[condition_id] != definition
+                ],
+                environment_ids=[
+                    environment_id for environment_id, context in contexts.items()
+                    if environment_id in previous_contexts and previous_contexts[environment_id] != context
+                ]
+            )
+
+    def set_environment_context(self, environment_id: int, species_id: Optional[int], phase_name: Optional[str]):
+        """Update the species/phase scope of an environment after assignment or phase changes"""
+        context = (species_id, phase_name.lower() if phase_name else None)
+        previous = self._contexts.get(environment_id)
+        contexts = dict(self._contexts)
+        contexts[environment_id] = context
+        self._contexts = contexts
+        if previous is not None and previous != context:
+            # Conditions timed under the old scope must start over
+            self.tracker.reset(environment_ids=[environment_id])
+
+    def subscribe(self, listener: Callable[[List[RuleMatch], List[RuleMatch]], None]):
+        """Register a callback invoked after each reading with ``(matches, pending)``.
+
+        ``pending`` holds rules that are waiting on a duration clock, stamped
+        with the time that clock matures. Listeners may be called from
+        worker threads.
+        """
+        self._listeners.append(listener)
+
+    def candidate_rules(self, environment_id: int, parameters: Iterable[str]) -> List[CompiledRule]:
+        """Rules in scope for the environment that reference any of the parameters"""
+        index = self._index
+        if not index:
+            return []
+        species_id, phase_name = self._contexts.get(environment_id, (None, None))
+
+        seen = set()
+        candidates = []
+        for parameter in parameters:
+            for env_key in (environment_id, None):
+                for species_key in (species_id, None) if species_id is not None else (None,):
+                    for phase_key in (phase_name, None) if phase_name is not None else (None,):
+                        for rule in index.get((env_key, species_key, phase_key, parameter), ()):
+                            if rule.id not in seen:
+                                seen.add(rule.id)
+                                candidates.append(rule)
+        candidates.sort(key=lambda r: (r.priority, r.id))
+        return candidates
+
+    def _condition_satisfied(self, condition: CompiledCondition, environment_id: int, values: Dict[str, float], changed, now: datetime) -> bool:
+        holds = condition.test(values.get(condition.parameter), now)
+        if not condition.duration_minutes:
+            return holds
+        if condition.parameter in changed:
+            since = self.tracker.update(condition.id, environment_id, holds, now)
+        else:
+            # No new reading for this parameter: its clock keeps running
+            since = self.tracker.true_since(condition.id, environment_id) if holds else None
+        return since is not None and now - since >= condition.duration
+
+    def pending_until(self, rule: CompiledRule, environment_id: int, now: datetime) -> Optional[datetime]:
+        """Earliest time a running duration clock of the rule matures, if any is still running"""
+        due = None
+        for condition in rule.conditions:
+            if not condition.duration_minutes:
+                continue
+            since = self.tracker.true_since(condition.id, environment_id)
+            if since is not None and since + condition.duration > now:
+                matures = since + condition.duration
+                due = matures if due is None or matures < due else due
+        return due
+
+    def rule_matches(self, rule: CompiledRule, environment_id: int, values: Dict[str, float], changed=(), now: Optional[datetime] = None) -> bool:
+        """Whether the rule holds for the values, advancing duration clocks of changed parameters"""
+        now = now or datetime.utcnow()
+        # Evaluate every condition (no short-circuit) so all duration clocks see the reading
+        results = [self._condition_satisfied(condition, environment_id, values, changed, now) for condition in rule.conditions]
+        return all(results) if rule.match_all else any(results)
+
+    def evaluate(self, environment_id: int, timestamp: datetime, readings: Dict[str, Optional[float]]) -> List[RuleMatch]:
+        """Apply a reading (keyed by SensorLog column) and return the rules it makes match"""
+        timestamp = _naive_utc(timestamp)
+        changed = {
+            canonical_parameter(parameter): value
+            for parameter, value in readings.items()
+            if value is not None
+        }
+        if not changed:
+            return []
+
+        with self._lock:
+            values = self._values.setdefault(environment_id, {})
+            values.update(changed)
+            snapshot = dict(values)
+
+        matches = []
+        pending = []
+        candidates = self.candidate_rules(environment_id, changed)
+        RULES_PER_READING.observe(len(candidates))
+        for rule in candidates:
+            if self.rule_matches(rule, environment_id, snapshot, changed, timestamp):
+                matches.append(RuleMatch(rule, environment_id, timestamp))
+            else:
+                due = self.pending_until(rule, environment_id, timestamp)
+                if due is not None:
+                    pending.append(RuleMatch(rule, environment_id, due))
+
+        if matches:
+            RULE_MATCHES.inc(len(matches))
+        if matches or pending:
+            for listener in self._listeners:
+                try:
+                    listener(matches, pending)
+                except Exception as e:
+                    print(f"Warning: rule listener failed: {e}")
+        return matches
+
+    def evaluate_log(self, log: SensorLog) -> List[RuleMatch]:
+        return self.evaluate(
+            log.environment_id,
+            log.timestamp,
+            {parameter: getattr(log, parameter) for parameter in READING_PARAMETERS}
+        )
+
+    def current_matches(self, environment_id: int, now: Optional[datetime] = None) -> List[CompiledRule]:
+        """Rules the environment's latest values satisfy, without notifying listeners"""
+        now = now or datetime.utcnow()
+        values = self.latest_values(environment_id)
+        return [rule for rule in self.candidate_rules(environment_id, values) if self.rule_matches(rule, environment_id, values, now=now)]
+
+    def environment_ids(self) -> List[int]:
+        """Environments that have reported at least one reading"""
+        with self._lock:
+            return list(self._values)
+
+    def latest_values(self, environment_id: int) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values.get(environment_id, {}))
+
+
+# Global engine instance
+rule_engine = RuleEngine()
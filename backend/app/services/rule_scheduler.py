@@ -0,0 +1,220 @@
+"""
+Event-driven scheduler that fires matched automation rules within their timing limits
+"""
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from .rule_engine import CompiledRule, RuleMatch, rule_engine, within_hours
+
+ScheduleKey = Tuple[int, int]  # (rule id, environment id)
+
+
+class TokenBucket:
+    """Allows ``capacity`` executions per hour, refilled continuously"""
+
+    __slots__ = ("capacity", "tokens", "updated")
+
+    def __init__(self, capacity: int, now: datetime):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, now: datetime):
+        elapsed = (now - self.updated).total_seconds()
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / 3600)
+            self.updated = now
+
+    def available_at(self, now: datetime) -> datetime:
+        """When the next token is available (``now`` if one already is)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return now
+        return now + timedelta(seconds=(1 - self.tokens) * 3600 / self.capacity)
+
+    def take(self, now: datetime):
+        self._refill(now)
+        self.tokens -= 1
+
+
+def next_active_time(rule: CompiledRule, now: datetime) -> datetime:
+    """``now`` if the rule is inside its active hours, else the start of the next window"""
+    if within_hours(now.hour, rule.active_hours_start, rule.active_hours_end):
+        return now
+    start = now.replace(hour=rule.active_hours_start, minute=0, second=0, microsecond=0)
+    return start if start > now else start + timedelta(days=1)
+
+
+class RuleScheduler:
+    """Fires rules matched by the rule engine, honouring their timing limits.
+
+    Matches and deferred re-checks sit in a heap keyed by due time; the
+    scheduler task sleeps until the earliest entry (or until a new match
+    wakes it), so it does no work while nothing is due. A rule that matches
+    during its cooldown, outside its active hours, or with its hourly
+    token bucket empty is re-checked when it next becomes eligible rather
+    than dropped.
+    """
+
+    def __init__(self, engine=rule_engine):
+        self._engine = engine
+        self._heap: List[Tuple[datetime, int, ScheduleKey]] = []
+        self._scheduled: Dict[ScheduleKey, datetime] = {}
+        self._counter = itertools.count()
+        self._last_fired: Dict[ScheduleKey, datetime] = {}
+        self._buckets: Dict[ScheduleKey, TokenBucket] = {}
+        self._executor: Optional[Callable[[CompiledRule, int, datetime], None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._sweep_interval: Optional[float] = None
+        self._next_sweep: Optional[datetime] = None
+        self.recent_executions: Deque[dict] = deque(maxlen=100)
+        self.fired = 0
+        self.deferred = 0
+        engine.subscribe(self._on_evaluation)
+
+    def set_executor(self, executor: Callable[[CompiledRule, int, datetime], None]):
+        """Set the callback that carries out a fired rule's actions"""
+        self._executor = executor
+
+    def start(self, sweep_interval_seconds: Optional[float] = None):
+        """Start the scheduler task on the running event loop.
+
+        With ``sweep_interval_seconds``, every environment's current matches
+        are also re-checked at that interval as a backstop for changes no
+        reading announces (condition time windows opening, for example).
+        """
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._sweep_interval = sweep_interval_seconds
+        self._next_sweep = datetime.utcnow() + timedelta(seconds=sweep_interval_seconds) if sweep_interval_seconds else None
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # wait_for() can swallow a cancel that races a wakeup, so the loop also checks the flag
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "scheduled": len(self._scheduled),
+            "next_due": min(self._scheduled.values()) if self._scheduled else None,
+            "fired": self.fired,
+            "deferred": self.deferred,
+        }
+
+    def _on_evaluation(self, matches: List[RuleMatch], pending: List[RuleMatch]):
+        """Rule engine listener; may run on a worker thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        now = datetime.utcnow()
+        entries = [(match.rule.id, match.environment_id, now) for match in matches]
+        # Re-check waiting rules when their duration clock matures
+        entries += [(match.rule.id, match.environment_id, max(match.timestamp, now)) for match in pending]
+        loop.call_soon_threadsafe(self._schedule_many, entries)
+
+    def _schedule_many(self, entries: List[Tuple[int, int, datetime]]):
+        for rule_id, environment_id, due in entries:
+            self.schedule(rule_id, environment_id, due)
+
+    def schedule(self, rule_id: int, environment_id: int, due: datetime):
+        """Check the rule for the environment at ``due`` (event loop thread only)"""
+        key = (rule_id, environment_id)
+        current = self._scheduled.get(key)
+        if current is not None and current <= due:
+            return
+        self._scheduled[key] = due
+        heapq.heappush(self._heap, (due, next(self._counter), key))
+        if self._wakeup is not None and self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def _next_eligible(self, rule: CompiledRule, key: ScheduleKey, now: datetime) -> datetime:
+        eligible = next_active_time(rule, now)
+        last = self._last_fired.get(key)
+        if rule.cooldown_minutes and last is not None:
+            eligible = max(eligible, last + timedelta(minutes=rule.cooldown_minutes))
+        if rule.max_executions_per_hour:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.capacity != rule.max_executions_per_hour:
+                bucket = self._buckets[key] = TokenBucket(rule.max_executions_per_hour, now)
+            eligible = max(eligible, bucket.available_at(now))
+        return eligible
+
+    def _process(self, key: ScheduleKey, now: datetime):
+        rule_id, environment_id = key
+        rule = self._engine.get_rule(rule_id)
+        if rule is None:
+            return  # Deleted or deactivated since it matched
+
+        values = self._engine.latest_values(environment_id)
+        if not self._engine.rule_matches(rule, environment_id, values, now=now):
+            return
+
+        eligible = self._next_eligible(rule, key, now)
+        if eligible > now:
+            self.deferred += 1
+            self.schedule(rule_id, environment_id, eligible)
+            return
+
+        if rule.max_executions_per_hour:
+            self._buckets[key].take(now)
+        self._last_fired[key] = now
+        self.fired += 1
+        self.recent_executions.append({"rule_id": rule_id, "rule_name": rule.name, "environment_id": environment_id, "fired_at": now})
+        if self._executor is not None:
+            try:
+                self._executor(rule, environment_id, now)
+            except Exception as e:
+                print(f"Warning: executing rule {rule.name!r} failed: {e}")
+
+    def _sweep(self, now: datetime):
+        for environment_id in self._engine.environment_ids():
+            for rule in self._engine.current_matches(environment_id, now):
+                self.schedule(rule.id, environment_id, now)
+
+    async def _run(self):
+        while not self._stopping:
+            now = datetime.utcnow()
+            if self._next_sweep is not None and self._next_sweep <= now:
+                self._sweep(now)
+                self._next_sweep = now + timedelta(seconds=self._sweep_interval)
+
+            while self._heap and self._heap[0][0] <= now:
+                due, _, key = heapq.heappop(self._heap)
+                if self._scheduled.get(key) != due:
+                    continue  # Superseded by an earlier entry
+                del self._scheduled[key]
+                self._process(key, now)
+
+            wake_at = self._heap[0][0] if self._heap else None
+            if self._next_sweep is not None and (wake_at is None or self._next_sweep < wake_at):
+                wake_at = self._next_sweep
+
+            self._wakeup.clear()
+            timeout = None if wake_at is None else max((wake_at - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Global scheduler instance
+rule_scheduler = RuleScheduler()
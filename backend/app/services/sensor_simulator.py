@@ -1,14 +1,51 @@
 """
 Sensor simulation service for generating realistic environmental data
 """
+import math
 import random
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
-from ..models.sensor_log import SensorLog
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+from ..models.sensor_log import SensorLog, SENSOR_VALUE_COLUMNS
 from ..models.environment import Environment
 from ..models.species import Species
+from .latest_state import latest_state_cache
+from .rollups import ROLLUP_RESOLUTIONS, apply_aggregates, apply_rollups
+from .rule_engine import rule_engine
+
+# Sensor types the simulator produces, in block order
+SIMULATED_SENSOR_TYPES = ('temperature', 'humidity', 'co2', 'airflow')
+
+# Realistic bounds for each simulated sensor
+SENSOR_BOUNDS = {
+    'temperature': (10.0, 35.0),   # °C
+    'humidity': (30.0, 100.0),     # %
+    'co2': (400.0, 2000.0),        # PPM
+    'airflow': (0.1, 10.0),        # m/s
+    'light': (0.0, 24.0),          # hours
+}
+
+# Day/night components: (relative amplitude, period in hours)
+DIURNAL_CYCLES = {
+    'temperature': (0.1, 24),
+    'co2': (0.05, 12),  # Ventilation cycles
+}
+
+# Rows generated and inserted per chunk in block mode
+BLOCK_CHUNK_ROWS = 200_000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _numpy():
+    """Import NumPy on first use so the API does not load it unless block mode runs"""
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("Vectorized sensor simulation requires NumPy (pip install numpy)") from e
+    return numpy
 
 
 class SensorSimulator:
@@ -32,27 +69,28 @@ class SensorSimulator:
             'light': 1.0          # ±1 hour variation
         }
     
-    def generate_reading(self, sensor_type: str, environment: Environment, species: Optional[Species] = None) -> float:
-        """Generate a realistic sensor reading based on environment and species requirements"""
-        
-        # Get base value
+    def baseline(self, sensor_type: str, species: Optional[Species] = None) -> float:
+        """Value a sensor hovers around: the middle of the species' target range if it has one"""
         base_value = self.base_readings.get(sensor_type, 0.0)
-        variation = self.variations.get(sensor_type, 1.0)
         
         # Adjust based on species requirements if available
         if species:
             if sensor_type == 'temperature':
                 if species.default_temperature_min and species.default_temperature_max:
-                    target = (species.default_temperature_min + species.default_temperature_max) / 2
-                    base_value = target
+                    base_value = (species.default_temperature_min + species.default_temperature_max) / 2
             elif sensor_type == 'humidity':
                 if species.default_humidity_min and species.default_humidity_max:
-                    target = (species.default_humidity_min + species.default_humidity_max) / 2
-                    base_value = target
+                    base_value = (species.default_humidity_min + species.default_humidity_max) / 2
             elif sensor_type == 'co2':
                 if species.default_co2_min and species.default_co2_max:
-                    target = (species.default_co2_min + species.default_co2_max) / 2
-                    base_value = target
+                    base_value = (species.default_co2_min + species.default_co2_max) / 2
+        return base_value
+    
+    def generate_reading(self, sensor_type: str, environment: Environment, species: Optional[Species] = None) -> float:
+        """Generate a realistic sensor reading based on environment and species requirements"""
+        
+        base_value = self.baseline(sensor_type, species)
+        variation = self.variations.get(sensor_type, 1.0)
         
         # Add realistic variation with some trending
         trend = random.uniform(-0.3, 0.3)  # Small trending factor
@@ -60,31 +98,67 @@ class SensorSimulator:
         
         # Apply time-based variations (simulate day/night cycles for some sensors)
         time_factor = 1.0
-        current_hour = datetime.now().hour
-        
-        if sensor_type == 'temperature':
-            # Slight temperature variation based on time of day
-            time_factor = 1.0 + 0.1 * math.sin((current_hour / 24) * 2 * math.pi)
-        elif sensor_type == 'co2':
-            # CO2 might vary with ventilation cycles
-            time_factor = 1.0 + 0.05 * math.sin((current_hour / 12) * 2 * math.pi)
+        if sensor_type in DIURNAL_CYCLES:
+            amplitude, period_hours = DIURNAL_CYCLES[sensor_type]
+            time_factor = 1.0 + amplitude * math.sin((datetime.now().hour / period_hours) * 2 * math.pi)
         
         reading = base_value * time_factor + trend + noise
         
         # Ensure readings stay within realistic bounds
-        if sensor_type == 'temperature':
-            reading = max(10.0, min(35.0, reading))  # 10-35°C
-        elif sensor_type == 'humidity':
-            reading = max(30.0, min(100.0, reading))  # 30-100%
-        elif sensor_type == 'co2':
-            reading = max(400.0, min(2000.0, reading))  # 400-2000 PPM
-        elif sensor_type == 'airflow':
-            reading = max(0.1, min(10.0, reading))  # 0.1-10 m/s
-        elif sensor_type == 'light':
-            reading = max(0.0, min(24.0, reading))  # 0-24 hours
+        if sensor_type in SENSOR_BOUNDS:
+            low, high = SENSOR_BOUNDS[sensor_type]
+            reading = max(low, min(high, reading))
         
         return round(reading, 2)
     
+    def simulate_block(self, baselines, start: datetime, steps: int, interval_seconds: int = 60, rng=None, seed: Optional[int] = None):
+        """Readings for a whole (environments x sensor types x timesteps) block at once.
+        
+        ``baselines`` is an (environments, len(SIMULATED_SENSOR_TYPES)) array.
+        Returns ``(timestamps, values)``: ``steps`` naive UTC datetime64[s]
+        timestamps and a float64 array shaped (environments, sensor types,
+        steps). Pass the same ``rng`` to consecutive calls to continue one
+        seeded stream.
+        """
+        np = _numpy()
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        baselines = np.asarray(baselines, dtype=np.float64)
+        shape = (baselines.shape[0], len(SIMULATED_SENSOR_TYPES), steps)
+        
+        start = start.replace(microsecond=0)
+        offsets = np.arange(steps, dtype=np.int64) * interval_seconds
+        timestamps = np.datetime64(start, 's') + offsets.astype('timedelta64[s]')
+        hours = ((start - start.replace(hour=0, minute=0, second=0)).total_seconds() + offsets) / 3600 % 24
+        
+        time_factor = np.ones((len(SIMULATED_SENSOR_TYPES), steps))
+        for index, sensor_type in enumerate(SIMULATED_SENSOR_TYPES):
+            if sensor_type in DIURNAL_CYCLES:
+                amplitude, period_hours = DIURNAL_CYCLES[sensor_type]
+                time_factor[index] += amplitude * np.sin(hours / period_hours * 2 * np.pi)
+        
+        variations = np.array([self.variations.get(t, 1.0) for t in SIMULATED_SENSOR_TYPES])
+        values = baselines[:, :, None] * time_factor[None]
+        values += rng.uniform(-0.3, 0.3, shape)  # Trend
+        values += rng.uniform(-1.0, 1.0, shape) * variations[None, :, None]  # Noise
+        
+        low = np.array([SENSOR_BOUNDS[t][0] for t in SIMULATED_SENSOR_TYPES])
+        high = np.array([SENSOR_BOUNDS[t][1] for t in SIMULATED_SENSOR_TYPES])
+        np.clip(values, low[None, :, None], high[None, :, None], out=values)
+        np.round(values, 2, out=values)
+        return timestamps, values
+    
+    def iter_blocks(self, baselines, start: datetime, end: datetime, interval_seconds: int = 60,
+                    seed: Optional[int] = None, chunk_rows: int = BLOCK_CHUNK_ROWS) -> Iterator[Tuple[object, object]]:
+        """``simulate_block`` over [start, end) in time chunks of about ``chunk_rows`` readings"""
+        np = _numpy()
+        rng = np.random.default_rng(seed)
+        total_steps = max(math.ceil((end - start).total_seconds() / interval_seconds), 0)
+        per_step = max(len(baselines) * len(SIMULATED_SENSOR_TYPES), 1)
+        chunk_steps = max(chunk_rows // per_step, 1)
+        for first in range(0, total_steps, chunk_steps):
+            steps = min(chunk_steps, total_steps - first)
+            yield self.simulate_block(baselines, start + timedelta(seconds=first * interval_seconds), steps, interval_seconds, rng=rng)
+    
     def create_sensor_logs(self, db: Session, environment_id: int, species: Optional[Species] = None) -> List[SensorLog]:
         """Create sensor log entries for an environment"""
         
@@ -101,20 +175,24 @@ class SensorSimulator:
             log = SensorLog(
                 environment_id=environment_id,
                 sensor_type=sensor_type,
-                value=reading,
-                unit=self.get_sensor_unit(sensor_type),
                 timestamp=datetime.utcnow(),
-                metadata={
+                raw_data={
                     'simulated': True,
                     'species_optimized': species is not None,
                     'species_name': species.name if species else None
-                }
+                },
+                **{SENSOR_VALUE_COLUMNS[sensor_type]: reading}
             )
             
             db.add(log)
             logs.append(log)
         
+        apply_rollups(db, logs)
         db.commit()
+        
+        for log in logs:
+            latest_state_cache.record_log(log)
+            rule_engine.evaluate_log(log)
         return logs
     
     def get_sensor_unit(self, sensor_type: str) -> str:
@@ -128,54 +206,85 @@ class SensorSimulator:
         }
         return units.get(sensor_type, '')
     
-    def generate_historical_data(self, db: Session, environment_id: int, days: int = 7) -> List[SensorLog]:
-        """Generate historical sensor data for the past N days"""
-        
-        environment = db.query(Environment).filter(Environment.id == environment_id).first()
-        if not environment:
-            return []
+    def generate_historical_data(self, db: Session, environment_id: int, days: int = 7,
+                                 interval_seconds: int = 3600, seed: Optional[int] = None) -> int:
+        """Generate historical sensor data for the past N days; returns the number of readings"""
+        end = datetime.utcnow()
+        return self.generate_block(db, [environment_id], end - timedelta(days=days), end, interval_seconds, seed)
+    
+    def generate_block(self, db: Session, environment_ids: Sequence[int], start: datetime, end: datetime,
+                       interval_seconds: int = 3600, seed: Optional[int] = None) -> int:
+        """Simulate and store readings for many environments over [start, end).
         
-        species = None
-        if environment.species_id:
-            species = db.query(Species).filter(Species.id == environment.species_id).first()
+        Values come from ``iter_blocks``; each chunk is inserted with one
+        Core executemany, its rollups are aggregated with NumPy and merged,
+        and the chunk is committed. Returns the number of readings written.
+        """
+        np = _numpy()
+        environments = db.query(Environment).options(selectinload(Environment.species)).filter(
+            Environment.id.in_(list(environment_ids))
+        ).all()
+        if not environments:
+            return 0
         
-        logs = []
-        sensor_types = ['temperature', 'humidity', 'co2', 'airflow']
+        baselines = [[self.baseline(sensor_type, env.species) for sensor_type in SIMULATED_SENSOR_TYPES] for env in environments]
+        raw_data = [{'simulated': True, 'historical': True, 'species_optimized': env.species is not None} for env in environments]
+        table = SensorLog.__table__
+        # executemany needs every row to bind the same columns
+        empty_values = {SENSOR_VALUE_COLUMNS[sensor_type]: None for sensor_type in SIMULATED_SENSOR_TYPES}
+        written = 0
         
-        # Generate data points every hour for the past N days
-        start_time = datetime.utcnow() - timedelta(days=days)
-        current_time = start_time
-        
-        while current_time < datetime.utcnow():
-            for sensor_type in sensor_types:
-                reading = self.generate_reading(sensor_type, environment, species)
-                
-                log = SensorLog(
-                    environment_id=environment_id,
-                    sensor_type=sensor_type,
-                    value=reading,
-                    unit=self.get_sensor_unit(sensor_type),
-                    timestamp=current_time,
-                    metadata={
-                        'simulated': True,
-                        'historical': True,
-                        'species_optimized': species is not None
+        for timestamps, values in self.iter_blocks(baselines, start, end, interval_seconds, seed):
+            times = timestamps.tolist()
+            now = datetime.utcnow()
+            rows = []
+            for env_index, env in enumerate(environments):
+                for type_index, sensor_type in enumerate(SIMULATED_SENSOR_TYPES):
+                    column = SENSOR_VALUE_COLUMNS[sensor_type]
+                    base_row = {
+                        **empty_values,
+                        'environment_id': env.id,
+                        'sensor_type': sensor_type,
+                        'reading_quality': 'good',
+                        'raw_data': raw_data[env_index],
+                        'created_at': now,
+                        'updated_at': now,
                     }
-                )
-                
-                logs.append(log)
+                    rows.extend(
+                        {**base_row, 'timestamp': timestamp, column: value}
+                        for timestamp, value in zip(times, values[env_index, type_index].tolist())
+                    )
             
-            current_time += timedelta(hours=1)
-        
-        # Batch insert for performance
-        db.add_all(logs)
-        db.commit()
+            db.execute(insert(table), rows)
+            apply_aggregates(db, self._aggregate_block(np, environments, timestamps, values))
+            db.commit()
+            written += len(rows)
         
-        return logs
-
+        return written
+    
+    @staticmethod
+    def _aggregate_block(np, environments, timestamps, values) -> Dict[tuple, list]:
+        """Rollup buckets for a block, in the form ``apply_aggregates`` takes"""
+        seconds = (timestamps - np.datetime64(_EPOCH, 's')).astype(np.int64)
+        aggregates = {}
+        for resolution_seconds in ROLLUP_RESOLUTIONS.values():
+            buckets = seconds - seconds % resolution_seconds
+            # Timestamps are ascending, so each bucket is one contiguous run
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            counts = np.diff(np.r_[starts, len(buckets)]).tolist()
+            bucket_starts = [_EPOCH + timedelta(seconds=int(b)) for b in buckets[starts]]
+            sums = np.add.reduceat(values, starts, axis=2).tolist()
+            mins = np.minimum.reduceat(values, starts, axis=2).tolist()
+            maxs = np.maximum.reduceat(values, starts, axis=2).tolist()
+            for env_index, env in enumerate(environments):
+                for type_index, sensor_type in enumerate(SIMULATED_SENSOR_TYPES):
+                    metric = SENSOR_VALUE_COLUMNS[sensor_type]
+                    for i, bucket in enumerate(bucket_starts):
+                        aggregates[(env.id, metric, resolution_seconds, bucket)] = [
+                            counts[i], sums[env_index][type_index][i], mins[env_index][type_index][i], maxs[env_index][type_index][i]
+                        ]
+        return aggregates
 
-# Import math for sine calculations
-import math
 
 # Global simulator instance
 sensor_simulator = SensorSimulator()
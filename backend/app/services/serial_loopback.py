@@ -0,0 +1,139 @@
+"""
+Pty-based fake MCU for exercising the serial transport without hardware
+
+    cd backend && python -m app.services.serial_loopback --commands 2000 --baudrate 115200
+"""
+import argparse
+import asyncio
+import json
+import os
+import pty
+import time
+from typing import List, Tuple
+from .serial_transport import (
+    ACK_FAILED, ACK_OK, FRAME_ACK, FRAME_COMMAND, FRAME_TELEMETRY,
+    FdStream, FrameDecoder, SerialTransport, encode_frame, pack_value, unpack_value,
+)
+
+
+class LoopbackDevice:
+    """Acknowledges command frames on the master side of a pseudo-terminal.
+
+    A pty moves bytes far faster than a real UART, so the device models
+    the line: each direction is busy for 10 bit times per byte (8N1) at
+    ``baudrate``, and frames are only handled or delivered once they would
+    have finished crossing the wire.
+    """
+
+    def __init__(self, baudrate: int = 115200, fail_commands: Tuple[str, ...] = ()):
+        self.baudrate = baudrate
+        self.fail_commands = fail_commands
+        self.commands: List[Tuple[str, dict]] = []
+        self._master = None
+        self._slave = None
+        self._stream = None
+        self._decoder = FrameDecoder()
+        self._rx_free_at = 0.0
+        self._tx_free_at = 0.0
+        self._telemetry_seq = 0
+
+    async def start(self) -> str:
+        """Open the pty; returns the device path for the transport to open"""
+        self._master, self._slave = pty.openpty()
+        os.set_blocking(self._master, False)
+        self._stream = FdStream(self._master, self._on_data)
+        return os.ttyname(self._slave)
+
+    async def stop(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def _line_time(self, size: int) -> float:
+        return size * 10 / self.baudrate
+
+    def _transmit(self, frame: bytes):
+        loop = asyncio.get_running_loop()
+        self._tx_free_at = max(loop.time(), self._tx_free_at) + self._line_time(len(frame))
+        loop.call_at(self._tx_free_at, self._write, frame)
+
+    def _write(self, frame: bytes):
+        if self._stream is not None:
+            self._stream.write(frame)
+
+    def _on_data(self, data: bytes):
+        loop = asyncio.get_running_loop()
+        self._rx_free_at = max(loop.time(), self._rx_free_at) + self._line_time(len(data))
+        for frame_type, seq, payload in self._decoder.feed(data):
+            if frame_type == FRAME_COMMAND:
+                loop.call_at(self._rx_free_at, self._handle_command, seq, payload)
+
+    def _handle_command(self, seq: int, payload: bytes):
+        mcu_id, command = unpack_value(payload)
+        self.commands.append((mcu_id, command))
+        status = ACK_FAILED if command.get("cmd") in self.fail_commands else ACK_OK
+        self._transmit(encode_frame(FRAME_ACK, seq, bytes([status])))
+
+    def publish_telemetry(self, mcu_id: str, reading: dict):
+        self._telemetry_seq = self._telemetry_seq % 65535 + 1
+        self._transmit(encode_frame(FRAME_TELEMETRY, self._telemetry_seq, pack_value([mcu_id, reading])))
+
+
+async def run_benchmark(commands: int = 2000, baudrate: int = 115200, concurrency: int = 32) -> dict:
+    """Measure command throughput and ack latency over a simulated serial link"""
+    device = LoopbackDevice(baudrate)
+    path = await device.start()
+    transport = SerialTransport(path, baudrate, ack_timeout=30)
+    await transport.start()
+
+    received = []
+    await transport.on_telemetry(lambda mcu_id, reading: received.append(reading))
+
+    command = {"cmd": "ADJUST_TARGETS", "batchId": "batch_001", "cellId": 1, "targets": {"tempC": 22.5, "rh": 90.0}}
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def timed_send(index: int) -> bool:
+        async with slots:
+            started = time.perf_counter()
+            ok = await transport.send_command(f"MCU_{index % 3 + 1:03d}", command)
+            latencies.append(time.perf_counter() - started)
+            return ok
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(timed_send(i) for i in range(commands)))
+    elapsed = time.perf_counter() - started
+
+    device.publish_telemetry("MCU_001", {"tempC": 22.4, "rh": 89.5, "co2ppm": 850})
+    await asyncio.sleep(0.05)
+    stats = transport.stats()
+    await transport.stop()
+    await device.stop()
+
+    frame_bytes = len(encode_frame(FRAME_COMMAND, 1, pack_value(["MCU_001", command])))
+    latencies.sort()
+    return {
+        "commands": commands,
+        "acknowledged": sum(results),
+        "baudrate": baudrate,
+        "commands_per_second": round(commands / elapsed, 1),
+        "ack_latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "ack_latency_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "command_frame_bytes": frame_bytes,
+        "json_command_bytes": len(json.dumps({**command, "mcuId": "MCU_001"})),
+        "commands_per_write": round(stats["frames_sent"] / max(stats["writes"], 1), 1),
+        "telemetry_received": len(received),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the serial transport against a pty loopback device")
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_benchmark(args.commands, args.baudrate, args.concurrency)), indent=2))
@@ -0,0 +1,442 @@
+"""
+Serial-line MCU transport with a framed binary protocol
+
+Frame layout (big-endian):
+
+    0x7E | length u16 | type u8 | seq u16 | payload | crc16 u16
+
+``length`` counts type, seq and payload; the CRC (CRC-16/CCITT-FALSE)
+covers everything from ``length`` to the end of the payload. Payloads are
+encoded with ``pack_value``, a small tagged binary format with common
+keys and command names interned as one-byte symbols, rather than JSON. A corrupt frame is dropped and the decoder resynchronises on the
+next start byte.
+
+The port is driven with ``termios`` and a non-blocking file descriptor on
+the event loop, so POSIX systems need no extra dependency.
+"""
+import asyncio
+import binascii
+import itertools
+import os
+import struct
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+FRAME_START = 0x7E
+FRAME_HEADER = struct.Struct("!BHBH")  # start, length, type, seq
+FRAME_OVERHEAD = FRAME_HEADER.size + 2
+MAX_PAYLOAD = 4096  # Bounds how long a false start byte can stall the decoder
+
+# Frame types
+FRAME_COMMAND = 1
+FRAME_ACK = 2
+FRAME_TELEMETRY = 3
+
+ACK_OK = 0
+ACK_FAILED = 1
+
+# Value tags for pack_value
+_NONE, _FALSE, _TRUE, _INT, _FLOAT32, _FLOAT64, _STR, _LIST, _DICT, _BYTES, _SYMBOL = range(11)
+
+# Strings sent as a one-byte index; append only, the firmware holds the same table
+SYMBOLS = (
+    "cmd", "msgId", "mcuId", "batchId", "cellId", "targets", "stages", "name",
+    "timestamp", "tempC", "rh", "co2ppm", "lux", "notes",
+    "tempMin", "tempMax", "rhMin", "rhMax", "co2Min", "co2Max",
+    "lightLuxMin", "lightLuxMax", "lightHoursPerDay", "durationHours",
+    "SET_PROFILE", "START", "PAUSE", "RESUME", "ABORT", "ADJUST_TARGETS",
+)
+_SYMBOL_CODES = {symbol: code for code, symbol in enumerate(SYMBOLS)}
+_FLOAT32_STRUCT = struct.Struct("!f")
+_FLOAT64_STRUCT = struct.Struct("!d")
+
+
+class FrameError(Exception):
+    pass
+
+
+def _pack_varint(value: int, out: bytearray):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _unpack_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _pack_into(value, out: bytearray):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        _pack_varint(value << 1 if value >= 0 else (-value << 1) - 1, out)  # Zigzag
+    elif isinstance(value, float):
+        single = _FLOAT32_STRUCT.pack(value)
+        if _FLOAT32_STRUCT.unpack(single)[0] == value:
+            out.append(_FLOAT32)
+            out += single
+        else:
+            out.append(_FLOAT64)
+            out += _FLOAT64_STRUCT.pack(value)
+    elif isinstance(value, str):
+        code = _SYMBOL_CODES.get(value)
+        if code is not None:
+            out.append(_SYMBOL)
+            out.append(code)
+            return
+        data = value.encode("utf-8")
+        out.append(_STR)
+        _pack_varint(len(data), out)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_BYTES)
+        _pack_varint(len(value), out)
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _pack_varint(len(value), out)
+        for item in value:
+            _pack_into(item, out)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _pack_varint(len(value), out)
+        for key, item in value.items():
+            _pack_into(str(key), out)
+            _pack_into(item, out)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def pack_value(value) -> bytes:
+    """Encode None, bools, ints, floats, strings, bytes, lists and dicts"""
+    out = bytearray()
+    _pack_into(value, out)
+    return bytes(out)
+
+
+def _unpack_from(data: bytes, offset: int):
+    tag = data[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _FALSE:
+        return False, offset
+    if tag == _INT:
+        raw, offset = _unpack_varint(data, offset)
+        return (raw >> 1) ^ -(raw & 1), offset
+    if tag == _FLOAT32:
+        return _FLOAT32_STRUCT.unpack_from(data, offset)[0], offset + 4
+    if tag == _FLOAT64:
+        return _FLOAT64_STRUCT.unpack_from(data, offset)[0], offset + 8
+    if tag == _SYMBOL:
+        return SYMBOLS[data[offset]], offset + 1
+    if tag in (_STR, _BYTES):
+        length, offset = _unpack_varint(data, offset)
+        raw = bytes(data[offset:offset + length])
+        return (raw.decode("utf-8") if tag == _STR else raw), offset + length
+    if tag == _LIST:
+        count, offset = _unpack_varint(data, offset)
+        items = []
+        for _ in range(count):
+            item, offset = _unpack_from(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _DICT:
+        count, offset = _unpack_varint(data, offset)
+        result = {}
+        for _ in range(count):
+            key, offset = _unpack_from(data, offset)
+            result[key], offset = _unpack_from(data, offset)
+        return result, offset
+    raise FrameError(f"Unknown value tag {tag}")
+
+
+def unpack_value(data: bytes):
+    value, offset = _unpack_from(data, 0)
+    if offset != len(data):
+        raise FrameError("Trailing bytes after value")
+    return value
+
+
+def encode_frame(frame_type: int, seq: int, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise FrameError(f"Payload of {len(payload)} bytes exceeds {MAX_PAYLOAD}")
+    header = FRAME_HEADER.pack(FRAME_START, len(payload) + 3, frame_type, seq)
+    crc = binascii.crc_hqx(payload, binascii.crc_hqx(header[1:], 0xFFFF))
+    return header + payload + struct.pack("!H", crc)
+
+
+class FrameDecoder:
+    """Incrementally splits a byte stream into (type, seq, payload) frames"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.crc_errors = 0
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, bytes]]:
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = buffer.find(FRAME_START)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                del buffer[:start]
+            if len(buffer) < FRAME_HEADER.size:
+                break
+            _, length, frame_type, seq = FRAME_HEADER.unpack_from(buffer)
+            if length < 3 or length > MAX_PAYLOAD + 3:
+                del buffer[0]
+                continue
+            end = 3 + length + 2
+            if len(buffer) < end:
+                break
+            (crc,) = struct.unpack_from("!H", buffer, end - 2)
+            if binascii.crc_hqx(bytes(buffer[1:end - 2]), 0xFFFF) != crc:
+                # Not a real frame start (or corrupted); resync after this byte
+                self.crc_errors += 1
+                del buffer[0]
+                continue
+            frames.append((frame_type, seq, bytes(buffer[FRAME_HEADER.size:end - 2])))
+            del buffer[:end]
+        return frames
+
+
+def configure_port(fd: int, baudrate: int):
+    """Put a tty into raw 8N1 mode at ``baudrate``"""
+    import termios
+    import tty
+
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    speed = getattr(termios, f"B{baudrate}", None)
+    if speed is None:
+        raise ValueError(f"Unsupported baud rate {baudrate}")
+    attrs[2] = (attrs[2] & ~(termios.PARENB | termios.CSTOPB | termios.CSIZE)) | termios.CS8 | termios.CLOCAL | termios.CREAD
+    attrs[4] = attrs[5] = speed
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+class FdStream:
+    """Non-blocking reads and coalesced writes on a file descriptor.
+
+    Writes made in the same event loop iteration are joined and handed to
+    the OS in one ``write`` call, so bursts of small frames share a
+    syscall (and, on USB serial adapters, a transfer). End of file or a
+    read error (a hung-up line keeps reporting EIO) stops reading and calls
+    ``on_close`` with the error, if any.
+    """
+
+    def __init__(self, fd: int, on_data: Callable[[bytes], None],
+                 on_close: Optional[Callable[[Optional[OSError]], None]] = None):
+        self.fd = fd
+        self._on_data = on_data
+        self._on_close = on_close
+        self._loop = asyncio.get_running_loop()
+        self._pending = bytearray()
+        self._flush_scheduled = False
+        self._writer_registered = False
+        self.writes = 0
+        self.bytes_written = 0
+        self._loop.add_reader(fd, self._read_ready)
+
+    def write(self, data: bytes):
+        self._pending += data
+        if not self._flush_scheduled and not self._writer_registered:
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        while self._pending:
+            try:
+                written = os.write(self.fd, self._pending)
+            except BlockingIOError:
+                written = 0
+            except OSError as e:
+                print(f"Warning: serial write failed: {e}")
+                self._pending.clear()
+                return
+            self.writes += 1
+            self.bytes_written += written
+            del self._pending[:written]
+            if self._pending and not written:
+                break
+        if self._pending and not self._writer_registered:
+            # Output buffer is full; resume once the port drains
+            self._writer_registered = True
+            self._loop.add_writer(self.fd, self._write_ready)
+
+    def _write_ready(self):
+        self._loop.remove_writer(self.fd)
+        self._writer_registered = False
+        self._flush()
+
+    def _read_ready(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._lost(e)
+            return
+        if not data:
+            self._lost(None)
+            return
+        self._on_data(data)
+
+    def _lost(self, error: Optional[OSError]):
+        # The descriptor stays readable after a hang-up, so keeping the
+        # reader registered would spin the event loop
+        self.close()
+        if self._on_close is not None:
+            self._on_close(error)
+
+    def close(self):
+        self._loop.remove_reader(self.fd)
+        self._pending.clear()
+        if self._writer_registered:
+            self._loop.remove_writer(self.fd)
+            self._writer_registered = False
+
+
+class SerialTransport:
+    """Sends commands to MCUs and receives their telemetry over a serial line.
+
+    Presents the same interface as ``MQTTTransport``. Several MCUs may share
+    one line (RS-485, for example): commands and telemetry carry the MCU id
+    and devices ignore commands addressed to others. Each command frame gets
+    a sequence number that the device echoes in its acknowledgement.
+    """
+
+    def __init__(self, port: str, baudrate: int = 115200, ack_timeout: float = 2.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.ack_timeout = ack_timeout
+        self._fd: Optional[int] = None
+        self._stream: Optional[FdStream] = None
+        self._decoder = FrameDecoder()
+        self._acks: Dict[int, asyncio.Future] = {}
+        self._seq = itertools.cycle(range(1, 65536))
+        self._telemetry_callbacks: List[Callable[[str, dict], Union[None, Awaitable[None]]]] = []
+        self.frames_sent = 0
+        self.frames_received = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._stream is not None
+
+    async def start(self):
+        self._fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            configure_port(self._fd, self.baudrate)
+        except Exception:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        self._stream = FdStream(self._fd, self._on_data, self._on_closed)
+
+    async def stop(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        for future in self._acks.values():
+            if not future.done():
+                future.cancel()
+        self._acks.clear()
+
+    def _on_closed(self, error: Optional[OSError]):
+        """The line hung up or failed: mark the transport disconnected and fail waiting commands"""
+        print(f"Warning: serial port {self.port} closed: {error or 'end of file'}")
+        self._stream = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        for future in self._acks.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Serial port {self.port} closed"))
+
+    async def on_telemetry(self, callback: Callable[[str, dict], Union[None, Awaitable[None]]]):
+        """Call ``callback(mcu_id, reading)`` for every telemetry frame"""
+        self._telemetry_callbacks.append(callback)
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            "writes": self._stream.writes if self._stream else 0,
+            "crc_errors": self._decoder.crc_errors,
+            "awaiting_ack": len(self._acks),
+        }
+
+    async def send_command(self, mcu_id: str, command: dict, wait_for_ack: bool = True) -> bool:
+        """Deliver a command; returns whether the MCU acknowledged it successfully"""
+        if self._stream is None:
+            raise ConnectionError(f"Serial port {self.port} is not open")
+        seq = self._next_seq()
+        frame = encode_frame(FRAME_COMMAND, seq, pack_value([mcu_id, command]))
+        if not wait_for_ack:
+            self._stream.write(frame)
+            self.frames_sent += 1
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        self._acks[seq] = future
+        try:
+            self._stream.write(frame)
+            self.frames_sent += 1
+            return await asyncio.wait_for(future, self.ack_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._acks.pop(seq, None)
+
+    def _next_seq(self) -> int:
+        for seq in self._seq:
+            if seq not in self._acks:
+                return seq
+
+    def _on_data(self, data: bytes):
+        for frame_type, seq, payload in self._decoder.feed(data):
+            self.frames_received += 1
+            if frame_type == FRAME_ACK:
+                future = self._acks.get(seq)
+                if future is not None and not future.done():
+                    future.set_result(payload[:1] == bytes([ACK_OK]))
+            elif frame_type == FRAME_TELEMETRY:
+                try:
+                    mcu_id, reading = unpack_value(payload)
+                except (FrameError, ValueError, TypeError, IndexError, UnicodeDecodeError, struct.error) as e:
+                    print(f"Warning: ignoring malformed telemetry frame: {e}")
+                    continue
+                for callback in self._telemetry_callbacks:
+                    try:
+                        result = callback(mcu_id, reading)
+                        if asyncio.iscoroutine(result):
+                            asyncio.create_task(result)
+                    except Exception as e:
+                        print(f"Warning: telemetry handler for {mcu_id} failed: {e}")
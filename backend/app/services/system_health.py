@@ -0,0 +1,56 @@
+"""
+Dependency probes behind the backend's readiness endpoint
+"""
+import time
+from datetime import datetime
+from sqlalchemy import text
+from ..core.config import settings
+from ..core.database import read_engine
+from ..core.health import FAIL, OK, WARN, HealthMonitor, disk_check, freshness_check
+from .ingestion_queue import ingestion_queue
+from .latest_state import latest_state_cache
+
+# Share of the ingestion queue's capacity at which it is reported as backing up
+INGESTION_BACKLOG_WARN_RATIO = 0.8
+
+
+def database_check() -> dict:
+    """Timed ``SELECT 1`` on a read connection (writes show up as ingestion lag)"""
+    started = time.perf_counter()
+    with read_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    return {"status": WARN if latency_ms > settings.HEALTH_DB_SLOW_MS else OK, "latency_ms": latency_ms}
+
+
+async def ingestion_check() -> dict:
+    stats = ingestion_queue.stats()
+    status = OK
+    if stats["lag_seconds"] > settings.HEALTH_INGESTION_MAX_LAG_SECONDS:
+        status = FAIL
+    elif stats["max_pending"] and stats["pending"] >= stats["max_pending"] * INGESTION_BACKLOG_WARN_RATIO:
+        status = WARN
+    return {"status": status, **stats}
+
+
+async def controllers_check() -> dict:
+    return freshness_check(
+        latest_state_cache.last_reading_times(), settings.HEALTH_READING_STALE_SECONDS, datetime.utcnow()
+    )
+
+
+def storage_check() -> dict:
+    return disk_check(
+        {"logs": settings.LOG_DIR, "uploads": settings.UPLOAD_DIR, "backups": settings.BACKUP_DIR},
+        settings.HEALTH_DISK_MIN_FREE_MB,
+        settings.HEALTH_DISK_WARN_FREE_RATIO
+    )
+
+
+# Global monitor instance; silent controllers degrade the report but do not
+# take the API out of rotation
+health_monitor = HealthMonitor(settings.HEALTH_CACHE_TTL_SECONDS, settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+health_monitor.register("database", database_check)
+health_monitor.register("ingestion", ingestion_check)
+health_monitor.register("storage", storage_check)
+health_monitor.register("controllers", controllers_check, critical=False)
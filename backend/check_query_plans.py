@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the log table access paths.
+
+Builds an empty SQLite schema from the models, runs EXPLAIN QUERY PLAN on
+each query shape the log APIs issue, and exits non-zero if any of them
+falls back to a full table scan or a temp B-tree sort. It also pages
+through a few rows of each log table with every paging mode the APIs
+accept, failing if a page is wrong or the query cannot be built.
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import create_engine
+from fastapi import Response
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, SensorLog, AlertLog, ActuatorLog
+from app.models.alert_log import AlertStatus, AlertSeverity, AlertType
+from app.models.actuator_log import ActuatorType, ActuatorAction
+from app.core.migrations import ensure_indexes
+from app.core.pagination import newest_first_page_query, paginate_newest_first, encode_cursor, NEXT_CURSOR_HEADER
+from app.api.sensor_logs import sensor_logs_query, latest_sensor_log_query, export_query
+from app.api.sensors import latest_readings_by_type_query, sensor_history_query
+from app.api.alert_logs import alert_logs_query
+from app.api.actuator_logs import actuator_logs_query
+from app.services.rollups import rollup_query
+
+NOW = datetime(2025, 1, 1)
+DAY_AGO = NOW - timedelta(days=1)
+
+
+def query_shapes(db):
+    """(name, query, allow_sort) for every log query the API issues, built by the API's own query functions"""
+    def sensor_page(query, **kwargs):
+        return newest_first_page_query(query, SensorLog.timestamp, SensorLog.id, limit=1000, **kwargs)
+
+    def alert_page(query, **kwargs):
+        return newest_first_page_query(query, AlertLog.first_occurrence, AlertLog.id, **kwargs)
+
+    def actuator_page(query, **kwargs):
+        return newest_first_page_query(query, ActuatorLog.timestamp, ActuatorLog.id, limit=1000, **kwargs)
+
+    return [
+        ("sensor_logs: by environment and time range",
+         sensor_page(sensor_logs_query(db, 1, DAY_AGO, NOW)), False),
+        ("sensor_logs: cursor page",
+         sensor_page(sensor_logs_query(db, 1), cursor=encode_cursor(NOW, 100)), False),
+        ("sensor_logs: offset page",
+         sensor_page(sensor_logs_query(db, 1, DAY_AGO, NOW), skip=2000), False),
+        ("sensor_logs: latest for environment", latest_sensor_log_query(db, 1), False),
+        ("sensors: history", sensor_history_query(db, 1, DAY_AGO), False),
+        ("sensors: history by sensor type", sensor_history_query(db, 1, DAY_AGO, "temperature"), False),
+        # The window function sorts its (small, index-filtered) partitions
+        ("sensors: latest per sensor type", latest_readings_by_type_query(db, [1, 2, 3]), True),
+        ("sensor_logs: export", export_query(db, 1, DAY_AGO, NOW), False),
+        ("sensor_rollups: history window", rollup_query(
+            db, "15m", environment_id=1, metrics=["temperature"], start=DAY_AGO, end=NOW
+        ), False),
+        ("sensor_rollups: log page for one environment", rollup_query(
+            db, "15m", environment_id=1, start=DAY_AGO, end=NOW, descending=True, limit=1000
+        ), False),
+        ("sensor_rollups: log page for all environments", rollup_query(
+            db, "15m", start=DAY_AGO, end=NOW, descending=True, limit=1000
+        ), False),
+        ("alert_logs: by environment", alert_page(alert_logs_query(db, environment_id=1)), False),
+        ("alert_logs: by environment and status", alert_page(
+            alert_logs_query(db, environment_id=1, status_filter=AlertStatus.ACTIVE)
+        ), False),
+        ("alert_logs: active only", alert_page(alert_logs_query(db, active_only=True)), False),
+        ("alert_logs: offset page", alert_page(alert_logs_query(db, environment_id=1), skip=200), False),
+        ("actuator_logs: by environment and time range", actuator_page(
+            actuator_logs_query(db, 1, start_date=DAY_AGO, end_date=NOW)
+        ), False),
+        ("actuator_logs: by environment and actuator type", actuator_page(
+            actuator_logs_query(db, 1, ActuatorType.FAN, start_date=DAY_AGO)
+        ), False),
+        ("actuator_logs: offset page", actuator_page(
+            actuator_logs_query(db, 1, start_date=DAY_AGO, end_date=NOW), skip=2000
+        ), False),
+    ]
+
+
+def plan_problems(plan_details, allow_sort):
+    """Plan lines that indicate a regression"""
+    problems = []
+    for detail in plan_details:
+        words = detail.split()
+        # Any scan of a model table, including full scans of one of its
+        # indexes ("SCAN t USING [COVERING] INDEX ..."); scans of
+        # materialized subqueries are fine
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in Base.metadata.tables:
+            problems.append(detail)
+        elif detail.startswith("USE TEMP B-TREE") and not allow_sort:
+            problems.append(detail)
+    return problems
+
+
+def page_problems(db):
+    """Page through five rows of each log table; returns a description of each wrong page"""
+    times = [NOW - timedelta(minutes=minutes) for minutes in range(5)]
+    db.add_all([SensorLog(environment_id=1, timestamp=t) for t in times])
+    db.add_all([
+        AlertLog(environment_id=1, alert_type=AlertType.SYSTEM_ERROR, severity=AlertSeverity.LOW,
+                 title="t", message="m", first_occurrence=t, last_occurrence=t)
+        for t in times
+    ])
+    db.add_all([
+        ActuatorLog(environment_id=1, timestamp=t, actuator_type=ActuatorType.FAN, action=ActuatorAction.ON)
+        for t in times
+    ])
+    db.commit()
+
+    tables = [
+        ("sensor_logs", sensor_logs_query(db, 1), SensorLog.timestamp, SensorLog.id),
+        ("alert_logs", alert_logs_query(db, environment_id=1), AlertLog.first_occurrence, AlertLog.id),
+        ("actuator_logs", actuator_logs_query(db, 1), ActuatorLog.timestamp, ActuatorLog.id),
+    ]
+    problems = []
+    for name, query, timestamp_column, id_column in tables:
+        def page(**kwargs):
+            """(timestamps on the page, whether a next cursor was sent)"""
+            response = Response()
+            rows = paginate_newest_first(query, timestamp_column, id_column, response, **kwargs)
+            return [getattr(row, timestamp_column.key) for row in rows], response.headers.get(NEXT_CURSOR_HEADER)
+
+        try:
+            first, cursor = page(limit=2)
+            pages = [
+                ("first page", (first, cursor), times[:2], True),
+                ("offset page", page(skip=2, limit=2), times[2:4], True),
+                ("last offset page", page(skip=4, limit=2), times[4:], False),
+                ("cursor page", page(cursor=cursor, limit=2), times[2:4], True),
+            ]
+        except Exception as e:
+            problems.append(f"{name}: {type(e).__name__}: {e}")
+            continue
+        for label, (rows, next_cursor), expected_rows, expect_cursor in pages:
+            if rows != expected_rows or (next_cursor is not None) != expect_cursor:
+                problems.append(f"{name}: wrong {label}")
+    return problems
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    db = sessionmaker(bind=engine)()
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, query, allow_sort in query_shapes(db):
+            sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+            problems = plan_problems(plan, allow_sort)
+            print(f"{'FAIL' if problems else 'ok  '} {name}")
+            for detail in plan:
+                print(f"       {detail}")
+            failures += bool(problems)
+
+    if failures:
+        print(f"\n{failures} query shape(s) regressed to a full scan or sort")
+        sys.exit(1)
+    print("\nAll query shapes use an index")
+
+    problems = page_problems(db)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("Paging by offset and cursor returns the expected pages")
+
+
+if __name__ == "__main__":
+    main()
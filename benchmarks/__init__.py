@@ -0,0 +1,12 @@
+"""
+In-process load generation and benchmarks for the API servers
+
+Boots ``simple_server.app`` or ``backend.app.main.app`` inside the
+benchmark process, replays a seeded mix of ingest and read requests
+against it with an async client and writes throughput, latency
+percentiles and RSS as JSON. Run from the repository root:
+
+    python -m benchmarks run --target simple --scenario mixed --output results/simple.json
+    python -m benchmarks run --target backend --scenario ingest --baseline results/backend.json
+    python -m benchmarks compare results/baseline.json results/current.json
+"""
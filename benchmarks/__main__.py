@@ -0,0 +1,75 @@
+"""
+Command line entry point: ``python -m benchmarks {run,compare} ...``
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from .compare import compare_results
+from .harness import run_benchmark
+from .scenarios import TARGETS
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _report(regressions) -> int:
+    if not regressions:
+        print("No regressions")
+        return 0
+    print("Regressions:")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="API load generation and benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Benchmark a target in-process")
+    run.add_argument("--target", choices=sorted(TARGETS), default="simple")
+    run.add_argument("--scenario", default="mixed", help="ingest, read or mixed")
+    run.add_argument("--requests", type=int, default=5000)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--warmup", type=int, default=200)
+    run.add_argument("--setup-size", type=int, default=10, help="Batches (simple) or environments (backend) to create first")
+    run.add_argument("--workdir", help="Where the target keeps its database and files (default: a new temp dir)")
+    run.add_argument("--output", help="Write the results JSON here")
+    run.add_argument("--baseline", help="Compare against this results JSON and exit 1 on regression")
+    run.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown (default 0.15)")
+
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.15)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        try:
+            return _report(compare_results(_load(args.baseline), _load(args.current), args.tolerance))
+        except ValueError as e:
+            parser.error(str(e))
+
+    results = asyncio.run(run_benchmark(
+        args.target, args.scenario, args.requests, args.concurrency, args.seed, args.warmup, args.setup_size, args.workdir
+    ))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.baseline:
+        return _report(compare_results(_load(args.baseline), results, args.tolerance))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Run-over-run comparison of benchmark results
+"""
+from typing import List, Optional
+
+# Latency changes smaller than this are treated as noise regardless of the relative change
+MIN_LATENCY_DELTA_MS = 0.5
+
+
+def _regressed(metric: str, baseline: Optional[float], current: Optional[float], tolerance: float,
+               higher_is_better: bool) -> Optional[str]:
+    if baseline is None or current is None or baseline <= 0:
+        return None
+    change = (current - baseline) / baseline
+    if higher_is_better:
+        if change < -tolerance:
+            return f"{metric}: {baseline} -> {current} ({change:+.1%})"
+    elif change > tolerance and current - baseline >= MIN_LATENCY_DELTA_MS:
+        return f"{metric}: {baseline} -> {current} ({change:+.1%})"
+    return None
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.15) -> List[str]:
+    """Describe every metric that got worse than ``tolerance`` (a fraction) relative to ``baseline``"""
+    for key in ("target", "scenario", "requests", "concurrency"):
+        if baseline.get(key) != current.get(key):
+            raise ValueError(f"Results are not comparable: {key} differs ({baseline.get(key)!r} vs {current.get(key)!r})")
+
+    regressions = []
+
+    def check(prefix: str, base: dict, cur: dict):
+        found = _regressed(f"{prefix}throughput_rps", base.get("throughput_rps"), cur.get("throughput_rps"), tolerance, True)
+        if found:
+            regressions.append(found)
+        for quantile in ("p50", "p95", "p99"):
+            found = _regressed(f"{prefix}latency_ms.{quantile}", base["latency_ms"].get(quantile),
+                               cur["latency_ms"].get(quantile), tolerance, False)
+            if found:
+                regressions.append(found)
+        if cur.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{prefix}errors: {base.get('errors', 0)} -> {cur['errors']}")
+
+    check("", baseline, current)
+    for name, base in baseline.get("operations", {}).items():
+        cur = current.get("operations", {}).get(name)
+        if cur is not None:
+            check(f"{name}.", base, cur)
+
+    peak_base = baseline.get("rss_mb", {}).get("peak")
+    peak_cur = current.get("rss_mb", {}).get("peak")
+    if peak_base and peak_cur and (peak_cur - peak_base) / peak_base > tolerance:
+        regressions.append(f"rss_mb.peak: {peak_base} -> {peak_cur} ({(peak_cur - peak_base) / peak_base:+.1%})")
+    return regressions
@@ -0,0 +1,162 @@
+"""
+Runs a planned request sequence against an in-process ASGI app
+"""
+import asyncio
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from .scenarios import TARGETS, make_workdir, plan_requests
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Drive the app's ASGI lifespan so startup/shutdown handlers run (ASGITransport skips them)"""
+    receive_queue: asyncio.Queue = asyncio.Queue()
+    send_queue: asyncio.Queue = asyncio.Queue()
+
+    async def receive():
+        return await receive_queue.get()
+
+    async def send(message):
+        await send_queue.put(message)
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send))
+    await receive_queue.put({"type": "lifespan.startup"})
+    message = await send_queue.get()
+    if message["type"] == "lifespan.startup.failed":
+        await task
+        raise RuntimeError(f"Application startup failed: {message.get('message', '')}")
+    try:
+        yield app
+    finally:
+        await receive_queue.put({"type": "lifespan.shutdown"})
+        await send_queue.get()
+        await task
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    values = sorted(latencies)
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "p50": to_ms(percentile(values, 0.50)),
+        "p95": to_ms(percentile(values, 0.95)),
+        "p99": to_ms(percentile(values, 0.99)),
+        "mean": to_ms(sum(values) / len(values)) if values else None,
+        "max": to_ms(values[-1]) if values else None,
+    }
+
+
+def is_error(response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # simple_server reports some failures as {"error": ...} with a 200
+    if response.headers.get("content-type", "").startswith("application/json") and response.content.startswith(b'{"error"'):
+        return True
+    return False
+
+
+async def run_benchmark(target_name: str, scenario: str = "mixed", requests: int = 5000, concurrency: int = 16,
+                        seed: int = 1, warmup: int = 200, setup_size: int = 10, workdir: Optional[str] = None) -> dict:
+    """Boot the target, replay ``requests`` planned requests with ``concurrency`` workers and summarise"""
+    target = TARGETS[target_name]
+    if scenario not in target.scenarios:
+        raise ValueError(f"Unknown scenario {scenario!r} for {target_name}; choose from {', '.join(target.scenarios)}")
+
+    rng = random.Random(seed)
+    cwd = os.getcwd()
+    sys.path.insert(0, cwd)
+    rss_start = rss_mb()
+    app = target.load(make_workdir(workdir))
+
+    try:
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+                context = await target.setup(client, rng, setup_size)
+                plan = plan_requests(target, scenario, rng, context, warmup + requests)
+
+                for name, (method, path, kwargs) in plan[:warmup]:
+                    await client.request(method, path, **kwargs)
+
+                latencies: Dict[str, List[float]] = {name: [] for name in target.scenarios[scenario]}
+                errors: Dict[str, int] = {name: 0 for name in latencies}
+                measured = iter(plan[warmup:])
+
+                async def worker():
+                    for name, (method, path, kwargs) in measured:
+                        started = time.perf_counter()
+                        try:
+                            response = await client.request(method, path, **kwargs)
+                            failed = is_error(response)
+                        except httpx.HTTPError:
+                            failed = True
+                        latencies[name].append(time.perf_counter() - started)
+                        if failed:
+                            errors[name] += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "target": target_name,
+        "scenario": scenario,
+        "seed": seed,
+        "requests": requests,
+        "concurrency": concurrency,
+        "warmup": warmup,
+        "setup_size": setup_size,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "errors": sum(errors.values()),
+        "latency_ms": latency_summary(all_latencies),
+        "operations": {
+            name: {
+                "count": len(values),
+                "errors": errors[name],
+                "throughput_rps": round(len(values) / elapsed, 1),
+                "latency_ms": latency_summary(values),
+            }
+            for name, values in latencies.items() if values
+        },
+        "rss_mb": {"start": rss_start, "end": rss_mb(), "peak": peak_rss_mb()},
+    }
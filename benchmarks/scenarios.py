@@ -0,0 +1,221 @@
+"""
+Benchmark targets and their request mixes
+"""
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (method, path, httpx request keyword arguments)
+Request = Tuple[str, str, dict]
+
+# Readings per request for the bulk ingest operations
+BULK_SIZE = 50
+
+# Fixed base for generated timestamps so runs replay identical requests
+BASE_TIME = datetime(2026, 1, 1)
+
+
+@dataclass(frozen=True)
+class Operation:
+    name: str
+    build: Callable[[random.Random, dict, int], Request]  # (rng, setup context, sequence number)
+
+
+# -- simple_server ---------------------------------------------------------
+
+def load_simple_app(workdir: str):
+    os.environ.setdefault("MCU_TRANSPORT", "log")
+    import simple_server
+    return simple_server.app
+
+
+async def setup_simple(client, rng: random.Random, size: int) -> dict:
+    """Start a batch in up to ``size`` free cells so reads have running batches to resolve"""
+    cells = (await client.get("/api/cells")).json()
+    species = (await client.get("/api/species/")).json()
+    species_ids = [s["id"] for s in species] or [1]
+    batch_ids = []
+    for cell in cells[:size]:
+        batch = (await client.post("/api/batches", json={
+            "cellId": cell["id"],
+            "speciesId": rng.choice(species_ids),
+            "name": f"Benchmark {cell['id']}",
+        })).json()
+        if "id" in batch:
+            await client.post(f"/api/batches/{batch['id']}/start")
+            batch_ids.append(batch["id"])
+    environments = (await client.get("/api/environments/")).json()
+    return {
+        "cell_ids": [cell["id"] for cell in cells],
+        "batch_ids": batch_ids,
+        "environment_ids": [env["id"] for env in environments],
+    }
+
+
+def _telemetry(rng: random.Random, cell_id) -> dict:
+    return {
+        "cellId": cell_id,
+        "tempC": round(rng.gauss(22, 1.5), 2),
+        "rh": round(rng.gauss(88, 4), 1),
+        "co2ppm": round(rng.gauss(900, 150)),
+        "lux": round(rng.uniform(0, 400)),
+    }
+
+
+def _simple_telemetry(rng, ctx, seq) -> Request:
+    return "POST", "/api/telemetry", {"json": _telemetry(rng, rng.choice(ctx["cell_ids"]))}
+
+
+def _simple_telemetry_batch(rng, ctx, seq) -> Request:
+    return "POST", "/api/telemetry/batch", {
+        "json": [_telemetry(rng, rng.choice(ctx["cell_ids"])) for _ in range(BULK_SIZE)]
+    }
+
+
+def _simple_batch_detail(rng, ctx, seq) -> Request:
+    return "GET", f"/api/batches/{rng.choice(ctx['batch_ids'])}", {}
+
+
+def _simple_fleet_growth(rng, ctx, seq) -> Request:
+    return "GET", "/api/growth-status", {}
+
+
+def _simple_environment_growth(rng, ctx, seq) -> Request:
+    return "GET", f"/api/environments/{rng.choice(ctx['environment_ids'])}/growth-status", {}
+
+
+def _simple_cells(rng, ctx, seq) -> Request:
+    return "GET", "/api/cells", {}
+
+
+# -- backend ---------------------------------------------------------------
+
+def load_backend_app(workdir: str):
+    """Import the backend against a fresh SQLite database in ``workdir``.
+
+    SQL echo follows DEBUG, which defaults on; it is switched off so the
+    benchmark measures the API rather than log formatting.
+    """
+    os.chdir(workdir)
+    from backend.app.core.config import settings
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    settings.DEBUG = False
+    from backend.app.main import app
+    return app
+
+
+async def setup_backend(client, rng: random.Random, size: int) -> dict:
+    """Create ``size`` environments and give each a reading"""
+    environment_ids = []
+    for index in range(size):
+        response = await client.post("/api/environments/", json={"name": f"Benchmark {index + 1}"})
+        response.raise_for_status()
+        environment_ids.append(response.json()["id"])
+    await client.post("/api/sensor-logs/bulk", json=[
+        _sensor_log(rng, env_id, BASE_TIME) for env_id in environment_ids
+    ])
+    return {"environment_ids": environment_ids}
+
+
+def _sensor_log(rng: random.Random, environment_id: int, timestamp: datetime) -> dict:
+    return {
+        "environment_id": environment_id,
+        "timestamp": timestamp.isoformat(),
+        "temperature": round(rng.gauss(22, 1.5), 2),
+        "humidity": round(rng.gauss(88, 4), 1),
+        "co2_level": round(rng.gauss(900, 150), 1),
+        "sensor_type": "benchmark",
+    }
+
+
+def _backend_sensor_log(rng, ctx, seq) -> Request:
+    timestamp = BASE_TIME + timedelta(seconds=seq)
+    return "POST", "/api/sensor-logs/", {"json": _sensor_log(rng, rng.choice(ctx["environment_ids"]), timestamp)}
+
+
+def _backend_sensor_log_bulk(rng, ctx, seq) -> Request:
+    timestamp = BASE_TIME + timedelta(seconds=seq)
+    return "POST", "/api/sensor-logs/bulk", {
+        "json": [_sensor_log(rng, rng.choice(ctx["environment_ids"]), timestamp) for _ in range(BULK_SIZE)]
+    }
+
+
+def _backend_sensor_logs(rng, ctx, seq) -> Request:
+    return "GET", "/api/sensor-logs/", {"params": {"environment_id": rng.choice(ctx["environment_ids"]), "limit": 50}}
+
+
+def _backend_summary(rng, ctx, seq) -> Request:
+    return "GET", "/api/sensors/sensors/summary", {}
+
+
+def _backend_latest(rng, ctx, seq) -> Request:
+    return "GET", f"/api/sensors/environments/{rng.choice(ctx['environment_ids'])}/sensors/latest", {}
+
+
+@dataclass(frozen=True)
+class Target:
+    load: Callable[[str], object]
+    setup: Callable
+    operations: Dict[str, Operation]
+    # Scenario name -> {operation name: weight}
+    scenarios: Dict[str, Dict[str, int]]
+
+
+def _operations(*operations: Operation) -> Dict[str, Operation]:
+    return {operation.name: operation for operation in operations}
+
+
+TARGETS: Dict[str, Target] = {
+    "simple": Target(
+        load=load_simple_app,
+        setup=setup_simple,
+        operations=_operations(
+            Operation("telemetry", _simple_telemetry),
+            Operation("telemetry_batch", _simple_telemetry_batch),
+            Operation("batch_detail", _simple_batch_detail),
+            Operation("fleet_growth_status", _simple_fleet_growth),
+            Operation("environment_growth_status", _simple_environment_growth),
+            Operation("cells", _simple_cells),
+        ),
+        scenarios={
+            "ingest": {"telemetry": 80, "telemetry_batch": 20},
+            "read": {"batch_detail": 40, "fleet_growth_status": 30, "environment_growth_status": 20, "cells": 10},
+            "mixed": {"telemetry": 50, "batch_detail": 20, "fleet_growth_status": 15, "environment_growth_status": 10, "cells": 5},
+        },
+    ),
+    "backend": Target(
+        load=load_backend_app,
+        setup=setup_backend,
+        operations=_operations(
+            Operation("sensor_log", _backend_sensor_log),
+            Operation("sensor_log_bulk", _backend_sensor_log_bulk),
+            Operation("sensor_logs", _backend_sensor_logs),
+            Operation("sensors_summary", _backend_summary),
+            Operation("latest_readings", _backend_latest),
+        ),
+        scenarios={
+            "ingest": {"sensor_log": 80, "sensor_log_bulk": 20},
+            "read": {"sensor_logs": 40, "sensors_summary": 30, "latest_readings": 30},
+            "mixed": {"sensor_log": 50, "sensor_logs": 20, "sensors_summary": 15, "latest_readings": 15},
+        },
+    ),
+}
+
+
+def plan_requests(target: Target, scenario: str, rng: random.Random, context: dict, count: int) -> List[Tuple[str, Request]]:
+    """The request sequence for a run, drawn up front so it only depends on the seed"""
+    weights = target.scenarios[scenario]
+    names = list(weights)
+    picks = rng.choices(names, [weights[name] for name in names], k=count)
+    return [(name, target.operations[name].build(rng, context, seq)) for seq, name in enumerate(picks)]
+
+
+def make_workdir(path: Optional[str] = None) -> str:
+    """Directory the target may write its database and files into"""
+    if path:
+        os.makedirs(path, exist_ok=True)
+        return os.path.abspath(path)
+    return tempfile.mkdtemp(prefix="mushroom-bench-")
@@ -6,6 +6,8 @@ class MushroomCultivationApp {
         this.selectedChamber = null;
         this.selectedSpecies = null;
         this.refreshInterval = null;
+        this.liveSource = null;
+        this.liveRefreshTimer = null;
     }
 
     async init() {
@@ -47,13 +49,58 @@ class MushroomCultivationApp {
     }
 
     startAutoRefresh() {
-        // Refresh data every 30 seconds
-        this.refreshInterval = setInterval(() => {
+        // Listen for pushed updates; fall back to polling every 30 seconds without them
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+        this.liveSource = new EventSource(`${this.apiBaseUrl}/live/events?topics=environment:*,alerts`);
+        this.liveSource.addEventListener('reading', (e) => this.applyLiveReading(JSON.parse(e.data).data));
+        ['stage', 'alert', 'dropped'].forEach(type => {
+            this.liveSource.addEventListener(type, () => this.scheduleLiveRefresh());
+        });
+        this.liveSource.onerror = () => {
+            // EventSource retries by itself unless the server refused the stream
+            if (this.liveSource.readyState === EventSource.CLOSED) {
+                this.liveSource = null;
+                this.startPolling();
+            }
+        };
+    }
+
+    startPolling() {
+        if (!this.refreshInterval) {
+            this.refreshInterval = setInterval(() => {
+                this.refreshData();
+            }, 30000);
+        }
+    }
+
+    applyLiveReading(reading) {
+        const { environment_id: environmentId, ...values } = reading;
+        const env = this.environments.find(e => e.id === environmentId);
+        if (!env) {
+            this.scheduleLiveRefresh();
+            return;
+        }
+        Object.assign(env, values);
+        this.renderChambers();
+    }
+
+    scheduleLiveRefresh() {
+        // Collapse a burst of events into one refetch
+        if (this.liveRefreshTimer) return;
+        this.liveRefreshTimer = setTimeout(() => {
+            this.liveRefreshTimer = null;
             this.refreshData();
-        }, 30000);
+        }, 1000);
     }
 
     stopAutoRefresh() {
+        if (this.liveSource) {
+            this.liveSource.close();
+            this.liveSource = null;
+        }
         if (this.refreshInterval) {
             clearInterval(this.refreshInterval);
             this.refreshInterval = null;
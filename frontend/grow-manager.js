@@ -12,6 +12,8 @@ let batches = [];
 let cells = [];
 let speciesProfiles = [];
 let monitorInterval = null;
+let monitorSource = null;
+let monitorSourceBatchId = null;
 
 // Page initialization
 window.addEventListener('load', async function() {
@@ -352,9 +354,7 @@ async function loadBatchMonitor() {
         }
         
         renderBatchMonitor();
-        
-        if (monitorInterval) clearInterval(monitorInterval);
-        monitorInterval = setInterval(refreshBatchMonitor, 30000);
+        watchBatchMonitor(batchId);
         
     } catch (error) {
         console.error('Error loading batch monitor:', error);
@@ -597,6 +597,40 @@ async function refreshGrowData() {
     alert('Data refreshed successfully');
 }
 
+// Follow the monitored batch over Server-Sent Events instead of polling it
+function watchBatchMonitor(batchId) {
+    if (monitorSource && monitorSourceBatchId === batchId) return;
+    if (monitorSource) monitorSource.close();
+    if (monitorInterval) {
+        clearInterval(monitorInterval);
+        monitorInterval = null;
+    }
+    if (!window.EventSource) {
+        monitorInterval = setInterval(refreshBatchMonitor, 30000);
+        return;
+    }
+    
+    monitorSourceBatchId = batchId;
+    monitorSource = new EventSource(`${API_BASE_URL}/api/live/events?topics=batch:${encodeURIComponent(batchId)}`);
+    monitorSource.addEventListener('reading', (e) => {
+        const reading = JSON.parse(e.data).data;
+        if (!currentBatch || reading.batchId !== currentBatchId) return;
+        currentBatch.recentReadings = [...(currentBatch.recentReadings || []).slice(-99), reading];
+        renderBatchMonitor();
+    });
+    // Status and stage changes affect more than the event carries, so refetch the batch
+    ['status', 'stage', 'dropped'].forEach(type => {
+        monitorSource.addEventListener(type, refreshBatchMonitor);
+    });
+    monitorSource.onerror = () => {
+        if (monitorSource && monitorSource.readyState === EventSource.CLOSED) {
+            monitorSource = null;
+            monitorSourceBatchId = null;
+            monitorInterval = setInterval(refreshBatchMonitor, 30000);
+        }
+    };
+}
+
 async function refreshBatchMonitor() {
     if (currentBatchId) {
         await loadBatchMonitor();
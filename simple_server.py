@@ -2,12 +2,15 @@
 """
 Simple working mushroom cultivation server
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
 
+from backend.app.core.health import HealthMonitor, disk_check, freshness_check, transport_check
+from backend.app.core.metrics import CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, MetricsMiddleware
+
 # Create FastAPI app
 app = FastAPI(title="Mushroom Cultivation System")
 
@@ -21,6 +24,9 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Request count and latency per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Sample mushroom species data
 SPECIES_DATA = [
     {
@@ -165,11 +171,20 @@ ENVIRONMENTS_DATA = [
 ]
 
 # Extended data model for Batch + Cell Manager
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from array import array
+import asyncio
+import bisect
+import hashlib
+import itertools
 import json
+import math
+import re
 import uuid
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 
 class BatchStatus(str, Enum):
     PENDING = "Pending"
@@ -381,8 +396,152 @@ CELLS_DATA = [
 # Batches data
 BATCHES_DATA = []
 
-# Environmental readings data
-ENV_READINGS_DATA = []
+# Environmental readings storage
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+READINGS_PER_CELL = int(os.environ.get("READINGS_PER_CELL", 2880))  # 24h at 30s intervals
+READINGS_SPILL_DIR = os.environ.get("READINGS_SPILL_DIR")  # Unset disables spilling evicted readings
+
+def timestamp_to_micros(value):
+    """Convert an ISO-8601 string or epoch seconds to integer microseconds since the epoch"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value * 1_000_000)
+    if not isinstance(value, str):
+        raise ValueError("timestamp must be an ISO-8601 string or epoch seconds")
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+def micros_to_timestamp(micros):
+    """Inverse of timestamp_to_micros, in the API's "...Z" string format"""
+    return (EPOCH + timedelta(microseconds=micros)).replace(tzinfo=None).isoformat() + "Z"
+
+class ReadingRingBuffer:
+    """Fixed-capacity, column-oriented buffer of one cell's readings.
+    
+    Values live in preallocated typed arrays, so memory is fixed by
+    ``capacity`` and appends overwrite the oldest slot once full. Evicted
+    rows are appended to ``spill_path`` as NDJSON when one is configured.
+    """
+    FIELDS = ("tempC", "rh", "co2ppm", "lux")
+    
+    def __init__(self, cell_id, capacity, spill_path=None):
+        self.cell_id = cell_id
+        self.capacity = capacity
+        self.seq = array("q", bytes(8 * capacity))
+        self.ts = array("q", bytes(8 * capacity))
+        self.columns = {field: array("d", [math.nan]) * capacity for field in self.FIELDS}
+        self.batch_ids = [None] * capacity
+        self.notes = [""] * capacity
+        self.head = 0  # Next slot to write
+        self.size = 0
+        self.spill_path = spill_path
+        self._spill_file = None
+    
+    def __len__(self):
+        return self.size
+    
+    def append(self, seq, micros, reading):
+        """Store a reading in O(1), evicting the oldest one when full"""
+        slot = self.head
+        if self.size == self.capacity:
+            if self.spill_path:
+                self._spill(slot)
+        else:
+            self.size += 1
+        
+        self.seq[slot] = seq
+        self.ts[slot] = micros
+        for field in self.FIELDS:
+            value = reading.get(field)
+            self.columns[field][slot] = math.nan if value is None else value
+        self.batch_ids[slot] = reading.get("batchId")
+        self.notes[slot] = reading.get("notes", "")
+        self.head = (slot + 1) % self.capacity
+    
+    def last(self, k, batch_id=None):
+        """Return up to the k most recent readings, oldest first, optionally for one batch"""
+        rows = []
+        slot = self.head
+        for _ in range(self.size):
+            if len(rows) >= k:
+                break
+            slot = (slot - 1) % self.capacity
+            if batch_id is None or self.batch_ids[slot] == batch_id:
+                rows.append(self._row(slot))
+        rows.reverse()
+        return rows
+    
+    def close(self):
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
+    
+    def _row(self, slot):
+        row = {
+            "id": f"reading_{self.seq[slot]}",
+            "cellId": self.cell_id,
+            "timestamp": micros_to_timestamp(self.ts[slot])
+        }
+        for field in self.FIELDS:
+            value = self.columns[field][slot]
+            row[field] = None if math.isnan(value) else value
+        row["notes"] = self.notes[slot]
+        if self.batch_ids[slot] is not None:
+            row["batchId"] = self.batch_ids[slot]
+        return row
+    
+    def _spill(self, slot):
+        if self._spill_file is None:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write(json.dumps(self._row(slot)) + "\n")
+
+class CellReadingStore:
+    """Per-cell ring buffers for environmental readings"""
+    
+    def __init__(self, capacity_per_cell, spill_dir=None):
+        self.capacity_per_cell = capacity_per_cell
+        self.spill_dir = spill_dir
+        self.buffers = {}
+        self.total_ingested = 0
+        self.last_received = {}  # cellId -> UTC time its latest reading arrived
+    
+    def __len__(self):
+        return sum(len(buffer) for buffer in self.buffers.values())
+    
+    def next_id(self):
+        return f"reading_{self.total_ingested + 1}"
+    
+    def append(self, reading, micros=None):
+        """Store a reading; raises ValueError for an unparseable timestamp"""
+        if micros is None:
+            micros = timestamp_to_micros(reading["timestamp"])
+        cell_id = reading["cellId"]
+        buffer = self.buffers.get(cell_id)
+        if buffer is None:
+            # The id ends up in a file name, so keep only characters that cannot leave spill_dir
+            safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(cell_id))
+            spill_path = os.path.join(self.spill_dir, f"cell_{safe_id}.ndjson") if self.spill_dir else None
+            buffer = self.buffers[cell_id] = ReadingRingBuffer(cell_id, self.capacity_per_cell, spill_path)
+        self.total_ingested += 1
+        buffer.append(self.total_ingested, micros, reading)
+        self.last_received[cell_id] = datetime.utcnow()
+    
+    def last(self, cell_id, k, batch_id=None):
+        buffer = self.buffers.get(cell_id)
+        return buffer.last(k, batch_id) if buffer else []
+    
+    def close(self):
+        for buffer in self.buffers.values():
+            buffer.close()
+
+ENV_READINGS_STORE = CellReadingStore(READINGS_PER_CELL, READINGS_SPILL_DIR)
+
+@app.on_event("shutdown")
+async def close_reading_store():
+    """Flush any open spill files"""
+    ENV_READINGS_STORE.close()
 
 # Action logs data
 ACTION_LOGS_DATA = []
@@ -390,6 +549,165 @@ ACTION_LOGS_DATA = []
 # Photos data
 PHOTOS_DATA = []
 
+ACTIVE_BATCH_STATUSES = (BatchStatus.RUNNING, BatchStatus.PAUSED)
+
+@dataclass(frozen=True)
+class StageTargets:
+    temp_min: float
+    temp_max: float
+    rh_min: float
+    rh_max: float
+    co2_min: float
+    co2_max: float
+    light_lux_min: float
+    light_lux_max: float
+    light_hours_per_day: float
+    
+    @classmethod
+    def from_dict(cls, targets):
+        return cls(
+            targets["tempMin"], targets["tempMax"], targets["rhMin"], targets["rhMax"],
+            targets["co2Min"], targets["co2Max"], targets.get("lightLuxMin", 0), targets.get("lightLuxMax", 0),
+            targets.get("lightHoursPerDay", 0)
+        )
+
+@dataclass(frozen=True)
+class SpeciesTimeline:
+    """A species' stage schedule with prefix sums, for bisect lookups by elapsed time"""
+    species_id: int
+    name: str
+    stage_names: Tuple[str, ...]
+    durations: Tuple[float, ...]
+    ends: Tuple[float, ...]  # Cumulative hours at which each stage ends
+    total_hours: float
+    targets: Tuple[StageTargets, ...]
+    
+    @classmethod
+    def from_species(cls, species):
+        stages = species["stages"]
+        ends = tuple(itertools.accumulate(stage["durationHours"] for stage in stages))
+        return cls(
+            species_id=species["id"],
+            name=species["name"],
+            stage_names=tuple(stage["name"] for stage in stages),
+            durations=tuple(stage["durationHours"] for stage in stages),
+            ends=ends,
+            total_hours=ends[-1] if ends else 0,
+            targets=tuple(StageTargets.from_dict(stage["targets"]) for stage in stages)
+        )
+    
+    def stage_index(self, elapsed_hours):
+        """Stage in progress after ``elapsed_hours``, or None once the last stage has ended"""
+        index = bisect.bisect_left(self.ends, elapsed_hours)
+        return index if index < len(self.ends) else None
+    
+    def stage_start(self, index):
+        return self.ends[index] - self.durations[index]
+
+@lru_cache(maxsize=4096)
+def parse_local_timestamp(value):
+    """Parse a stored ISO timestamp as a naive local datetime (they carry a "Z" but are local time)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+class BatchRepository:
+    """Dict indexes over the batch, cell, species, action log and photo lists.
+    
+    The module-level lists stay the source of truth for listing endpoints;
+    every mutation goes through this class so the indexes never drift.
+    """
+    
+    def __init__(self, batches, cells, species, action_logs, photos, readings):
+        self.batches = batches
+        self.cells = cells
+        self.species = species
+        self.action_logs = action_logs
+        self.photos = photos
+        self.readings = readings
+        self.batches_by_id = {b["id"]: b for b in batches}
+        self.active_batch_by_cell = {b["cellId"]: b for b in batches if b["status"] in ACTIVE_BATCH_STATUSES}
+        self.cells_by_id = {c["id"]: c for c in cells}
+        self.cells_by_mcu = {c["mcuId"]: c for c in cells}
+        self.species_by_id = {sp["id"]: sp for sp in species}
+        # Stage profiles are static, so cached timelines never go stale
+        self.timelines_by_species = {}
+        self.action_logs_by_batch = {}
+        for log in action_logs:
+            self.action_logs_by_batch.setdefault(log["batchId"], []).append(log)
+        self.photos_by_batch = {}
+        for photo in photos:
+            self.photos_by_batch.setdefault(photo["batchId"], []).append(photo)
+    
+    # Batches
+    def get_batch(self, batch_id):
+        return self.batches_by_id.get(batch_id)
+    
+    def add_batch(self, batch):
+        self.batches.append(batch)
+        self.batches_by_id[batch["id"]] = batch
+        if batch["status"] in ACTIVE_BATCH_STATUSES:
+            self.active_batch_by_cell[batch["cellId"]] = batch
+    
+    def set_batch_status(self, batch, status):
+        """Change a batch's status and update the active-batch-by-cell index"""
+        batch["status"] = status
+        if status in ACTIVE_BATCH_STATUSES:
+            self.active_batch_by_cell[batch["cellId"]] = batch
+        elif self.active_batch_by_cell.get(batch["cellId"]) is batch:
+            del self.active_batch_by_cell[batch["cellId"]]
+        LIVE_HUB.publish(
+            (f"batch:{batch['id']}", f"cell:{batch['cellId']}"), "status",
+            {"batchId": batch["id"], "cellId": batch["cellId"], "status": status}
+        )
+    
+    def active_batch(self, cell_id):
+        """Running or paused batch occupying a cell"""
+        return self.active_batch_by_cell.get(cell_id)
+    
+    def running_batch(self, cell_id):
+        batch = self.active_batch_by_cell.get(cell_id)
+        return batch if batch and batch["status"] == BatchStatus.RUNNING else None
+    
+    # Cells and species
+    def get_cell(self, cell_id):
+        return self.cells_by_id.get(cell_id)
+    
+    def cell_for_mcu(self, mcu_id):
+        return self.cells_by_mcu.get(mcu_id)
+    
+    def get_species(self, species_id):
+        return self.species_by_id.get(species_id)
+    
+    def species_timeline(self, species_id):
+        """Cached stage timeline for a species (None if unknown or stageless)"""
+        timeline = self.timelines_by_species.get(species_id)
+        if timeline is None:
+            species = self.species_by_id.get(species_id)
+            if not species or not species.get("stages"):
+                return None
+            timeline = self.timelines_by_species[species_id] = SpeciesTimeline.from_species(species)
+        return timeline
+    
+    # Action logs and photos
+    def add_action_log(self, log):
+        self.action_logs.append(log)
+        self.action_logs_by_batch.setdefault(log["batchId"], []).append(log)
+    
+    def get_action_logs(self, batch_id):
+        return self.action_logs_by_batch.get(batch_id, [])
+    
+    def add_photo(self, photo):
+        self.photos.append(photo)
+        self.photos_by_batch.setdefault(photo["batchId"], []).append(photo)
+    
+    def get_photos(self, batch_id):
+        return self.photos_by_batch.get(batch_id, [])
+    
+    # Readings
+    def get_readings(self, cell_id, k, batch_id=None):
+        return self.readings.last(cell_id, k, batch_id)
+
+BATCH_REPO = BatchRepository(BATCHES_DATA, CELLS_DATA, SPECIES_WITH_STAGES, ACTION_LOGS_DATA, PHOTOS_DATA, ENV_READINGS_STORE)
+
 # Automation rules data with professional presets
 AUTOMATION_RULES = [
     {
@@ -579,6 +897,9 @@ ALERT_CHANNELS = {
     "webhook": {"enabled": True, "url": "https://hooks.slack.com/services/YOUR/SLACK/WEBHOOK"}
 }
 ALERT_HISTORY = []
+ALERTS_DISPATCHED = REGISTRY.counter("alerts_dispatched_total", "Alerts raised by source", ("source",))
+ALERTS_API_DISPATCHED = ALERTS_DISPATCHED.labels("api")
+ALERTS_SAFETY_DISPATCHED = ALERTS_DISPATCHED.labels("safety")
 ESCALATION_RULES = [
     {"id": "critical_temp", "condition": "temperature > 35", "escalate_after": 300, "channels": ["email", "sms"]},
     {"id": "low_humidity", "condition": "humidity < 70", "escalate_after": 600, "channels": ["email"]},
@@ -692,6 +1013,23 @@ async def create_environment(environment: dict):
     ENVIRONMENTS_DATA.append(new_environment)
     return new_environment
 
+def publish_environment_reading(env):
+    LIVE_HUB.publish((f"environment:{env['id']}",), "reading", {
+        "environment_id": env["id"],
+        "temperature": env.get("temperature"),
+        "humidity": env.get("humidity"),
+        "co2": env.get("co2"),
+        "airflow": env.get("airflow")
+    }, coalesce=True)
+
+def publish_environment_stage(env):
+    LIVE_HUB.publish((f"environment:{env['id']}",), "stage", {
+        "environment_id": env["id"],
+        "species_id": env.get("species_id"),
+        "current_phase": env.get("current_phase"),
+        "phase_start_time": env.get("phase_start_time")
+    })
+
 @app.get("/api/environments/{environment_id}/sensors/latest")
 async def get_latest_sensor_data(environment_id: int):
     """Get latest sensor readings for an environment"""
@@ -752,6 +1090,7 @@ async def simulate_sensor_data(environment_id: int):
     env["humidity"] = round(random.uniform(80, 95), 1) 
     env["co2"] = round(random.uniform(400, 1200))
     env["airflow"] = round(random.uniform(0.5, 2.0), 1)
+    publish_environment_reading(env)
     
     return {"status": "success", "message": "Sensor data simulated"}
 
@@ -777,6 +1116,7 @@ async def assign_species_to_environment(environment_id: int, assignment: dict):
     # Set phase start time for growth tracking
     from datetime import datetime
     env["phase_start_time"] = datetime.now().isoformat()
+    publish_environment_stage(env)
     
     return env
 
@@ -794,33 +1134,23 @@ async def get_growth_status(environment_id: int):
     if not species:
         return {"status": "species_not_found", "message": "Species data not found"}
     
-    from datetime import datetime, timedelta
+    timeline = BATCH_REPO.species_timeline(species["id"])
     
     # Calculate current stage and progress
-    start_time = env.get("phase_start_time", datetime.now().isoformat())
-    if isinstance(start_time, str):
-        start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-    
-    elapsed_hours = (datetime.now() - start_time).total_seconds() / 3600
-    current_stage_index = 0
-    cumulative_hours = 0
-    
-    for i, stage in enumerate(species["stages"]):
-        cumulative_hours += stage["durationHours"]
-        if elapsed_hours <= cumulative_hours:
-            current_stage_index = i
-            break
-    else:
-        current_stage_index = len(species["stages"]) - 1  # Completed
+    now = datetime.now()
+    start_time = parse_local_timestamp(env["phase_start_time"]) if env.get("phase_start_time") else now
+    elapsed_hours = (now - start_time).total_seconds() / 3600
+    current_stage_index = timeline.stage_index(elapsed_hours)
+    if current_stage_index is None:
+        current_stage_index = len(timeline.ends) - 1  # Completed
     
     current_stage = species["stages"][current_stage_index]
-    stage_start_hours = cumulative_hours - current_stage["durationHours"]
-    stage_elapsed = elapsed_hours - stage_start_hours
-    stage_progress = min(stage_elapsed / current_stage["durationHours"], 1.0)
-    hours_remaining = max(current_stage["durationHours"] - stage_elapsed, 0)
+    stage_elapsed = elapsed_hours - timeline.stage_start(current_stage_index)
+    stage_progress = min(stage_elapsed / timeline.durations[current_stage_index], 1.0)
+    hours_remaining = max(timeline.durations[current_stage_index] - stage_elapsed, 0)
     
     # Calculate total progress
-    total_duration = sum(stage["durationHours"] for stage in species["stages"])
+    total_duration = timeline.total_hours
     total_progress = min(elapsed_hours / total_duration, 1.0)
     
     return {
@@ -841,6 +1171,74 @@ async def get_growth_status(environment_id: int):
         "estimated_completion": (start_time + timedelta(hours=total_duration)).isoformat()
     }
 
+# Fleet growth status
+GROWTH_STATUS_RESOLUTION_SECONDS = int(os.environ.get("GROWTH_STATUS_RESOLUTION_SECONDS", 60))
+
+_GROWTH_STATUS_CACHE = {}
+
+def compute_fleet_growth_status(environments, now):
+    species_out = {}
+    statuses = []
+    for env in environments:
+        timeline = BATCH_REPO.species_timeline(env.get("species_id"))
+        if timeline is None:
+            statuses.append({"id": env["id"], "status": "no_species" if not env.get("species_id") else "species_not_found"})
+            continue
+        if timeline.species_id not in species_out:
+            species_out[timeline.species_id] = {"name": timeline.name, "stages": timeline.stage_names}
+        
+        start_time = parse_local_timestamp(env["phase_start_time"]) if env.get("phase_start_time") else now
+        elapsed_hours = max((now - start_time).total_seconds() / 3600, 0)
+        index = timeline.stage_index(elapsed_hours)
+        if index is None:
+            index = len(timeline.ends) - 1  # Completed
+        duration = timeline.durations[index]
+        stage_elapsed = elapsed_hours - timeline.stage_start(index)
+        statuses.append({
+            "id": env["id"],
+            "species_id": timeline.species_id,
+            "stage": index,
+            "stage_progress": round(min(stage_elapsed / duration, 1.0) * 100, 1),
+            "total_progress": round(min(elapsed_hours / timeline.total_hours, 1.0) * 100, 1),
+            "hours_remaining": round(max(duration - stage_elapsed, 0), 1)
+        })
+    return {"generated_at": now.isoformat(), "species": species_out, "environments": statuses}
+
+@app.get("/api/growth-status")
+async def get_fleet_growth_status(request: Request, ids: str = None):
+    """Growth status of every environment (or the comma-separated ``ids``) in one response.
+    
+    Progress is computed as of the start of the current
+    ``GROWTH_STATUS_RESOLUTION_SECONDS`` window, so the body (and its ETag)
+    only changes when that window rolls over or an environment's species
+    or phase changes; unchanged polls get a 304.
+    """
+    if ids:
+        try:
+            wanted = {int(value) for value in ids.split(",") if value.strip()}
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "ids must be comma-separated integers"})
+        environments = [env for env in ENVIRONMENTS_DATA if env["id"] in wanted]
+    else:
+        environments = ENVIRONMENTS_DATA
+    
+    resolution = max(GROWTH_STATUS_RESOLUTION_SECONDS, 1)
+    window = int(datetime.now().timestamp() // resolution)
+    fingerprint = repr((window, [(env["id"], env.get("species_id"), env.get("phase_start_time")) for env in environments]))
+    etag = '"' + hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    cached = _GROWTH_STATUS_CACHE.get(ids)
+    if cached is None or cached[0] != etag:
+        status = compute_fleet_growth_status(environments, datetime.fromtimestamp(window * resolution))
+        if len(_GROWTH_STATUS_CACHE) >= 64:
+            _GROWTH_STATUS_CACHE.clear()
+        cached = _GROWTH_STATUS_CACHE[ids] = (etag, json.dumps(status, separators=(",", ":")))
+    return Response(content=cached[1], media_type="application/json", headers=headers)
+
 @app.post("/api/environments/{environment_id}/advance-phase")
 async def advance_growth_phase(environment_id: int):
     """Manually advance to next growth phase"""
@@ -872,6 +1270,7 @@ async def advance_growth_phase(environment_id: int):
     from datetime import datetime
     env["phase_start_time"] = datetime.now().isoformat()
     env["current_phase"] = next_stage["name"]
+    publish_environment_stage(env)
     
     return {
         "status": "success",
@@ -912,6 +1311,7 @@ async def set_growth_phase(environment_id: int, phase_data: dict):
     from datetime import datetime
     env["phase_start_time"] = datetime.now().isoformat()
     env["current_phase"] = target_stage["name"]
+    publish_environment_stage(env)
     
     return {
         "message": f"Phase set to {phase_name} successfully",
@@ -1151,6 +1551,9 @@ async def create_alert(alert_data: dict):
     }
     ALERTS_DATA.append(new_alert)
     ALERT_HISTORY.append(new_alert)
+    ALERTS_API_DISPATCHED.inc()
+    topics = ("alerts", f"environment:{new_alert['chamber_id']}") if new_alert["chamber_id"] is not None else ("alerts",)
+    LIVE_HUB.publish(topics, "alert", new_alert)
     return new_alert
 
 @app.get("/api/alerts/channels")
@@ -1255,24 +1658,21 @@ def get_current_stage(batch):
     if batch["status"] != BatchStatus.RUNNING:
         return None
     
-    species = next((s for s in SPECIES_WITH_STAGES if s["id"] == batch["speciesId"]), None)
-    if not species:
+    timeline = BATCH_REPO.species_timeline(batch["speciesId"])
+    if not timeline:
         return None
     
-    elapsed_hours = (datetime.now() - datetime.fromisoformat(batch["startedAt"].replace('Z', '+00:00'))).total_seconds() / 3600
-    cumulative_hours = 0
-    
-    for i, stage in enumerate(species["stages"]):
-        cumulative_hours += stage["durationHours"]
-        if elapsed_hours <= cumulative_hours:
-            return {
-                "index": i,
-                "stage": stage,
-                "hoursRemaining": cumulative_hours - elapsed_hours,
-                "progress": (elapsed_hours - (cumulative_hours - stage["durationHours"])) / stage["durationHours"]
-            }
+    elapsed_hours = (datetime.now() - parse_local_timestamp(batch["startedAt"])).total_seconds() / 3600
+    index = timeline.stage_index(elapsed_hours)
+    if index is None:
+        return None  # Batch completed
     
-    return None  # Batch completed
+    return {
+        "index": index,
+        "stage": BATCH_REPO.get_species(batch["speciesId"])["stages"][index],
+        "hoursRemaining": timeline.ends[index] - elapsed_hours,
+        "progress": (elapsed_hours - timeline.stage_start(index)) / timeline.durations[index]
+    }
 
 def log_action(batch_id, cell_id, actor, action, payload=None):
     """Log an action to the action log"""
@@ -1285,43 +1685,423 @@ def log_action(batch_id, cell_id, actor, action, payload=None):
         "action": action,
         "payload": payload or {}
     }
-    ACTION_LOGS_DATA.append(action_log)
+    BATCH_REPO.add_action_log(action_log)
     return action_log
 
+# Live updates
+LIVE_FLUSH_INTERVAL_SECONDS = float(os.environ.get("LIVE_FLUSH_INTERVAL_MS", 250)) / 1000
+LIVE_MAX_PENDING_EVENTS = int(os.environ.get("LIVE_MAX_PENDING_EVENTS", 500))
+LIVE_HEARTBEAT_SECONDS = 15
+
+class LiveSubscriber:
+    """One WebSocket or SSE client's topics and undelivered events.
+    
+    Coalescable events (readings) replace the subscriber's previous event
+    with the same key, so a slow client gets the latest value rather than
+    a backlog. Past ``max_pending`` events the oldest are dropped and the
+    count is reported so the client can refetch.
+    """
+    
+    def __init__(self, topics, max_pending=LIVE_MAX_PENDING_EVENTS):
+        self.topics = set(topics)
+        self.max_pending = max_pending
+        self.pending = {}
+        self.dropped = 0
+        self.ready = asyncio.Event()
+    
+    def push(self, key, event):
+        if key in self.pending:
+            del self.pending[key]  # Re-insert so it sorts as the newest
+        self.pending[key] = event
+        if len(self.pending) > self.max_pending:
+            del self.pending[next(iter(self.pending))]
+            self.dropped += 1
+        self.ready.set()
+    
+    async def next_events(self, flush_interval=LIVE_FLUSH_INTERVAL_SECONDS):
+        """Wait for events; returns (events, dropped count) once a flush interval has passed"""
+        await self.ready.wait()
+        if flush_interval:
+            await asyncio.sleep(flush_interval)  # Let bursts coalesce into one message
+        self.ready.clear()
+        events = list(self.pending.values())
+        self.pending.clear()
+        dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+class LiveHub:
+    """Topic-based fan-out of readings, stage changes and alerts.
+    
+    Topics are ``cell:{id}``, ``batch:{id}``, ``environment:{id}`` and
+    ``alerts``; ``cell:*`` style wildcards match every id of a kind.
+    Publishing never blocks: each subscriber buffers (and coalesces) its
+    own events and sends them at its own pace.
+    """
+    
+    def __init__(self):
+        self.subscribers_by_topic = {}
+        self._event_ids = itertools.count(1)
+    
+    def subscribe(self, topics):
+        subscriber = LiveSubscriber(())
+        self.update(subscriber, add=topics)
+        return subscriber
+    
+    def update(self, subscriber, add=(), remove=()):
+        for topic in add:
+            subscriber.topics.add(topic)
+            self.subscribers_by_topic.setdefault(topic, set()).add(subscriber)
+        for topic in remove:
+            subscriber.topics.discard(topic)
+            subscribers = self.subscribers_by_topic.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers_by_topic[topic]
+    
+    def unsubscribe(self, subscriber):
+        self.update(subscriber, remove=list(subscriber.topics))
+    
+    def publish(self, topics, event_type, data, coalesce=False):
+        """Queue an event for subscribers of any of ``topics``; readings pass ``coalesce=True``"""
+        if not self.subscribers_by_topic:
+            return
+        recipients = set()
+        for topic in topics:
+            recipients.update(self.subscribers_by_topic.get(topic, ()))
+            recipients.update(self.subscribers_by_topic.get(topic.split(":", 1)[0] + ":*", ()))
+        if not recipients:
+            return
+        event_id = next(self._event_ids)
+        event = {"id": event_id, "type": event_type, "topics": list(topics), "data": data}
+        key = (event_type, topics[0]) if coalesce else event_id
+        for subscriber in recipients:
+            subscriber.push(key, event)
+
+# "alerts", or kind:id / kind:* for the kinds LiveHub publishes
+LIVE_TOPIC_PATTERN = re.compile(r"alerts|(?:cell|batch|environment):(?:\*|[^\s:*,]{1,64})")
+
+def valid_topics(topics):
+    """The well-formed topic strings in a client-supplied list; anything else is ignored"""
+    if not isinstance(topics, list):
+        return []
+    return [topic for topic in topics if isinstance(topic, str) and LIVE_TOPIC_PATTERN.fullmatch(topic)]
+
+def parse_topics(value):
+    return valid_topics([topic.strip() for topic in (value or "").split(",") if topic.strip()])
+
+LIVE_HUB = LiveHub()
+REGISTRY.gauge(
+    "live_subscribers", "Connected live event subscribers",
+    lambda: len(set().union(*LIVE_HUB.subscribers_by_topic.values()))
+)
+
+# MCU transport: "log" prints commands, "mqtt" talks to MCUs through a broker,
+# "serial" over a directly attached line
+MCU_TRANSPORT = os.environ.get("MCU_TRANSPORT", "log").lower()
+MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST", "localhost")
+MQTT_BROKER_PORT = int(os.environ.get("MQTT_BROKER_PORT", 1883))
+MQTT_USERNAME = os.environ.get("MQTT_USERNAME")
+MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD")
+MQTT_TOPIC_PREFIX = os.environ.get("MQTT_TOPIC_PREFIX", "mushroom")
+MQTT_ACK_TIMEOUT_SECONDS = float(os.environ.get("MQTT_ACK_TIMEOUT_SECONDS", 5))
+MQTT_MAX_INFLIGHT = int(os.environ.get("MQTT_MAX_INFLIGHT", 100))
+SERIAL_PORT = os.environ.get("SERIAL_PORT")
+SERIAL_BAUDRATE = int(os.environ.get("SERIAL_BAUDRATE", 115200))
+SERIAL_ACK_TIMEOUT_SECONDS = float(os.environ.get("SERIAL_ACK_TIMEOUT_SECONDS", 2))
+
+# Connected transport (None for the log fallback)
+mcu_transport = None
+
 def send_mcu_command(mcu_id, command):
-    """Send command to MCU (placeholder for MQTT/Serial integration)"""
+    """Log a command to an MCU (used when no MCU transport is configured)"""
     print(f"[MCU {mcu_id}] Command: {json.dumps(command)}")
-    # TODO: Implement actual MQTT/Serial communication
     return True
 
-def check_safety_thresholds(batch_id, cell_id, reading):
+def ingest_mcu_telemetry(mcu_id, telemetry_data):
+    """Store telemetry pushed by an MCU, attributing it to the MCU's cell"""
+    if isinstance(telemetry_data, dict) and telemetry_data.get("cellId") is None:
+        cell = BATCH_REPO.cell_for_mcu(mcu_id)
+        if cell is None:
+            print(f"Warning: telemetry from unknown MCU {mcu_id}")
+            return
+        telemetry_data["cellId"] = cell["id"]
+    try:
+        ingest_reading(telemetry_data)
+    except ValueError as e:
+        print(f"Warning: rejected telemetry from MCU {mcu_id}: {e}")
+
+@app.on_event("startup")
+async def connect_mcu_transport():
+    """Connect to the configured MCU transport"""
+    global mcu_transport
+    if MCU_TRANSPORT == "mqtt":
+        from backend.app.services.mqtt_transport import MQTTTransport
+        transport = MQTTTransport.connect_to(
+            MQTT_BROKER_HOST, MQTT_BROKER_PORT, MQTT_TOPIC_PREFIX, MQTT_USERNAME, MQTT_PASSWORD,
+            ack_timeout=MQTT_ACK_TIMEOUT_SECONDS, max_inflight=MQTT_MAX_INFLIGHT
+        )
+        await transport.on_telemetry(ingest_mcu_telemetry)
+        try:
+            await transport.start()
+        except asyncio.TimeoutError:
+            # The client keeps reconnecting in the background
+            print(f"Warning: MQTT broker {MQTT_BROKER_HOST}:{MQTT_BROKER_PORT} not reachable yet")
+        mcu_transport = transport
+    elif MCU_TRANSPORT == "serial":
+        from backend.app.services.serial_transport import SerialTransport
+        if not SERIAL_PORT:
+            print("Warning: MCU_TRANSPORT=serial needs SERIAL_PORT, logging commands instead")
+            return
+        transport = SerialTransport(SERIAL_PORT, SERIAL_BAUDRATE, SERIAL_ACK_TIMEOUT_SECONDS)
+        await transport.on_telemetry(ingest_mcu_telemetry)
+        try:
+            await transport.start()
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not open serial port {SERIAL_PORT}: {e}, logging commands instead")
+            return
+        mcu_transport = transport
+    elif MCU_TRANSPORT != "log":
+        print(f"Warning: unknown MCU_TRANSPORT {MCU_TRANSPORT!r}, logging commands instead")
+
+MCU_COMMAND_RETRIES = 3
+MCU_RETRY_BASE_DELAY_SECONDS = 0.5
+
+MCU_COMMAND_SECONDS = REGISTRY.histogram("mcu_command_duration_seconds", "Time to deliver an MCU command, retries included")
+MCU_COMMANDS_TOTAL = REGISTRY.counter("mcu_commands_total", "MCU commands by outcome", ("result",))
+MCU_COMMAND_RETRIES_TOTAL = REGISTRY.counter("mcu_command_retries_total", "MCU command send retries")
+
+class MCUCommandDispatcher:
+    """Delivers MCU commands off the request path.
+    
+    Each MCU gets its own queue and worker, so commands to one cell stay in
+    order while a slow or unreachable controller never holds up requests or
+    other cells. Failed sends are retried with exponential back-off.
+    """
+    
+    def __init__(self, retries=MCU_COMMAND_RETRIES, base_delay=MCU_RETRY_BASE_DELAY_SECONDS):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.queues = {}
+        self.workers = {}
+    
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self.queues.values())
+    
+    def submit(self, mcu_id, command):
+        """Queue a command; returns a future resolving to whether it was delivered"""
+        loop = asyncio.get_running_loop()
+        queue = self.queues.get(mcu_id)
+        if queue is None:
+            queue = self.queues[mcu_id] = asyncio.Queue()
+            self.workers[mcu_id] = loop.create_task(self._worker(mcu_id, queue))
+        future = loop.create_future()
+        queue.put_nowait((command, future))
+        return future
+    
+    async def send(self, mcu_id, command):
+        """Queue a command and wait until it has been delivered (or given up on)"""
+        return await self.submit(mcu_id, command)
+    
+    async def _worker(self, mcu_id, queue):
+        while True:
+            command, future = await queue.get()
+            with MCU_COMMAND_SECONDS.time():
+                delivered = await self._deliver(mcu_id, command)
+            MCU_COMMANDS_TOTAL.labels("ok" if delivered else "failed").inc()
+            if not delivered:
+                print(f"[MCU {mcu_id}] Giving up on command {command.get('cmd')} after {self.retries + 1} attempts")
+            if not future.done():
+                future.set_result(delivered)
+    
+    async def _deliver(self, mcu_id, command):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                MCU_COMMAND_RETRIES_TOTAL.inc()
+                await asyncio.sleep(self.base_delay * 2 ** (attempt - 1))
+            try:
+                if mcu_transport is not None:
+                    if await mcu_transport.send_command(mcu_id, command):
+                        return True
+                # Blocking fallbacks run in a worker thread
+                elif await asyncio.to_thread(send_mcu_command, mcu_id, command):
+                    return True
+            except Exception as e:
+                print(f"[MCU {mcu_id}] Command {command.get('cmd')} failed: {e}")
+        return False
+    
+    async def close(self):
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.queues.clear()
+        self.workers.clear()
+
+MCU_DISPATCHER = MCUCommandDispatcher()
+REGISTRY.gauge("mcu_command_queue_depth", "MCU commands waiting to be sent", MCU_DISPATCHER.queue_depth)
+
+@app.on_event("shutdown")
+async def close_mcu_dispatcher():
+    """Stop the per-MCU command workers and disconnect the transport"""
+    global mcu_transport
+    await MCU_DISPATCHER.close()
+    if mcu_transport is not None:
+        await mcu_transport.stop()
+        mcu_transport = None
+
+# Health probes (cached for HEALTH_CACHE_TTL_SECONDS so frequent polling stays cheap)
+HEALTH_CACHE_TTL_SECONDS = float(os.environ.get("HEALTH_CACHE_TTL_SECONDS", 5))
+HEALTH_READING_STALE_SECONDS = float(os.environ.get("HEALTH_READING_STALE_SECONDS", 300))
+HEALTH_DISK_MIN_FREE_MB = float(os.environ.get("HEALTH_DISK_MIN_FREE_MB", 512))
+HEALTH_DISK_WARN_FREE_RATIO = float(os.environ.get("HEALTH_DISK_WARN_FREE_RATIO", 0.10))
+
+async def controllers_health():
+    """Time since each MCU's cell last delivered a reading"""
+    last_received = ENV_READINGS_STORE.last_received
+    return freshness_check(
+        {cell["mcuId"]: last_received.get(cell["id"]) for cell in BATCH_REPO.cells},
+        HEALTH_READING_STALE_SECONDS, datetime.utcnow()
+    )
+
+async def transport_health():
+    return {**transport_check(MCU_TRANSPORT, mcu_transport), "queued_commands": MCU_DISPATCHER.queue_depth()}
+
+# All data is in memory, so only spilled readings depend on the disk; the
+# controllers and the MCU link degrade the report without failing readiness
+HEALTH_MONITOR = HealthMonitor(HEALTH_CACHE_TTL_SECONDS)
+HEALTH_MONITOR.register("controllers", controllers_health, critical=False)
+HEALTH_MONITOR.register("transport", transport_health, critical=False)
+if READINGS_SPILL_DIR:
+    HEALTH_MONITOR.register("storage", lambda: disk_check(
+        {"readings_spill": READINGS_SPILL_DIR}, HEALTH_DISK_MIN_FREE_MB, HEALTH_DISK_WARN_FREE_RATIO
+    ))
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return HEALTH_MONITOR.liveness()
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe with controller, MCU transport and storage checks (503 when not ready)"""
+    report = await HEALTH_MONITOR.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint"""
+    return await readiness()
+
+def check_safety_thresholds(batch_id, cell_id, reading, stage_info=None):
     """Check if environmental reading is within safe bounds"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
-    if not batch or batch["status"] != BatchStatus.RUNNING:
-        return
-    
-    current_stage_info = get_current_stage(batch)
-    if not current_stage_info:
+    batch = BATCH_REPO.get_batch(batch_id)
+    if stage_info is None:
+        if not batch or batch["status"] != BatchStatus.RUNNING:
+            return
+        
+        stage_info = get_current_stage(batch)
+    if not stage_info:
         return
     
-    targets = current_stage_info["stage"]["targets"]
+    targets = BATCH_REPO.species_timeline(batch["speciesId"]).targets[stage_info["index"]]
     alerts = []
     
     # Check temperature
-    if reading["tempC"] < targets["tempMin"] or reading["tempC"] > targets["tempMax"]:
-        alerts.append(f"Temperature {reading['tempC']}°C outside range {targets['tempMin']}-{targets['tempMax']}°C")
+    if reading["tempC"] is not None and (reading["tempC"] < targets.temp_min or reading["tempC"] > targets.temp_max):
+        alerts.append(f"Temperature {reading['tempC']}°C outside range {targets.temp_min}-{targets.temp_max}°C")
     
     # Check humidity
-    if reading["rh"] < targets["rhMin"] or reading["rh"] > targets["rhMax"]:
-        alerts.append(f"Humidity {reading['rh']}% outside range {targets['rhMin']}-{targets['rhMax']}%")
+    if reading["rh"] is not None and (reading["rh"] < targets.rh_min or reading["rh"] > targets.rh_max):
+        alerts.append(f"Humidity {reading['rh']}% outside range {targets.rh_min}-{targets.rh_max}%")
     
     # Check CO2
-    if reading["co2ppm"] < targets["co2Min"] or reading["co2ppm"] > targets["co2Max"]:
-        alerts.append(f"CO2 {reading['co2ppm']}ppm outside range {targets['co2Min']}-{targets['co2Max']}ppm")
+    if reading["co2ppm"] is not None and (reading["co2ppm"] < targets.co2_min or reading["co2ppm"] > targets.co2_max):
+        alerts.append(f"CO2 {reading['co2ppm']}ppm outside range {targets.co2_min}-{targets.co2_max}ppm")
     
     # Log alerts
+    if alerts:
+        ALERTS_SAFETY_DISPATCHED.inc(len(alerts))
     for alert_msg in alerts:
         log_action(batch_id, cell_id, "system", "safety_alert", {"message": alert_msg, "reading": reading})
+        LIVE_HUB.publish(
+            (f"batch:{batch_id}", f"cell:{cell_id}", "alerts"), "alert",
+            {"batchId": batch_id, "cellId": cell_id, "message": alert_msg, "reading": reading}
+        )
+
+TELEMETRY_NUMERIC_FIELDS = ("tempC", "rh", "co2ppm", "lux")
+
+READINGS_INGESTED = REGISTRY.counter("telemetry_readings_ingested_total", "Telemetry readings stored")
+INGEST_BATCH_READINGS = REGISTRY.histogram(
+    "telemetry_batch_readings", "Readings per /api/telemetry/batch request", buckets=SIZE_BUCKETS
+)
+
+# Stage index each running batch was last seen in, to announce transitions
+LAST_STAGE_BY_BATCH = {}
+
+def ingest_reading(telemetry_data, stage_cache=None):
+    """Validate, store and threshold-check a single telemetry reading.
+    
+    ``stage_cache`` maps batchId -> current stage info so a bulk request only
+    resolves each batch's stage once. Raises ValueError on malformed input.
+    """
+    if not isinstance(telemetry_data, dict):
+        raise ValueError("Reading must be a JSON object")
+    cell_id = telemetry_data.get("cellId")
+    if cell_id is None:
+        raise ValueError("cellId is required")
+    if isinstance(cell_id, bool) or not isinstance(cell_id, (str, int)):
+        raise ValueError("cellId must be a string or integer")
+    if BATCH_REPO.get_cell(cell_id) is None:
+        # Each cell gets a preallocated buffer, so only configured cells are stored
+        raise ValueError(f"Unknown cellId {cell_id!r}")
+    for field in TELEMETRY_NUMERIC_FIELDS:
+        value = telemetry_data.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{field} must be a number")
+    
+    timestamp = telemetry_data.get("timestamp") or datetime.now().isoformat() + "Z"
+    try:
+        micros = timestamp_to_micros(timestamp)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("timestamp must be an ISO-8601 string or epoch seconds")
+    
+    reading = {
+        "id": ENV_READINGS_STORE.next_id(),
+        "cellId": telemetry_data.get("cellId"),
+        "timestamp": timestamp,
+        "tempC": telemetry_data.get("tempC"),
+        "rh": telemetry_data.get("rh"),
+        "co2ppm": telemetry_data.get("co2ppm"),
+        "lux": telemetry_data.get("lux"),
+        "notes": telemetry_data.get("notes", "")
+    }
+    
+    # Find active batch for this cell
+    active_batch = BATCH_REPO.running_batch(reading["cellId"])
+    if active_batch:
+        reading["batchId"] = active_batch["id"]
+        if stage_cache is None:
+            stage_info = get_current_stage(active_batch)
+        elif active_batch["id"] in stage_cache:
+            stage_info = stage_cache[active_batch["id"]]
+        else:
+            stage_info = stage_cache[active_batch["id"]] = get_current_stage(active_batch)
+        # Check safety thresholds
+        check_safety_thresholds(active_batch["id"], reading["cellId"], reading, stage_info)
+        if stage_info and LAST_STAGE_BY_BATCH.get(active_batch["id"]) != stage_info["index"]:
+            if active_batch["id"] in LAST_STAGE_BY_BATCH:
+                LIVE_HUB.publish(
+                    (f"batch:{active_batch['id']}", f"cell:{reading['cellId']}"), "stage",
+                    {"batchId": active_batch["id"], "cellId": reading["cellId"], "stage": stage_info["stage"]["name"], "index": stage_info["index"]}
+                )
+            LAST_STAGE_BY_BATCH[active_batch["id"]] = stage_info["index"]
+    
+    ENV_READINGS_STORE.append(reading, micros)
+    READINGS_INGESTED.inc()
+    topics = (f"cell:{reading['cellId']}", f"batch:{reading['batchId']}") if reading.get("batchId") else (f"cell:{reading['cellId']}",)
+    LIVE_HUB.publish(topics, "reading", reading, coalesce=True)
+    
+    return reading
 
 # Batch API Endpoints
 @app.get("/api/batches")
@@ -1334,7 +2114,7 @@ async def create_batch(batch_data: dict):
     """Create a new batch"""
     # Validate cell availability
     cell_id = batch_data.get("cellId")
-    cell = next((c for c in CELLS_DATA if c["id"] == cell_id), None)
+    cell = BATCH_REPO.get_cell(cell_id)
     if not cell:
         return {"error": "Cell not found"}
     
@@ -1342,7 +2122,7 @@ async def create_batch(batch_data: dict):
         return {"error": "Cell not available"}
     
     # Check if cell already has running batch
-    existing_batch = next((b for b in BATCHES_DATA if b["cellId"] == cell_id and b["status"] in [BatchStatus.RUNNING, BatchStatus.PAUSED]), None)
+    existing_batch = BATCH_REPO.active_batch(cell_id)
     if existing_batch:
         return {"error": "Cell already has an active batch"}
     
@@ -1360,7 +2140,7 @@ async def create_batch(batch_data: dict):
         "notes": batch_data.get("notes", "")
     }
     
-    BATCHES_DATA.append(new_batch)
+    BATCH_REPO.add_batch(new_batch)
     
     # Update cell status
     cell["status"] = CellStatus.OCCUPIED
@@ -1373,7 +2153,7 @@ async def create_batch(batch_data: dict):
 @app.get("/api/batches/{batch_id}")
 async def get_batch(batch_id: str):
     """Get batch details with current stage, readings, logs, photos"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
@@ -1381,16 +2161,16 @@ async def get_batch(batch_id: str):
     current_stage_info = get_current_stage(batch) if batch["status"] == BatchStatus.RUNNING else None
     
     # Get recent readings
-    recent_readings = [r for r in ENV_READINGS_DATA if r["batchId"] == batch_id][-20:]  # Last 20 readings
+    recent_readings = BATCH_REPO.get_readings(batch["cellId"], 20, batch_id=batch_id)
     
     # Get action logs
-    action_logs = [log for log in ACTION_LOGS_DATA if log["batchId"] == batch_id]
+    action_logs = BATCH_REPO.get_action_logs(batch_id)
     
     # Get photos
-    photos = [p for p in PHOTOS_DATA if p["batchId"] == batch_id]
+    photos = BATCH_REPO.get_photos(batch_id)
     
     # Get species info
-    species = next((s for s in SPECIES_WITH_STAGES if s["id"] == batch["speciesId"]), None)
+    species = BATCH_REPO.get_species(batch["speciesId"])
     
     return {
         **batch,
@@ -1404,7 +2184,7 @@ async def get_batch(batch_id: str):
 @app.post("/api/batches/{batch_id}/start")
 async def start_batch(batch_id: str):
     """Start a batch - load profile to MCU and begin control"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
@@ -1412,8 +2192,8 @@ async def start_batch(batch_id: str):
         return {"error": "Batch is not in pending status"}
     
     # Get species and cell info
-    species = next((s for s in SPECIES_WITH_STAGES if s["id"] == batch["speciesId"]), None)
-    cell = next((c for c in CELLS_DATA if c["id"] == batch["cellId"]), None)
+    species = BATCH_REPO.get_species(batch["speciesId"])
+    cell = BATCH_REPO.get_cell(batch["cellId"])
     
     if not species or not cell:
         return {"error": "Species or cell not found"}
@@ -1426,7 +2206,7 @@ async def start_batch(batch_id: str):
         "stages": species["stages"]
     }
     
-    if not send_mcu_command(cell["mcuId"], mcu_command):
+    if not await MCU_DISPATCHER.send(cell["mcuId"], mcu_command):
         return {"error": "Failed to send profile to MCU"}
     
     # Start control
@@ -1436,11 +2216,11 @@ async def start_batch(batch_id: str):
         "cellId": batch["cellId"]
     }
     
-    if not send_mcu_command(cell["mcuId"], start_command):
+    if not await MCU_DISPATCHER.send(cell["mcuId"], start_command):
         return {"error": "Failed to start MCU control"}
     
     # Update batch status
-    batch["status"] = BatchStatus.RUNNING
+    BATCH_REPO.set_batch_status(batch, BatchStatus.RUNNING)
     batch["startedAt"] = datetime.now().isoformat() + "Z"
     batch["currentStage"] = 0
     
@@ -1452,20 +2232,20 @@ async def start_batch(batch_id: str):
 @app.post("/api/batches/{batch_id}/pause")
 async def pause_batch(batch_id: str):
     """Pause a running batch"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
     if batch["status"] != BatchStatus.RUNNING:
         return {"error": "Batch is not running"}
     
-    # Send pause command to MCU
-    cell = next((c for c in CELLS_DATA if c["id"] == batch["cellId"]), None)
+    # Send pause command to MCU (delivered in the background)
+    cell = BATCH_REPO.get_cell(batch["cellId"])
     pause_command = {"cmd": "PAUSE", "batchId": batch_id, "cellId": batch["cellId"]}
-    send_mcu_command(cell["mcuId"], pause_command)
+    MCU_DISPATCHER.submit(cell["mcuId"], pause_command)
     
     # Update status
-    batch["status"] = BatchStatus.PAUSED
+    BATCH_REPO.set_batch_status(batch, BatchStatus.PAUSED)
     
     # Log action
     log_action(batch_id, batch["cellId"], "user", "batch_paused")
@@ -1475,20 +2255,20 @@ async def pause_batch(batch_id: str):
 @app.post("/api/batches/{batch_id}/resume")
 async def resume_batch(batch_id: str):
     """Resume a paused batch"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
     if batch["status"] != BatchStatus.PAUSED:
         return {"error": "Batch is not paused"}
     
-    # Send resume command to MCU
-    cell = next((c for c in CELLS_DATA if c["id"] == batch["cellId"]), None)
+    # Send resume command to MCU (delivered in the background)
+    cell = BATCH_REPO.get_cell(batch["cellId"])
     resume_command = {"cmd": "RESUME", "batchId": batch_id, "cellId": batch["cellId"]}
-    send_mcu_command(cell["mcuId"], resume_command)
+    MCU_DISPATCHER.submit(cell["mcuId"], resume_command)
     
     # Update status
-    batch["status"] = BatchStatus.RUNNING
+    BATCH_REPO.set_batch_status(batch, BatchStatus.RUNNING)
     
     # Log action
     log_action(batch_id, batch["cellId"], "user", "batch_resumed")
@@ -1498,20 +2278,20 @@ async def resume_batch(batch_id: str):
 @app.post("/api/batches/{batch_id}/abort")
 async def abort_batch(batch_id: str):
     """Abort a batch"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
     if batch["status"] in [BatchStatus.COMPLETED, BatchStatus.ABORTED]:
         return {"error": "Batch already completed or aborted"}
     
-    # Send abort command to MCU
-    cell = next((c for c in CELLS_DATA if c["id"] == batch["cellId"]), None)
+    # Send abort command to MCU (delivered in the background)
+    cell = BATCH_REPO.get_cell(batch["cellId"])
     abort_command = {"cmd": "ABORT", "batchId": batch_id, "cellId": batch["cellId"]}
-    send_mcu_command(cell["mcuId"], abort_command)
+    MCU_DISPATCHER.submit(cell["mcuId"], abort_command)
     
     # Update status
-    batch["status"] = BatchStatus.ABORTED
+    BATCH_REPO.set_batch_status(batch, BatchStatus.ABORTED)
     batch["completedAt"] = datetime.now().isoformat() + "Z"
     
     # Free up cell
@@ -1531,15 +2311,15 @@ async def get_cells():
 @app.get("/api/cells/{cell_id}/status")
 async def get_cell_status(cell_id: int):
     """Get cell status with last readings and active batch"""
-    cell = next((c for c in CELLS_DATA if c["id"] == cell_id), None)
+    cell = BATCH_REPO.get_cell(cell_id)
     if not cell:
         return {"error": "Cell not found"}
     
     # Get active batch
-    active_batch = next((b for b in BATCHES_DATA if b["cellId"] == cell_id and b["status"] in [BatchStatus.RUNNING, BatchStatus.PAUSED]), None)
+    active_batch = BATCH_REPO.active_batch(cell_id)
     
     # Get last readings
-    last_readings = [r for r in ENV_READINGS_DATA if r["cellId"] == cell_id][-10:]  # Last 10 readings
+    last_readings = BATCH_REPO.get_readings(cell_id, 10)
     
     return {
         **cell,
@@ -1573,35 +2353,145 @@ async def assign_species_to_cell(species_id: int, assignment_data: dict):
 @app.post("/api/telemetry")
 async def ingest_telemetry(telemetry_data: dict):
     """Ingest telemetry data from MCU"""
-    reading = {
-        "id": f"reading_{len(ENV_READINGS_DATA) + 1}",
-        "cellId": telemetry_data.get("cellId"),
-        "timestamp": telemetry_data.get("timestamp", datetime.now().isoformat() + "Z"),
-        "tempC": telemetry_data.get("tempC"),
-        "rh": telemetry_data.get("rh"),
-        "co2ppm": telemetry_data.get("co2ppm"),
-        "lux": telemetry_data.get("lux"),
-        "notes": telemetry_data.get("notes", "")
-    }
+    try:
+        reading = ingest_reading(telemetry_data)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
     
-    # Find active batch for this cell
-    active_batch = next((b for b in BATCHES_DATA if b["cellId"] == reading["cellId"] and b["status"] == BatchStatus.RUNNING), None)
-    if active_batch:
-        reading["batchId"] = active_batch["id"]
-        # Check safety thresholds
-        check_safety_thresholds(active_batch["id"], reading["cellId"], reading)
-    
-    ENV_READINGS_DATA.append(reading)
+    return reading
+
+@app.post("/api/telemetry/batch")
+async def ingest_telemetry_batch(request: Request):
+    """Ingest many readings in one request.
     
-    # TODO: Broadcast to WebSocket clients for real-time updates
+    Accepts a JSON array, ``{"readings": [...]}``, or an NDJSON stream
+    (``Content-Type: application/x-ndjson``) and acknowledges each item.
+    """
+    content_type = request.headers.get("content-type", "")
+    results = []
+    stage_cache = {}
+    
+    def ingest_item(index, item):
+        try:
+            reading = ingest_reading(item, stage_cache)
+        except ValueError as e:
+            results.append({"index": index, "status": "rejected", "error": str(e)})
+            return
+        results.append({
+            "index": index,
+            "status": "accepted",
+            "id": reading["id"],
+            "batchId": reading.get("batchId")
+        })
+    
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        # Parse line by line as the body streams in
+        index = 0
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    results.append({"index": index, "status": "rejected", "error": "Invalid JSON"})
+                else:
+                    ingest_item(index, item)
+                index += 1
+        if pending.strip():
+            try:
+                item = json.loads(pending)
+            except ValueError:
+                results.append({"index": index, "status": "rejected", "error": "Invalid JSON"})
+            else:
+                ingest_item(index, item)
+    else:
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "Invalid JSON body"})
+        if isinstance(payload, dict):
+            payload = payload.get("readings")
+        if not isinstance(payload, list):
+            return JSONResponse(status_code=400, content={"detail": "Expected an array of readings"})
+        for index, item in enumerate(payload):
+            ingest_item(index, item)
+    
+    accepted = sum(1 for r in results if r["status"] == "accepted")
+    INGEST_BATCH_READINGS.observe(len(results))
     
-    return reading
+    return {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results
+    }
+
+# Live update streams
+@app.websocket("/api/live/ws")
+async def live_websocket(websocket: WebSocket):
+    """Push events for the ``topics`` query parameter.
+    
+    Clients change topics by sending ``{"subscribe": [...]}`` or
+    ``{"unsubscribe": [...]}``; events arrive as
+    ``{"events": [...], "dropped": n}`` messages.
+    """
+    await websocket.accept()
+    subscriber = LIVE_HUB.subscribe(parse_topics(websocket.query_params.get("topics")))
+    
+    async def send():
+        try:
+            while True:
+                events, dropped = await subscriber.next_events()
+                await websocket.send_json({"events": events, "dropped": dropped})
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # Closed while sending; the receive loop sees the disconnect
+    
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                LIVE_HUB.update(subscriber, valid_topics(message.get("subscribe")), valid_topics(message.get("unsubscribe")))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        LIVE_HUB.unsubscribe(subscriber)
+
+@app.get("/api/live/events")
+async def live_events(topics: str = ""):
+    """Server-Sent Events stream for the comma-separated ``topics``"""
+    subscriber = LIVE_HUB.subscribe(parse_topics(topics))
+    
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    events, dropped = await asyncio.wait_for(subscriber.next_events(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if dropped:
+                    yield f"event: dropped\ndata: {json.dumps({'count': dropped})}\n\n"
+                for event in events:
+                    yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            LIVE_HUB.unsubscribe(subscriber)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # Batch Adjustment API
 @app.post("/api/batches/{batch_id}/adjust")
 async def adjust_batch_targets(batch_id: str, adjustment_data: dict):
     """Adjust current stage targets for a batch"""
-    batch = next((b for b in BATCHES_DATA if b["id"] == batch_id), None)
+    batch = BATCH_REPO.get_batch(batch_id)
     if not batch:
         return {"error": "Batch not found"}
     
@@ -1615,7 +2505,7 @@ async def adjust_batch_targets(batch_id: str, adjustment_data: dict):
     
     # Apply adjustments
     adjustments = adjustment_data.get("targets", {})
-    cell = next((c for c in CELLS_DATA if c["id"] == batch["cellId"]), None)
+    cell = BATCH_REPO.get_cell(batch["cellId"])
     
     # Send adjustment command to MCU
     adjust_command = {
@@ -1625,7 +2515,7 @@ async def adjust_batch_targets(batch_id: str, adjustment_data: dict):
         "targets": adjustments
     }
     
-    if send_mcu_command(cell["mcuId"], adjust_command):
+    if await MCU_DISPATCHER.send(cell["mcuId"], adjust_command):
         # Log adjustment
         log_action(batch_id, batch["cellId"], "user", "targets_adjusted", {"adjustments": adjustments})
         return {"success": True, "adjustments": adjustments}
@@ -1655,7 +2545,7 @@ async def upload_batch_photo(batch_id: str, photo_data: dict):
         "note": photo_data.get("note", "")
     }
     
-    PHOTOS_DATA.append(photo)
+    BATCH_REPO.add_photo(photo)
     
     # Log as action
     log_action(batch_id, photo["cellId"], "user", "photo_uploaded", {"photoId": photo["id"], "note": photo["note"]})
@@ -1792,6 +2682,11 @@ async def delete_environment(environment_id: int):
     else:
         return JSONResponse(status_code=404, content={"detail": "Environment not found"})
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # Serve frontend files
 frontend_dir = os.path.join(os.path.dirname(__file__), "frontend")
 
@@ -1907,6 +2802,7 @@ async def update_environment_parameter(environment_id: int, update_data: dict):
     # Update environment with new parameters
     for key, value in update_data.items():
         environment[key] = value
+    publish_environment_reading(environment)
     
     # Log parameter update
     log_audit_event("parameter_updated", f"Environment {environment['name']} parameter updated", update_data)